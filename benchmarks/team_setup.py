@@ -0,0 +1,130 @@
+"""
+Team setup latency: building the financial team from scratch per request
+(a fresh TeamTemplate and fresh model and HTTP clients each time, as before
+templates and the client registry) against instantiating a prebuilt template
+with shared clients. A middle row builds a fresh template on the shared
+clients, to separate the two savings. No model or search calls are made.
+
+    poetry run python benchmarks/team_setup.py --iterations 50
+"""
+
+import argparse
+import asyncio
+import inspect
+import os
+import statistics
+import time
+from unittest import mock
+
+# Model clients need a key to construct; nothing is sent.
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from financial_planner import clients  # noqa: E402
+from financial_planner.agents_team import TeamTemplate  # noqa: E402
+from financial_planner.clients import (  # noqa: E402
+    aclose_http_clients,
+    aclose_model_clients,
+)
+
+
+class StubExecutorPool:
+    """
+    Hands out a placeholder executor so no container is started.
+    """
+
+    async def acquire(self):
+        return object()
+
+
+class FreshClients:
+    """
+    Builds clients as before the shared registry: a new model client for
+    every agent and new HTTP clients for every request. Created clients are
+    kept so they can be closed once timing is done.
+    """
+
+    def __init__(self):
+        self.model_clients = []
+        self.http_clients = []
+
+    def new_request(self) -> None:
+        self.http_clients.extend(clients._http_clients.values())
+        clients._http_clients.clear()
+
+    def create(self, key: tuple, factory):
+        client = factory()
+        self.model_clients.append(client)
+        return client
+
+    async def aclose(self) -> None:
+        self.new_request()
+        for client in self.model_clients:
+            close = getattr(client, "close", None)
+            result = close() if close is not None else None
+            if inspect.isawaitable(result):
+                await result
+        for client in self.http_clients:
+            await client.aclose()
+
+
+async def time_setup(
+    make_template, iterations: int, fresh_clients: FreshClients | None = None
+) -> list[float]:
+    pool = StubExecutorPool()
+    timings = []
+    for _ in range(iterations):
+        if fresh_clients is not None:
+            fresh_clients.new_request()
+        start = time.perf_counter()
+        template = make_template()
+        await template.instantiate(
+            "perplexity-key",
+            "anthropic-key",
+            risk_tolerance="moderate",
+            time_horizon="long-term",
+            annual_gross_income=120000,
+            executor_pool=pool,
+        )
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label: str, timings: list[float]) -> None:
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"{label:10} mean {statistics.mean(timings):7.2f} ms  "
+        f"p50 {statistics.median(timings):7.2f} ms  p95 {p95:7.2f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    template = TeamTemplate()
+    # Warm imports and the model client registry before timing.
+    await time_setup(lambda: template, 3)
+
+    try:
+        fresh_clients = FreshClients()
+        try:
+            with mock.patch.object(
+                clients, "_registered_model_client", fresh_clients.create
+            ):
+                report(
+                    "scratch",
+                    await time_setup(TeamTemplate, args.iterations, fresh_clients),
+                )
+        finally:
+            await fresh_clients.aclose()
+        report("shared", await time_setup(TeamTemplate, args.iterations))
+        report("template", await time_setup(lambda: template, args.iterations))
+    finally:
+        await aclose_model_clients()
+        await aclose_http_clients()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -6,3 +6,155 @@ load_dotenv()
 PERPLEXITY_API_KEY = os.getenv("PERPLEXITY_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
+
+# Shared outbound HTTP connection pool
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+PERPLEXITY_TIMEOUT = float(os.getenv("PERPLEXITY_TIMEOUT", "120"))
+
+# In-process web search cache (TTLs in seconds)
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1024"))
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+SEARCH_CACHE_TTL_SHORT = float(os.getenv("SEARCH_CACHE_TTL_SHORT", "900"))
+SEARCH_CACHE_TTL_DEFAULT = float(os.getenv("SEARCH_CACHE_TTL_DEFAULT", "3600"))
+SEARCH_CACHE_TTL_LONG = float(os.getenv("SEARCH_CACHE_TTL_LONG", "86400"))
+
+# Optional persistent search cache shared by all workers (disabled when unset)
+SEARCH_CACHE_DB_PATH = os.getenv("SEARCH_CACHE_DB_PATH") or None
+SEARCH_CACHE_PRUNE_INTERVAL = float(os.getenv("SEARCH_CACHE_PRUNE_INTERVAL", "300"))
+
+# Batched web search tool
+SEARCH_BATCH_CONCURRENCY = int(os.getenv("SEARCH_BATCH_CONCURRENCY", "4"))
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "10"))
+
+# Process-wide request budgets per external API (requests per minute / burst)
+PERPLEXITY_RATE_LIMIT_RPM = float(os.getenv("PERPLEXITY_RATE_LIMIT_RPM", "50"))
+PERPLEXITY_RATE_LIMIT_BURST = float(os.getenv("PERPLEXITY_RATE_LIMIT_BURST", "5"))
+OPENAI_RATE_LIMIT_RPM = float(os.getenv("OPENAI_RATE_LIMIT_RPM", "500"))
+OPENAI_RATE_LIMIT_BURST = float(os.getenv("OPENAI_RATE_LIMIT_BURST", "20"))
+ANTHROPIC_RATE_LIMIT_RPM = float(os.getenv("ANTHROPIC_RATE_LIMIT_RPM", "50"))
+ANTHROPIC_RATE_LIMIT_BURST = float(os.getenv("ANTHROPIC_RATE_LIMIT_BURST", "5"))
+
+# Stream Perplexity completions and forward partial text as progress events
+PERPLEXITY_STREAMING = os.getenv("PERPLEXITY_STREAMING", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+PERPLEXITY_PROGRESS_INTERVAL = float(os.getenv("PERPLEXITY_PROGRESS_INTERVAL", "0.5"))
+
+# Warm pool of started code executors shared by /infer requests
+CODE_EXECUTOR_POOL_MIN_SIZE = int(os.getenv("CODE_EXECUTOR_POOL_MIN_SIZE", "1"))
+CODE_EXECUTOR_POOL_MAX_SIZE = int(os.getenv("CODE_EXECUTOR_POOL_MAX_SIZE", "4"))
+CODE_EXECUTOR_POOL_ACQUIRE_TIMEOUT = float(
+    os.getenv("CODE_EXECUTOR_POOL_ACQUIRE_TIMEOUT", "120")
+)
+CODE_EXECUTOR_POOL_HEALTH_INTERVAL = float(
+    os.getenv("CODE_EXECUTOR_POOL_HEALTH_INTERVAL", "60")
+)
+
+# Code executor image. The stock image installs extra packages on start; a
+# prebuilt image (docker/executor.Dockerfile) needs no init command.
+DEFAULT_CODE_EXECUTOR_IMAGE = "jupyter/scipy-notebook"
+CODE_EXECUTOR_IMAGE = os.getenv("CODE_EXECUTOR_IMAGE", DEFAULT_CODE_EXECUTOR_IMAGE)
+CODE_EXECUTOR_INIT_COMMAND = (
+    os.getenv(
+        "CODE_EXECUTOR_INIT_COMMAND",
+        (
+            "pip install --quiet seaborn scikit-learn"
+            if CODE_EXECUTOR_IMAGE == DEFAULT_CODE_EXECUTOR_IMAGE
+            else ""
+        ),
+    )
+    or None
+)
+CODE_EXECUTOR_READY_TIMEOUT = float(os.getenv("CODE_EXECUTOR_READY_TIMEOUT", "120"))
+
+# Code executor backend: "docker" (default), "jupyter" (stateful local kernel)
+# or "sandbox" (local subprocesses with resource limits)
+CODE_EXECUTOR_BACKEND = os.getenv("CODE_EXECUTOR_BACKEND", "docker").lower()
+
+# Local subprocess sandbox backend (CODE_EXECUTOR_BACKEND=sandbox)
+SANDBOX_WARM_WORKERS = int(os.getenv("SANDBOX_WARM_WORKERS", "2"))
+SANDBOX_CPU_SECONDS = int(os.getenv("SANDBOX_CPU_SECONDS", "30"))
+SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "2048"))
+SANDBOX_FILE_SIZE_MB = int(os.getenv("SANDBOX_FILE_SIZE_MB", "64"))
+SANDBOX_PRELOAD_MODULES = [
+    module.strip()
+    for module in os.getenv(
+        "SANDBOX_PRELOAD_MODULES", "numpy,pandas,scipy,matplotlib.pyplot"
+    ).split(",")
+    if module.strip()
+]
+
+# Cache of code execution results keyed by normalized code and executor
+EXECUTION_CACHE_MAX_ENTRIES = int(os.getenv("EXECUTION_CACHE_MAX_ENTRIES", "256"))
+EXECUTION_CACHE_MAX_BYTES = int(
+    os.getenv("EXECUTION_CACHE_MAX_BYTES", str(8 * 1024 * 1024))
+)
+
+# Monte Carlo retirement simulations
+MONTE_CARLO_PATHS = int(os.getenv("MONTE_CARLO_PATHS", "100000"))
+MONTE_CARLO_MAX_PATHS = int(os.getenv("MONTE_CARLO_MAX_PATHS", "1000000"))
+
+# Local historical market data (built with `python -m financial_planner.market_data`)
+MARKET_DATA_DIR = os.getenv("MARKET_DATA_DIR", "market_data")
+MARKET_DATA_MOUNT_PATH = os.getenv("MARKET_DATA_MOUNT_PATH", "/data/market")
+
+# Answer simple queries with a calculator or the advisor alone instead of the
+# full team
+FAST_PATH_ROUTING = os.getenv("FAST_PATH_ROUTING", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Run independent subtasks of a team plan concurrently before the advisor
+# synthesizes
+PARALLEL_FANOUT = os.getenv("PARALLEL_FANOUT", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+FANOUT_MAX_SUBTASKS = int(os.getenv("FANOUT_MAX_SUBTASKS", "4"))
+
+# Per-run budgets for the team; 0 disables a budget. When one runs out the
+# advisor answers from the conversation so far.
+TEAM_MAX_MESSAGES = int(os.getenv("TEAM_MAX_MESSAGES", "30"))
+TEAM_MAX_TOTAL_TOKENS = int(os.getenv("TEAM_MAX_TOTAL_TOKENS", "0"))
+TEAM_MAX_COST_USD = float(os.getenv("TEAM_MAX_COST_USD", "0"))
+TEAM_TIMEOUT_SECONDS = float(os.getenv("TEAM_TIMEOUT_SECONDS", "0"))
+TEAM_DEADLINE_GRACE_SECONDS = float(os.getenv("TEAM_DEADLINE_GRACE_SECONDS", "30"))
+
+# Model prices in dollars per million tokens, for cost estimates (gpt-4o)
+MODEL_PROMPT_PRICE_PER_MTOK = float(os.getenv("MODEL_PROMPT_PRICE_PER_MTOK", "2.50"))
+MODEL_COMPLETION_PRICE_PER_MTOK = float(
+    os.getenv("MODEL_COMPLETION_PRICE_PER_MTOK", "10.00")
+)
+
+# Compact older tool outputs and code in agent prompts above a token threshold
+CONTEXT_COMPACTION = os.getenv("CONTEXT_COMPACTION", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+CONTEXT_COMPACTION_THRESHOLD_TOKENS = int(
+    os.getenv("CONTEXT_COMPACTION_THRESHOLD_TOKENS", "6000")
+)
+CONTEXT_COMPACTION_KEEP_RECENT = int(os.getenv("CONTEXT_COMPACTION_KEEP_RECENT", "4"))
+CONTEXT_COMPACTED_MESSAGE_TOKENS = int(
+    os.getenv("CONTEXT_COMPACTED_MESSAGE_TOKENS", "400")
+)
+CONTEXT_TOKENIZER_MODEL = os.getenv("CONTEXT_TOKENIZER_MODEL", "gpt-4o")
+
+# Optional on-disk cache of model responses: "off", "read_write", or "replay"
+# (serve cached responses only; a miss is an error)
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "off").lower()
+LLM_CACHE_DB_PATH = os.getenv("LLM_CACHE_DB_PATH", "llm_cache.sqlite3")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Date the agents are told instead of the clock's, e.g. "Monday, March 2, 2026",
+# so cached responses can be replayed on a later day
+CURRENT_DATE_OVERRIDE = os.getenv("CURRENT_DATE_OVERRIDE", "")
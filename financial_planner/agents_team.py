@@ -1,33 +1,58 @@
 import asyncio
 import datetime
 import logging
-import time
 
-import requests
 from autogen_agentchat.agents import AssistantAgent, CodeExecutorAgent
-from autogen_agentchat.conditions import MaxMessageTermination
 from autogen_agentchat.messages import TextMessage
 from autogen_agentchat.teams import MagenticOneGroupChat
 from autogen_core import CancellationToken
+from autogen_core.code_executor import CodeExecutor
 from autogen_core.memory import ListMemory, MemoryContent
-from autogen_ext.code_executors.docker import DockerCommandLineCodeExecutor
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from autogen_ext.models.semantic_kernel import SKChatCompletionAdapter
-from semantic_kernel import Kernel
-from semantic_kernel.connectors.ai.anthropic import (
-    AnthropicChatCompletion,
-    AnthropicChatPromptExecutionSettings,
-)
-from semantic_kernel.memory.null_memory import NullMemory
+from autogen_core.tools import FunctionTool
 from tzlocal import get_localzone
 
-from financial_planner import ANTHROPIC_API_KEY, PERPLEXITY_API_KEY, display_terminal
+from financial_planner import (
+    ANTHROPIC_API_KEY,
+    CODE_EXECUTOR_BACKEND,
+    CODE_EXECUTOR_IMAGE,
+    CONTEXT_COMPACTION,
+    CURRENT_DATE_OVERRIDE,
+    DEFAULT_CODE_EXECUTOR_IMAGE,
+    PARALLEL_FANOUT,
+    PERPLEXITY_API_KEY,
+    display_terminal,
+)
+from financial_planner.budgets import BudgetedTeam, RunBudget
+from financial_planner.clients import (
+    aclose_http_clients,
+    aclose_model_clients,
+    get_openai_model_client,
+    get_orchestrator_model_client,
+)
+from financial_planner.code_executors import (
+    executor_market_data_path,
+    start_code_executor,
+)
+from financial_planner.context_compaction import CompactingChatCompletionContext
+from financial_planner.execution_cache import CachingCodeExecutor
+from financial_planner.executor_pool import ExecutorPool
+from financial_planner.fanout import CODE_WRITER, WEB_SEARCH, FanOutTeam
+from financial_planner.market_data import market_data
+from financial_planner.tools import (
+    CALCULATOR_TOOLS,
+    MARKET_DATA_TOOLS,
+    BatchSearchTool,
+    WebSearchTool,
+)
+from financial_planner.web_search import SearchProgressCallback, perplexity_search
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARNING)
 
 
 def get_current_date() -> str:
+    if CURRENT_DATE_OVERRIDE:
+        return CURRENT_DATE_OVERRIDE
     local_tz = get_localzone()
     now_aware = datetime.datetime.now(local_tz)
     return now_aware.strftime("%A, %B %d, %Y at %I:%M:%S %p %Z (%z)")
@@ -61,84 +86,6 @@ def format_enhanced_query(
     return enhanced_query
 
 
-def perplexity_search(query: str, api_key: str, max_retries: int = 3) -> str:
-    url = "https://api.perplexity.ai/chat/completions"
-
-    system_instructions = """You are a factual financial search assistant. Answer queries precisely using *only* the provided search context. Assume reasonable details if information is missing. Provide direct, thorough answers formatted for clarity. Do not ask follow-up questions. Today is {current_date}."""
-
-    payload = {
-        "model": "sonar-reasoning-pro",
-        "messages": [
-            {"role": "system", "content": system_instructions},
-            {"role": "user", "content": query},
-        ],
-        "temperature": 0.1,
-        "top_p": 0.9,
-        "max_tokens": 8000,
-    }
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            break
-        except requests.exceptions.HTTPError as e:
-            if response.status_code == 429 and attempt < max_retries - 1:
-                wait_time = 2**attempt
-                logger.warning(f"Rate limited. Waiting {wait_time} seconds...")
-                time.sleep(wait_time)
-            else:
-                logger.error(f"Attempt {attempt + 1}/{max_retries}: HTTP Error: {e}")
-                return None
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Attempt {attempt + 1}/{max_retries}: Request Error: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(1)
-            else:
-                return None
-        except ValueError as e:
-            logger.error(f"Attempt {attempt + 1}/{max_retries}: JSON Decode Error: {e}")
-            return None
-
-    md_output = f"*Search performed at: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n\n"
-
-    choices = data.get("choices", [])
-    if not choices:
-        logger.warning(
-            "No results found in Perplexity API response for query: '%s'. "
-            "Consider refining the search terms.",
-            query,
-        )
-        return "No specific information found. Please try refining your query."
-
-    for choice in choices:
-        content = choice.get("message", {}).get("content", "")
-        md_output += content + "\n\n---\n\n"
-
-    citations = data.get("citations", [])
-    if citations:
-        md_output += "### Citations / References\n"
-        for idx, citation in enumerate(citations, start=1):
-            if isinstance(citation, dict):
-                url = citation.get("url", "")
-                title = citation.get("title", "")
-                if url and title:
-                    md_output += f"{idx}. [{title}]({url})\n"
-                elif url:
-                    md_output += f"{idx}. {url}\n"
-                else:
-                    md_output += f"{idx}. {citation}\n"
-            elif isinstance(citation, str):
-                md_output += f"{idx}. {citation}\n"
-            else:
-                logger.warning(f"Unexpected citation type: {type(citation)}")
-                md_output += f"{idx}. {citation}\n"
-
-    return md_output
-
-
 async def create_agent(
     name: str,
     model_client,
@@ -163,40 +110,51 @@ async def create_agent(
         tools=tools,
         reflect_on_tool_use=reflect_on_tool_use,
         memory=memory_list,
+        model_context=(
+            CompactingChatCompletionContext() if CONTEXT_COMPACTION else None
+        ),
     )
 
     return agent
 
 
-async def create_web_search_agent(api_key: str, shared_memory: ListMemory = None):
-    def search_tool(query: str) -> str:
-        result = perplexity_search(query, api_key)
-        if result is None:
-            return "Error: Unable to perform the search."
-        return result
-
+async def create_web_search_agent(
+    api_key: str,
+    shared_memory: ListMemory = None,
+    on_search_progress: SearchProgressCallback = None,
+    market_data_tools: list = None,
+):
+    tools = [
+        WebSearchTool(api_key, on_search_progress),
+        BatchSearchTool(api_key, on_search_progress),
+    ]
     current_date = get_current_date()
 
     system_message = (
         f"You are a financial analyst. Today is {current_date}. Your primary function is to use the web search tool for current financial data. "
+        "When you need several independent data points, request them together in a single call to the batch search tool instead of searching one at a time. "
         "Provide accurate, direct answers based on search results, **always citing your sources**. "
         "When reporting data, clearly identify any limitations or inconsistencies in the information retrieved, and prioritize the most relevant and recent information. "
         "Make reasonable assumptions for missing details rather than asking questions - no follow-up questions. "
         "Consult shared memory for relevant client profile information to tailor responses."
     )
+    if market_data.available():
+        tools += market_data_tools or MARKET_DATA_TOOLS
+        system_message += (
+            " For historical index levels, treasury yields and inflation, check the local market data tools first "
+            "and only search the web for what they do not cover."
+        )
 
     description = "Web Search Agent: Retrieves current financial info via web search, providing cited, direct answers. Use for up-to-date market data, regulations, or news."
 
-    model_client = OpenAIChatCompletionClient(
-        model="gpt-4o", timeout=60, temperature=0.0
-    )
+    model_client = get_openai_model_client()
 
     web_search_agent = await create_agent(
         name="web_search_agent",
         model_client=model_client,
         system_message=system_message,
         description=description,
-        tools=[search_tool],
+        tools=tools,
         reflect_on_tool_use=True,
         shared_memory=shared_memory,
     )
@@ -204,22 +162,16 @@ async def create_web_search_agent(api_key: str, shared_memory: ListMemory = None
     return web_search_agent
 
 
-async def create_code_executor_agent(work_dir: str = "coding", timeout: int = 30):
+async def create_code_executor_agent(
+    work_dir: str = "coding", timeout: int = 30, code_executor: CodeExecutor = None
+):
     try:
-        code_executor = DockerCommandLineCodeExecutor(
-            image="jupyter/scipy-notebook",
-            timeout=timeout,
-            work_dir=work_dir,
-            init_command="pip install --quiet seaborn scikit-learn",
-            auto_remove=True,
-        )
-
-        await code_executor.start()
-        await asyncio.sleep(2)
+        if code_executor is None:
+            code_executor = await start_code_executor(work_dir, timeout)
 
         code_executor_agent = CodeExecutorAgent(
             name="code_executor_agent",
-            code_executor=code_executor,
+            code_executor=CachingCodeExecutor(code_executor),
             description="Code Executor Agent: Executes Python code snippets provided in markdown blocks (```python). Must use this *after* the Code Writer Agent generates code to get the output/results.",
         )
         return code_executor_agent, code_executor
@@ -241,12 +193,31 @@ async def create_code_writer_agent(shared_memory: ListMemory = None):
         "Make reasonable assumptions for missing details. Consult shared memory for client profile context if relevant for the calculation."
         "Use the code executor agent immediately after this to run the generated code and return the results."
     )
+    if (
+        CODE_EXECUTOR_BACKEND == "docker"
+        and CODE_EXECUTOR_IMAGE != DEFAULT_CODE_EXECUTOR_IMAGE
+    ):
+        system_message += (
+            " The `fincalc` module is also available (`import fincalc`): vectorized NumPy functions fv, pv, pmt, npv, irr, "
+            "amortization_schedule, compound_interest, inflation_adjust, real_rate, savings_rate and years_to_goal. Prefer it over re-implementing these formulas."
+        )
+    market_data_path = executor_market_data_path()
+    if market_data_path is not None:
+        system_message += (
+            f" Historical market data (index levels, treasury yields, CPI) is stored under `{market_data_path}`: "
+            "`meta.json` lists each series with its kind and date range, and each series is two NumPy files "
+            f"loaded with `np.load(f'{market_data_path}/<name>.dates.npy', mmap_mode='r')` (datetime64[D]) "
+            "and `<name>.values.npy` (float64). Use it instead of inventing historical figures; the directory is read-only."
+        )
+    if CODE_EXECUTOR_BACKEND == "jupyter":
+        system_message += (
+            " Code blocks run in a persistent session: imports, variables and DataFrames from earlier blocks remain available, "
+            "so build on previous results instead of recomputing them."
+        )
 
     description = "Code Writer Agent: Writes commented Python code (using only standard Python or libraries available in jupyter/scipy-notebook like Pandas, NumPy, SciPy, etc.) in markdown for financial calculations. Any code generated should be run next by the code executor agent to get the output/results."
 
-    model_client = OpenAIChatCompletionClient(
-        model="gpt-4o", timeout=60, temperature=0.0
-    )
+    model_client = get_openai_model_client()
 
     code_writer_agent = await create_agent(
         name="code_writer_agent",
@@ -259,39 +230,43 @@ async def create_code_writer_agent(shared_memory: ListMemory = None):
     return code_writer_agent
 
 
-async def create_financial_advisor_agent(shared_memory: ListMemory = None):
+async def create_financial_advisor_agent(
+    shared_memory: ListMemory = None, tools: list = None
+):
     current_date = get_current_date()
 
     system_message = (
         f"You are a professional financial advisor. Today is {current_date}. Carefully review all the messages and synthesize information (from user, search, code execution if available) to provide clear, **actionable recommendations**. "
         "**Explain your reasoning, potential risks, and limitations clearly.** Base your advice on available data, making reasonable assumptions for missing details. Do not ask follow-up questions. "
-        "Consult shared memory for the client's financial profile to personalize advice."
+        "Consult shared memory for the client's financial profile to personalize advice. "
+        "For standard calculations (compound growth, loan amortization, future and present values, NPV/IRR, inflation adjustment, savings rate) call your calculator tools directly instead of estimating. "
+        "For retirement and 'will my money last' questions, run the retirement Monte Carlo tool and report the success probability and percentile bands. "
+        "Use the income tax and contribution limit tools for federal brackets, standard deductions, supported state taxes and 401(k)/IRA/HSA limits instead of searching for them. "
+        "For allocation recommendations, run the portfolio optimizer with the client's risk tolerance and time horizon rather than asking for optimization code."
     )
 
-    description = "Financial Advisor Agent: Analyzes all available information to provide synthesized, actionable financial advice, explaining risks and reasoning. Considers client profile."
+    description = "Financial Advisor Agent: Analyzes all available information to provide synthesized, actionable financial advice, explaining risks and reasoning. Considers client profile. Has built-in calculator tools for compound interest, loan amortization, future/present value, NPV/IRR, inflation adjustment and savings rate, plus a fast Monte Carlo retirement simulation, federal/state income tax tables, retirement contribution limits and a portfolio optimizer (mean-variance, risk parity, efficient frontier), so these calculations do not need the code writer."
 
-    model_client = OpenAIChatCompletionClient(
-        model="gpt-4o", timeout=60, temperature=0.0
-    )
+    model_client = get_openai_model_client()
 
     financial_advisor_agent = await create_agent(
         name="financial_advisor_agent",
         model_client=model_client,
         system_message=system_message,
         description=description,
+        tools=tools or CALCULATOR_TOOLS,
+        reflect_on_tool_use=True,
         shared_memory=shared_memory,
     )
 
     return financial_advisor_agent
 
 
-async def create_financial_team(
-    perplexity_api_key: str,
-    anthropic_api_key: str,
+async def create_profile_memory(
     risk_tolerance: str = None,
     time_horizon: str = None,
     annual_gross_income: float = None,
-):
+) -> ListMemory:
     shared_memory = ListMemory(name="financial_profile")
 
     profile_items = []
@@ -307,43 +282,165 @@ async def create_financial_team(
         await shared_memory.add(
             MemoryContent(content=financial_profile, mime_type="text/plain")
         )
+    return shared_memory
 
-    web_search_agent = await create_web_search_agent(
-        perplexity_api_key, shared_memory=shared_memory
-    )
-    code_writer_agent = await create_code_writer_agent(shared_memory=shared_memory)
-    code_executor_agent, code_executor = await create_code_executor_agent()
-    financial_advisor_agent = await create_financial_advisor_agent(
-        shared_memory=shared_memory
-    )
 
-    anthropic_orchestrator = AnthropicChatCompletion(
-        ai_model_id="claude-3-5-sonnet-20241022", api_key=anthropic_api_key
-    )
-    orchestrator_settings = AnthropicChatPromptExecutionSettings(
-        temperature=0.0, max_tokens=4096
-    )
-    sk_kernel_orchestrator = Kernel(memory=NullMemory())
-    claude_orchestrator_client = SKChatCompletionAdapter(
-        anthropic_orchestrator,
-        kernel=sk_kernel_orchestrator,
-        prompt_settings=orchestrator_settings,
-    )
+class TeamTemplate:
+    """
+    The parts of the financial team shared by every session, built once:
+    the stateless tools, whose argument schemas are expensive to generate.
+    Model clients come from the process registry. ``instantiate`` then only
+    creates the per-session agents, with their own message history and
+    profile memory.
+    """
+
+    def __init__(self):
+        self.calculator_tools = [
+            FunctionTool(tool, description=tool.__doc__) for tool in CALCULATOR_TOOLS
+        ]
+        self.market_data_tools = [
+            FunctionTool(tool, description=tool.__doc__) for tool in MARKET_DATA_TOOLS
+        ]
+        self.instances = 0
+
+    async def instantiate(
+        self,
+        perplexity_api_key: str,
+        anthropic_api_key: str,
+        risk_tolerance: str = None,
+        time_horizon: str = None,
+        annual_gross_income: float = None,
+        on_search_progress: SearchProgressCallback = None,
+        executor_pool: ExecutorPool = None,
+        fanout: bool = PARALLEL_FANOUT,
+    ):
+        shared_memory = await create_profile_memory(
+            risk_tolerance, time_horizon, annual_gross_income
+        )
+
+        web_search_agent = await create_web_search_agent(
+            perplexity_api_key,
+            shared_memory=shared_memory,
+            on_search_progress=on_search_progress,
+            market_data_tools=self.market_data_tools,
+        )
+        code_writer_agent = await create_code_writer_agent(shared_memory=shared_memory)
+        if executor_pool is not None:
+            code_executor_agent, code_executor = await create_code_executor_agent(
+                code_executor=await executor_pool.acquire()
+            )
+        else:
+            code_executor_agent, code_executor = await create_code_executor_agent()
+        # The executor is the caller's to release only once the team is
+        # returned; until then it goes back to the pool on any error.
+        try:
+            financial_advisor_agent = await create_financial_advisor_agent(
+                shared_memory=shared_memory, tools=self.calculator_tools
+            )
+
+            claude_orchestrator_client = get_orchestrator_model_client(
+                anthropic_api_key
+            )
+
+            budget = RunBudget()
+            termination_condition = budget.termination_condition()
+
+            team = MagenticOneGroupChat(
+                participants=[
+                    web_search_agent,
+                    code_writer_agent,
+                    code_executor_agent,
+                    financial_advisor_agent,
+                ],
+                termination_condition=termination_condition,
+                model_client=claude_orchestrator_client,
+            )
+            if fanout:
+                # Inside the budget, so fanned-out runs are held to it too.
+                team = FanOutTeam(
+                    team,
+                    planner_client=claude_orchestrator_client,
+                    agent_factories={
+                        WEB_SEARCH: lambda: create_web_search_agent(
+                            perplexity_api_key,
+                            shared_memory=shared_memory,
+                            on_search_progress=on_search_progress,
+                            market_data_tools=self.market_data_tools,
+                        ),
+                        CODE_WRITER: lambda: create_code_writer_agent(
+                            shared_memory=shared_memory
+                        ),
+                    },
+                    code_executor_agent=code_executor_agent,
+                    advisor=financial_advisor_agent,
+                    termination_condition=termination_condition,
+                )
+            team = BudgetedTeam(
+                team,
+                budget,
+                advisor_factory=lambda: create_financial_advisor_agent(
+                    shared_memory=shared_memory, tools=self.calculator_tools
+                ),
+            )
+        except BaseException:
+            if executor_pool is not None:
+                await executor_pool.release(code_executor)
+            else:
+                await code_executor.stop()
+            raise
+        self.instances += 1
+
+        return team, code_executor
+
+    async def instantiate_advisor(
+        self,
+        risk_tolerance: str = None,
+        time_horizon: str = None,
+        annual_gross_income: float = None,
+    ) -> AssistantAgent:
+        """
+        The financial advisor alone, with its calculator tools and the
+        client's profile, for queries that need no research or code.
+        """
+        shared_memory = await create_profile_memory(
+            risk_tolerance, time_horizon, annual_gross_income
+        )
+        tools = self.calculator_tools
+        if market_data.available():
+            tools = tools + self.market_data_tools
+        return await create_financial_advisor_agent(
+            shared_memory=shared_memory, tools=tools
+        )
+
+
+_team_template: TeamTemplate | None = None
+
+
+def get_team_template() -> TeamTemplate:
+    global _team_template
+    if _team_template is None:
+        _team_template = TeamTemplate()
+    return _team_template
 
-    termination_condition = MaxMessageTermination(max_messages=30)
-
-    team = MagenticOneGroupChat(
-        participants=[
-            web_search_agent,
-            code_writer_agent,
-            code_executor_agent,
-            financial_advisor_agent,
-        ],
-        termination_condition=termination_condition,
-        model_client=claude_orchestrator_client,
-    )
 
-    return team, code_executor
+async def create_financial_team(
+    perplexity_api_key: str,
+    anthropic_api_key: str,
+    risk_tolerance: str = None,
+    time_horizon: str = None,
+    annual_gross_income: float = None,
+    on_search_progress: SearchProgressCallback = None,
+    executor_pool: ExecutorPool = None,
+):
+    return await get_team_template().instantiate(
+        perplexity_api_key,
+        anthropic_api_key,
+        risk_tolerance=risk_tolerance,
+        time_horizon=time_horizon,
+        annual_gross_income=annual_gross_income,
+        on_search_progress=on_search_progress,
+        executor_pool=executor_pool,
+    )
 
 
 async def test_web_search_agent():
@@ -546,7 +643,7 @@ async def run_all_tests():
         # Test perplexity_search function
         logger.info("Testing perplexity_search function...")
         query = "What are the current best practices for retirement savings?"
-        result = perplexity_search(query, PERPLEXITY_API_KEY)
+        result = await perplexity_search(query, PERPLEXITY_API_KEY)
         print(result)
 
         print("\n---\n")
@@ -582,6 +679,9 @@ async def run_all_tests():
     except Exception as e:
         logger.exception("Error during tests: %s", e)
         raise
+    finally:
+        await aclose_model_clients()
+        await aclose_http_clients()
 
 
 if __name__ == "__main__":
@@ -1,15 +1,93 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager, suppress
 from typing import AsyncGenerator
 
+from autogen_agentchat.base import TaskResult
 from autogen_agentchat.messages import TextMessage
 from autogen_core import CancellationToken
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import HTMLResponse, StreamingResponse
 
-from financial_planner import ANTHROPIC_API_KEY, PERPLEXITY_API_KEY
-from financial_planner.agents_team import create_financial_team, format_enhanced_query
-from financial_planner.render_utils import stringify_event
-
-app = FastAPI()
+from financial_planner import (
+    ANTHROPIC_API_KEY,
+    CODE_EXECUTOR_POOL_ACQUIRE_TIMEOUT,
+    CODE_EXECUTOR_POOL_HEALTH_INTERVAL,
+    CODE_EXECUTOR_POOL_MAX_SIZE,
+    CODE_EXECUTOR_POOL_MIN_SIZE,
+    PERPLEXITY_API_KEY,
+    SEARCH_CACHE_PRUNE_INTERVAL,
+)
+from financial_planner.agents_team import (
+    create_financial_team,
+    format_enhanced_query,
+    get_team_template,
+)
+from financial_planner.budgets import budget_stats
+from financial_planner.clients import (
+    aclose_http_clients,
+    aclose_model_clients,
+    model_client_stats,
+)
+from financial_planner.code_executors import (
+    executor_startup_stats,
+    reset_code_executor,
+    start_code_executor,
+)
+from financial_planner.context_compaction import (
+    compaction_stats,
+    get_encoding,
+    track_compaction_run,
+)
+from financial_planner.execution_cache import execution_cache
+from financial_planner.executor_pool import ExecutorPool
+from financial_planner.fanout import fanout_stats
+from financial_planner.llm_cache import response_cache_stats
+from financial_planner.market_data import market_data
+from financial_planner.rate_limiter import rate_limiters
+from financial_planner.render_utils import stringify_event, stringify_search_progress
+from financial_planner.router import (
+    ROUTE_AGENT,
+    ROUTE_TOOL,
+    route_and_log,
+    router_stats,
+)
+from financial_planner.sandbox_executor import warm_interpreters
+from financial_planner.web_search import search_cache, search_flights, search_store
+
+logger = logging.getLogger(__name__)
+
+code_executor_pool = ExecutorPool(
+    factory=start_code_executor,
+    reset=reset_code_executor,
+    min_size=CODE_EXECUTOR_POOL_MIN_SIZE,
+    max_size=CODE_EXECUTOR_POOL_MAX_SIZE,
+    acquire_timeout=CODE_EXECUTOR_POOL_ACQUIRE_TIMEOUT,
+    health_check_interval=CODE_EXECUTOR_POOL_HEALTH_INTERVAL,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if search_store is not None:
+        search_store.start_pruning(SEARCH_CACHE_PRUNE_INTERVAL)
+    get_team_template()
+    # Warm the executor pool and load the tokenizer without holding up startup.
+    pool_start = asyncio.create_task(code_executor_pool.start())
+    tokenizer_load = asyncio.create_task(asyncio.to_thread(get_encoding))
+    yield
+    pool_start.cancel()
+    tokenizer_load.cancel()
+    await code_executor_pool.close()
+    await warm_interpreters.close()
+    if search_store is not None:
+        search_store.stop_pruning()
+    await aclose_model_clients()
+    await aclose_http_clients()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -654,6 +732,14 @@ async def index():
 
                     const chunk = decoder.decode(value, { stream: true });
                     outputEl.insertAdjacentHTML('beforeend', chunk);
+                    outputEl.querySelectorAll('template[data-progress-target]').forEach((tpl) => {
+                        const target = document.getElementById(tpl.dataset.progressTarget);
+                        if (target) {
+                            target.append(tpl.content.textContent);
+                            target.scrollTop = target.scrollHeight;
+                        }
+                        tpl.remove();
+                    });
                     outputEl.scrollTop = outputEl.scrollHeight;
                 }
 
@@ -676,6 +762,33 @@ async def index():
 """
 
 
+@app.get("/stats")
+async def stats():
+    return {
+        "search_cache": search_cache.stats(),
+        "search_single_flight": search_flights.stats(),
+        "code_executor_pool": code_executor_pool.stats(),
+        "code_executor_startup": executor_startup_stats(),
+        "sandbox_interpreters": warm_interpreters.stats(),
+        "execution_cache": execution_cache.stats(),
+        "market_data": market_data.stats(),
+        "model_clients": model_client_stats(),
+        "llm_cache": response_cache_stats(),
+        "router": router_stats.stats(),
+        "fanout": fanout_stats.stats(),
+        "budgets": budget_stats.stats(),
+        "context_compaction": compaction_stats.stats(),
+        "rate_limiters": {
+            name: limiter.stats() for name, limiter in rate_limiters.items()
+        },
+        "search_store": (
+            await asyncio.to_thread(search_store.stats)
+            if search_store is not None
+            else None
+        ),
+    }
+
+
 @app.post("/infer")
 async def infer(request: Request):
     code_executor = None
@@ -716,18 +829,58 @@ async def infer(request: Request):
                 status_code=500, detail="Anthropic API key not configured."
             )
 
-        team, code_executor = await create_financial_team(
-            perplexity_api_key=PERPLEXITY_API_KEY,
-            anthropic_api_key=ANTHROPIC_API_KEY,
-            risk_tolerance=risk_tolerance,
-            time_horizon=time_horizon,
-            annual_gross_income=annual_gross_income,
-        )
+        # Team events and streamed search progress share one output queue;
+        # None marks the end of the team run.
+        output_queue: asyncio.Queue[str | None] = asyncio.Queue()
+        progress_ids: dict[str, str] = {}
+
+        async def on_search_progress(search_query: str, text: str) -> None:
+            first = search_query not in progress_ids
+            if first:
+                progress_ids[search_query] = f"search-progress-{len(progress_ids) + 1}"
+            await output_queue.put(
+                stringify_search_progress(
+                    progress_ids[search_query], search_query, text, first
+                )
+            )
 
-        async def event_generator() -> AsyncGenerator[str, None]:
-            cancellation_token = CancellationToken()
+        decision = route_and_log(query)
+        if decision.route == ROUTE_TOOL:
+            runner = None
+        elif decision.route == ROUTE_AGENT:
+            runner = await get_team_template().instantiate_advisor(
+                risk_tolerance, time_horizon, annual_gross_income
+            )
+        else:
+            runner, code_executor = await create_financial_team(
+                perplexity_api_key=PERPLEXITY_API_KEY,
+                anthropic_api_key=ANTHROPIC_API_KEY,
+                risk_tolerance=risk_tolerance,
+                time_horizon=time_horizon,
+                annual_gross_income=annual_gross_income,
+                on_search_progress=on_search_progress,
+                executor_pool=code_executor_pool,
+            )
+
+        async def run_team(cancellation_token: CancellationToken) -> None:
+            started = time.perf_counter()
+            compaction = track_compaction_run()
             try:
-                async for event in team.run_stream(
+                if runner is None:
+                    # Answered by a calculator while routing; no model calls.
+                    answer = TextMessage(
+                        content=decision.answer, source="financial_advisor_agent"
+                    )
+                    calculator = decision.reason.replace("_", " ")
+                    result = TaskResult(
+                        messages=[answer],
+                        stop_reason=f"Answered directly by the {calculator} calculator",
+                    )
+                    await output_queue.put(stringify_event(answer))
+                    await output_queue.put(stringify_event(result))
+                    return
+
+                async for event in runner.run_stream(
                     task=[TextMessage(content=enhanced_query, source="user")],
                     cancellation_token=cancellation_token,
                 ):
@@ -742,17 +895,40 @@ async def infer(request: Request):
 
                     stringified = stringify_event(event)
                     if stringified:
-                        yield stringified
+                        await output_queue.put(stringified)
 
             except Exception as e:
-                yield f"""<div class='event-block event-error'>
+                await output_queue.put(
+                    f"""<div class='event-block event-error'>
                              <div class='event-meta'><i class='bi bi-exclamation-octagon-fill me-2'></i>Processing Error</div>
                              <div class='event-content'>An error occurred during analysis: {str(e)}</div>
                           </div>"""
+                )
+
+            finally:
+                elapsed = time.perf_counter() - started
+                router_stats.record_run(decision.route, elapsed)
+                logger.info(
+                    f"Finished {decision.route} run in {elapsed:.2f} s; context "
+                    f"compaction saved {compaction.tokens_saved} prompt tokens"
+                )
+                await output_queue.put(None)
+
+        async def event_generator() -> AsyncGenerator[str, None]:
+            cancellation_token = CancellationToken()
+            team_task = asyncio.create_task(run_team(cancellation_token))
+            try:
+                while (chunk := await output_queue.get()) is not None:
+                    yield chunk
 
             finally:
+                if not team_task.done():
+                    cancellation_token.cancel()
+                    team_task.cancel()
+                    with suppress(asyncio.CancelledError):
+                        await team_task
                 if code_executor:
-                    await code_executor.stop()
+                    await code_executor_pool.release(code_executor)
 
         return StreamingResponse(event_generator(), media_type="text/html")
 
@@ -0,0 +1,315 @@
+"""
+Message, token, cost and wall-clock budgets for team runs.
+
+The team stops on whichever budget runs out first, through termination
+conditions combined with ``|``. Token and cost budgets count the
+``models_usage`` of the agents' messages: model clients are shared across
+requests, so their own usage counters cannot be attributed to one run.
+The MagenticOne orchestrator's own calls are not included. The fan-out
+planning call is included when the run fans out, since its usage rides
+on the plan message; when the plan falls back to the team, it is not.
+
+When a budget stops the run, ``BudgetedTeam`` asks a fresh financial advisor
+for the best answer it can give from the conversation so far, instead of
+ending without one.
+"""
+
+import asyncio
+import logging
+import time
+from typing import AsyncGenerator, Awaitable, Callable, Sequence
+
+from autogen_agentchat.base import ChatAgent, TaskResult, Team, TerminationCondition
+from autogen_agentchat.conditions import (
+    MaxMessageTermination,
+    TimeoutTermination,
+    TokenUsageTermination,
+)
+from autogen_agentchat.messages import BaseChatMessage, StopMessage, TextMessage
+from autogen_core import CancellationToken
+
+from financial_planner import (
+    MODEL_COMPLETION_PRICE_PER_MTOK,
+    MODEL_PROMPT_PRICE_PER_MTOK,
+    TEAM_DEADLINE_GRACE_SECONDS,
+    TEAM_MAX_COST_USD,
+    TEAM_MAX_MESSAGES,
+    TEAM_MAX_TOTAL_TOKENS,
+    TEAM_TIMEOUT_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+PARTIAL_ANSWER_PROMPT = (
+    "The team had to stop before finishing: {reason}. "
+    "Using only the information gathered above, give the best answer you can now. "
+    "Say clearly which parts are incomplete or rest on assumptions, and do not ask follow-up questions."
+)
+
+
+def message_usage(messages: Sequence) -> tuple[int, int]:
+    """
+    Prompt and completion tokens reported on ``messages``.
+    """
+    prompt_tokens = completion_tokens = 0
+    for message in messages:
+        usage = getattr(message, "models_usage", None)
+        if usage is not None:
+            prompt_tokens += usage.prompt_tokens
+            completion_tokens += usage.completion_tokens
+    return prompt_tokens, completion_tokens
+
+
+def estimate_cost(prompt_tokens: int, completion_tokens: int) -> float:
+    return (
+        prompt_tokens * MODEL_PROMPT_PRICE_PER_MTOK
+        + completion_tokens * MODEL_COMPLETION_PRICE_PER_MTOK
+    ) / 1_000_000
+
+
+class CostTermination(TerminationCondition):
+    """
+    Stops once the estimated cost of the messages' model usage reaches
+    ``max_cost`` dollars.
+    """
+
+    def __init__(self, max_cost: float):
+        self.max_cost = max_cost
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._terminated = False
+
+    @property
+    def terminated(self) -> bool:
+        return self._terminated
+
+    async def __call__(self, messages: Sequence) -> StopMessage | None:
+        prompt_tokens, completion_tokens = message_usage(messages)
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        cost = estimate_cost(self.prompt_tokens, self.completion_tokens)
+        if cost >= self.max_cost:
+            self._terminated = True
+            return StopMessage(
+                content=f"Cost budget of ${self.max_cost:.2f} reached "
+                f"(estimated ${cost:.2f})",
+                source="CostTermination",
+            )
+        return None
+
+    async def reset(self) -> None:
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._terminated = False
+
+
+class BudgetCondition(TerminationCondition):
+    """
+    A named budget that remembers it stopped the run; teams reset their
+    termination conditions as soon as a run stops.
+    """
+
+    def __init__(self, name: str, condition: TerminationCondition):
+        self.name = name
+        self.condition = condition
+        self.fired = False
+
+    @property
+    def terminated(self) -> bool:
+        return self.condition.terminated
+
+    async def __call__(self, messages: Sequence) -> StopMessage | None:
+        stop_message = await self.condition(messages)
+        if stop_message is not None:
+            self.fired = True
+        return stop_message
+
+    async def reset(self) -> None:
+        await self.condition.reset()
+
+
+class RunBudget:
+    """
+    The budgets of one team run; a budget of 0 is disabled.
+    """
+
+    def __init__(
+        self,
+        max_messages: int = TEAM_MAX_MESSAGES,
+        max_total_tokens: int = TEAM_MAX_TOTAL_TOKENS,
+        max_cost: float = TEAM_MAX_COST_USD,
+        timeout_seconds: float = TEAM_TIMEOUT_SECONDS,
+        deadline_grace_seconds: float = TEAM_DEADLINE_GRACE_SECONDS,
+    ):
+        self.timeout_seconds = timeout_seconds
+        self.deadline_grace_seconds = deadline_grace_seconds
+        conditions = [
+            ("messages", max_messages, MaxMessageTermination),
+            ("tokens", max_total_tokens, TokenUsageTermination),
+            ("cost", max_cost, CostTermination),
+            ("deadline", timeout_seconds, TimeoutTermination),
+        ]
+        self.conditions = [
+            BudgetCondition(name, factory(limit))
+            for name, limit, factory in conditions
+            if limit
+        ]
+
+    def termination_condition(self) -> TerminationCondition | None:
+        combined = None
+        for condition in self.conditions:
+            combined = condition if combined is None else combined | condition
+        return combined
+
+    async def start(self) -> None:
+        # Restart the clock and counters for this run.
+        for condition in self.conditions:
+            condition.fired = False
+            await condition.reset()
+
+    def exhausted(self) -> str | None:
+        return next((c.name for c in self.conditions if c.fired), None)
+
+    def hard_deadline(self, started: float) -> float | None:
+        """
+        A deadline condition is only checked between agent turns, so a run
+        still going ``deadline_grace_seconds`` after the deadline is cut off.
+        """
+        if not self.timeout_seconds:
+            return None
+        return started + self.timeout_seconds + self.deadline_grace_seconds
+
+
+class BudgetStats:
+    def __init__(self):
+        self.runs = 0
+        self.exhausted: dict[str, int] = {}
+        self.partial_answers = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, messages: Sequence, exhausted: str | None) -> None:
+        self.runs += 1
+        if exhausted:
+            self.exhausted[exhausted] = self.exhausted.get(exhausted, 0) + 1
+        prompt_tokens, completion_tokens = message_usage(messages)
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "exhausted": dict(self.exhausted),
+            "partial_answers": self.partial_answers,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "estimated_cost_usd": round(
+                estimate_cost(self.prompt_tokens, self.completion_tokens), 4
+            ),
+        }
+
+
+budget_stats = BudgetStats()
+
+
+class BudgetedTeam:
+    """
+    Runs ``team`` under ``budget``. If a budget stops the run, a fresh
+    advisor from ``advisor_factory`` writes a partial answer from the
+    messages so far, which ends the stream in place of the team's result.
+    """
+
+    def __init__(
+        self,
+        team: Team,
+        budget: RunBudget,
+        advisor_factory: Callable[[], Awaitable[ChatAgent]],
+    ):
+        self.team = team
+        self.budget = budget
+        self.advisor_factory = advisor_factory
+
+    async def run_stream(
+        self,
+        *,
+        task: str | BaseChatMessage | Sequence[BaseChatMessage],
+        cancellation_token: CancellationToken | None = None,
+    ) -> AsyncGenerator:
+        if cancellation_token is None:
+            cancellation_token = CancellationToken()
+        # Cancelled on the hard deadline without cancelling the partial answer.
+        team_token = CancellationToken()
+        cancellation_token.add_callback(team_token.cancel)
+
+        await self.budget.start()
+        started = time.monotonic()
+        deadline = self.budget.hard_deadline(started)
+        messages, result, exhausted = [], None, None
+        stream = self.team.run_stream(task=task, cancellation_token=team_token)
+        try:
+            while True:
+                timeout = None if deadline is None else deadline - time.monotonic()
+                try:
+                    event = await asyncio.wait_for(stream.__anext__(), timeout)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    team_token.cancel()
+                    exhausted = "deadline"
+                    logger.warning(
+                        f"Team run cut off {time.monotonic() - started:.0f} s after start"
+                    )
+                    break
+                if isinstance(event, TaskResult):
+                    result = event
+                    break
+                messages.append(event)
+                yield event
+        finally:
+            await stream.aclose()
+
+        exhausted = exhausted or self.budget.exhausted()
+        budget_stats.record(messages, exhausted)
+        if exhausted is None:
+            if result is not None:
+                yield result
+            return
+
+        reason = (
+            result.stop_reason
+            if result is not None and result.stop_reason
+            else f"the {exhausted} budget ran out"
+        )
+        logger.info(f"Team run stopped by its {exhausted} budget: {reason}")
+        async for event in self.partial_answer(messages, reason, cancellation_token):
+            messages.append(event)
+            yield event
+        yield TaskResult(messages=messages, stop_reason=f"{reason}; partial answer")
+
+    async def partial_answer(
+        self,
+        messages: list,
+        reason: str,
+        cancellation_token: CancellationToken,
+    ) -> AsyncGenerator:
+        budget_stats.partial_answers += 1
+        advisor = await self.advisor_factory()
+        transcript = [
+            message
+            for message in messages
+            if isinstance(message, BaseChatMessage)
+            and not isinstance(message, StopMessage)
+        ]
+        task = [
+            *transcript,
+            TextMessage(
+                content=PARTIAL_ANSWER_PROMPT.format(reason=reason), source="user"
+            ),
+        ]
+        # run_stream echoes its input messages first; skip them.
+        async for event in advisor.run_stream(
+            task=task, cancellation_token=cancellation_token
+        ):
+            if isinstance(event, TaskResult) or any(event is m for m in task):
+                continue
+            yield event
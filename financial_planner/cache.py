@@ -0,0 +1,269 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """
+    In-process cache bounded by entry count and approximate size in bytes,
+    with LRU eviction and an optional per-entry TTL.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int | None = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[Any, int, float | None]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, size: int, ttl: float | None = None) -> None:
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SQLiteCache:
+    """
+    JSON key/value cache persisted in a SQLite database in WAL mode, so several
+    processes can read and write it concurrently and entries survive restarts.
+
+    Each thread uses its own connection; call the blocking methods through
+    ``asyncio.to_thread`` from async code.
+    """
+
+    def __init__(self, path: str, namespace: str, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.namespace = namespace
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._prune_stop: threading.Event | None = None
+        self._prune_thread: threading.Thread | None = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.pruned = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)"
+        )
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> tuple[Any, float | None] | None:
+        """
+        Return ``(value, expires_at)`` for a live entry, or None.
+        """
+        row = (
+            self._connection()
+            .execute(
+                "SELECT value, expires_at FROM cache "
+                "WHERE namespace = ? AND key = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (self.namespace, key, time.time()),
+            )
+            .fetchone()
+        )
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        payload = json.dumps(value)
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache "
+                "(namespace, key, value, size, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, payload, len(payload), now, expires_at),
+            )
+        self.writes += 1
+
+    def prune_expired(self) -> int:
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),),
+            )
+        self.pruned += cursor.rowcount
+        return cursor.rowcount
+
+    def evict_to(
+        self, max_entries: int | None = None, max_bytes: int | None = None
+    ) -> int:
+        """
+        Delete this namespace's oldest entries until it holds at most
+        ``max_entries`` entries and ``max_bytes`` bytes.
+        """
+        limits, params = [], [self.namespace, self.namespace]
+        if max_entries is not None:
+            limits.append("position > ?")
+            params.append(max_entries)
+        if max_bytes is not None:
+            limits.append("total > ?")
+            params.append(max_bytes)
+        if not limits:
+            return 0
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                " SELECT key FROM ("
+                "  SELECT key,"
+                "   ROW_NUMBER() OVER (ORDER BY created_at DESC, key) AS position,"
+                "   SUM(size) OVER (ORDER BY created_at DESC, key) AS total"
+                "  FROM cache WHERE namespace = ?"
+                f" ) WHERE {' OR '.join(limits)}"
+                ")",
+                params,
+            )
+        self.evictions += cursor.rowcount
+        return cursor.rowcount
+
+    def start_pruning(self, interval: float) -> None:
+        if self._prune_thread is not None and self._prune_thread.is_alive():
+            return
+        self._prune_stop = threading.Event()
+        self._prune_thread = threading.Thread(
+            target=self._prune_loop,
+            args=(interval, self._prune_stop),
+            name=f"{self.namespace}-cache-pruner",
+            daemon=True,
+        )
+        self._prune_thread.start()
+
+    def stop_pruning(self) -> None:
+        if self._prune_stop is not None:
+            self._prune_stop.set()
+        if self._prune_thread is not None:
+            self._prune_thread.join(timeout=5)
+        self._prune_thread = None
+
+    def _prune_loop(self, interval: float, stop: threading.Event) -> None:
+        while not stop.wait(interval):
+            try:
+                removed = self.prune_expired()
+                if removed:
+                    logger.info(
+                        f"Pruned {removed} expired '{self.namespace}' cache entries"
+                    )
+            except sqlite3.Error as e:
+                logger.warning(f"Error pruning '{self.namespace}' cache: {e}")
+
+    def stats(self) -> dict:
+        entries, size = (
+            self._connection()
+            .execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache WHERE namespace = ?",
+                (self.namespace,),
+            )
+            .fetchone()
+        )
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "pruned": self.pruned,
+            "evictions": self.evictions,
+        }
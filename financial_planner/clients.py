@@ -0,0 +1,198 @@
+import hashlib
+import inspect
+import logging
+
+import httpx
+from anthropic import AsyncAnthropic
+from autogen_core.models import ChatCompletionClient
+from autogen_ext.models.openai import OpenAIChatCompletionClient
+from autogen_ext.models.semantic_kernel import SKChatCompletionAdapter
+from semantic_kernel import Kernel
+from semantic_kernel.connectors.ai.anthropic import (
+    AnthropicChatCompletion,
+    AnthropicChatPromptExecutionSettings,
+)
+from semantic_kernel.memory.null_memory import NullMemory
+
+from financial_planner import (
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    PERPLEXITY_TIMEOUT,
+)
+from financial_planner.llm_cache import with_response_cache
+from financial_planner.rate_limiter import (
+    TokenBucket,
+    get_rate_limiter,
+    parse_retry_after,
+)
+
+logger = logging.getLogger(__name__)
+
+# The OpenAI and Anthropic SDKs pass their own per-request timeouts; this is
+# only the fallback for requests that do not.
+SDK_DEFAULT_TIMEOUT = 600.0
+
+_http_clients: dict[str, httpx.AsyncClient] = {}
+_model_clients: dict[tuple, ChatCompletionClient] = {}
+model_client_lookups = {"created": 0, "reused": 0}
+
+
+def create_http_client(
+    timeout: float, rate_limiter: TokenBucket | None = None
+) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    event_hooks = {}
+    if rate_limiter is not None:
+
+        async def wait_for_rate_limit(request: httpx.Request) -> None:
+            await rate_limiter.acquire()
+
+        async def record_rate_limit(response: httpx.Response) -> None:
+            if response.status_code == 429:
+                retry_after = parse_retry_after(response.headers.get("retry-after"))
+                rate_limiter.block_for(retry_after if retry_after is not None else 1.0)
+
+        event_hooks = {
+            "request": [wait_for_rate_limit],
+            "response": [record_rate_limit],
+        }
+
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=httpx.Timeout(timeout, connect=HTTP_CONNECT_TIMEOUT),
+        event_hooks=event_hooks,
+    )
+
+
+def get_http_client(name: str) -> httpx.AsyncClient:
+    """
+    Return the process-wide keep-alive client for one external API. OpenAI and
+    Anthropic requests wait on that API's shared rate limiter before sending.
+    """
+    client = _http_clients.get(name)
+    if client is None or client.is_closed:
+        if name == "perplexity":
+            # Perplexity requests acquire the limiter themselves so they can
+            # back off per attempt.
+            client = create_http_client(PERPLEXITY_TIMEOUT)
+        else:
+            client = create_http_client(SDK_DEFAULT_TIMEOUT, get_rate_limiter(name))
+        _http_clients[name] = client
+    return client
+
+
+def get_perplexity_http_client() -> httpx.AsyncClient:
+    return get_http_client("perplexity")
+
+
+async def aclose_http_clients() -> None:
+    for name, client in list(_http_clients.items()):
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"Error closing HTTP client '{name}': {e}")
+    _http_clients.clear()
+
+
+def _registered_model_client(key: tuple, factory) -> ChatCompletionClient:
+    client = _model_clients.get(key)
+    if client is None:
+        client = factory()
+        _model_clients[key] = client
+        model_client_lookups["created"] += 1
+    else:
+        model_client_lookups["reused"] += 1
+    return client
+
+
+def get_openai_model_client(
+    model: str = "gpt-4o", timeout: float = 60, temperature: float = 0.0
+) -> ChatCompletionClient:
+    """
+    Return the process-wide OpenAI model client for these settings. Clients
+    hold no conversation state, so every agent and request can share one.
+    """
+    return _registered_model_client(
+        ("openai", model, timeout, temperature),
+        lambda: with_response_cache(
+            OpenAIChatCompletionClient(
+                model=model,
+                timeout=timeout,
+                temperature=temperature,
+                http_client=get_http_client("openai"),
+            ),
+            {"provider": "openai", "model": model, "temperature": temperature},
+        ),
+    )
+
+
+def get_orchestrator_model_client(
+    api_key: str,
+    model: str = "claude-3-5-sonnet-20241022",
+    temperature: float = 0.0,
+    max_tokens: int = 4096,
+) -> ChatCompletionClient:
+    """
+    Return the process-wide Claude orchestrator client (an Anthropic chat
+    completion service behind a Semantic Kernel adapter) for this API key.
+    """
+    # Keyed by a digest so the registry never holds keys in plain text.
+    key_digest = hashlib.sha256(api_key.encode()).hexdigest()
+
+    def create() -> ChatCompletionClient:
+        anthropic_chat_completion = AnthropicChatCompletion(
+            ai_model_id=model,
+            api_key=api_key,
+            async_client=AsyncAnthropic(
+                api_key=api_key, http_client=get_http_client("anthropic")
+            ),
+        )
+        adapter = SKChatCompletionAdapter(
+            anthropic_chat_completion,
+            kernel=Kernel(memory=NullMemory()),
+            prompt_settings=AnthropicChatPromptExecutionSettings(
+                temperature=temperature, max_tokens=max_tokens
+            ),
+        )
+        # The API key is left out so cached responses survive key rotation.
+        return with_response_cache(
+            adapter,
+            {
+                "provider": "anthropic",
+                "model": model,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+            },
+        )
+
+    return _registered_model_client(
+        ("anthropic", model, temperature, max_tokens, key_digest), create
+    )
+
+
+def model_client_stats() -> dict:
+    return {"clients": len(_model_clients), **model_client_lookups}
+
+
+async def aclose_model_clients() -> None:
+    """
+    Close the registered model clients. Their HTTP connections belong to the
+    shared HTTP clients, which ``aclose_http_clients`` closes.
+    """
+    for key, client in list(_model_clients.items()):
+        close = getattr(client, "close", None)
+        if close is None:
+            continue
+        try:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.warning(f"Error closing model client '{key[0]}:{key[1]}': {e}")
+    _model_clients.clear()
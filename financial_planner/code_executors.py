@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from pathlib import Path
+
+from autogen_core import CancellationToken
+from autogen_core.code_executor import CodeBlock, CodeExecutor
+from autogen_ext.code_executors.docker import DockerCommandLineCodeExecutor
+
+from financial_planner import (
+    CODE_EXECUTOR_BACKEND,
+    CODE_EXECUTOR_IMAGE,
+    CODE_EXECUTOR_INIT_COMMAND,
+    CODE_EXECUTOR_READY_TIMEOUT,
+    MARKET_DATA_DIR,
+    MARKET_DATA_MOUNT_PATH,
+)
+from financial_planner.kernel_executor import KernelCodeExecutor
+from financial_planner.market_data import META_FILE
+from financial_planner.sandbox_executor import SandboxCodeExecutor
+
+logger = logging.getLogger(__name__)
+
+# Clears the mounted workspace and confirms the interpreter still runs.
+DOCKER_RESET_SCRIPT = (
+    "find /workspace -mindepth 1 -delete; python -c 'print(\"ready\")'"
+)
+
+# The container runs "<init command>; exec /bin/sh" as PID 1, so PID 1 is a
+# bare /bin/sh exactly when the init command has finished.
+DOCKER_READY_SCRIPT = (
+    "test \"$(tr '\\0' ' ' < /proc/1/cmdline)\" = '/bin/sh ' "
+    "&& python -c 'print(\"ready\")'"
+)
+
+# Seconds from container start to ready, most recent last.
+startup_times: deque[float] = deque(maxlen=100)
+
+
+async def start_code_executor(
+    work_dir: str = "coding",
+    timeout: int = 30,
+    backend: str = CODE_EXECUTOR_BACKEND,
+) -> CodeExecutor:
+    """
+    Start a ready-to-use executor for the configured backend.
+    """
+    started = time.monotonic()
+    if backend == "docker":
+        code_executor = await start_docker_executor(work_dir, timeout)
+    elif backend == "jupyter":
+        code_executor = KernelCodeExecutor(work_dir=work_dir, timeout=timeout)
+        await code_executor.start()
+    elif backend == "sandbox":
+        code_executor = SandboxCodeExecutor(work_dir=work_dir, timeout=timeout)
+        await code_executor.start()
+    else:
+        raise ValueError(f"Unknown code executor backend: {backend}")
+
+    startup_time = time.monotonic() - started
+    startup_times.append(startup_time)
+    logger.info(f"Code executor ({backend}) ready in {startup_time:.2f} seconds")
+    return code_executor
+
+
+async def reset_code_executor(code_executor: CodeExecutor) -> bool:
+    if isinstance(code_executor, (KernelCodeExecutor, SandboxCodeExecutor)):
+        return await code_executor.reset()
+    return await reset_docker_executor(code_executor)
+
+
+def market_data_volumes() -> dict | None:
+    """
+    Read-only bind mount of the local market data store, if it exists.
+    """
+    directory = Path(MARKET_DATA_DIR)
+    if not (directory / META_FILE).is_file():
+        return None
+    return {str(directory.resolve()): {"bind": MARKET_DATA_MOUNT_PATH, "mode": "ro"}}
+
+
+def executor_market_data_path(backend: str = CODE_EXECUTOR_BACKEND) -> str | None:
+    """
+    Where generated code finds the market data store: the read-only mount
+    inside Docker containers, the host directory for local backends.
+    """
+    directory = Path(MARKET_DATA_DIR)
+    if not (directory / META_FILE).is_file():
+        return None
+    if backend == "docker":
+        return MARKET_DATA_MOUNT_PATH
+    return str(directory.resolve())
+
+
+async def start_docker_executor(
+    work_dir: str = "coding", timeout: int = 30
+) -> DockerCommandLineCodeExecutor:
+    Path(work_dir).mkdir(parents=True, exist_ok=True)
+    code_executor = DockerCommandLineCodeExecutor(
+        image=CODE_EXECUTOR_IMAGE,
+        timeout=timeout,
+        work_dir=work_dir,
+        init_command=CODE_EXECUTOR_INIT_COMMAND,
+        auto_remove=True,
+        extra_volumes=market_data_volumes(),
+    )
+    await code_executor.start()
+    try:
+        await wait_for_executor_ready(code_executor)
+    except Exception:
+        await code_executor.stop()
+        raise
+    return code_executor
+
+
+async def wait_for_executor_ready(
+    code_executor: CodeExecutor,
+    deadline: float = CODE_EXECUTOR_READY_TIMEOUT,
+    initial_backoff: float = 0.1,
+    max_backoff: float = 2.0,
+) -> None:
+    """
+    Run a trivial command in the container until it succeeds, backing off
+    between attempts, or raise TimeoutError after ``deadline`` seconds.
+    """
+    give_up_at = time.monotonic() + deadline
+    backoff = initial_backoff
+    last_output = ""
+    while True:
+        try:
+            result = await code_executor.execute_code_blocks(
+                [CodeBlock(code=DOCKER_READY_SCRIPT, language="sh")],
+                CancellationToken(),
+            )
+            if result.exit_code == 0 and "ready" in result.output:
+                return
+            last_output = result.output
+        except Exception as e:
+            last_output = str(e)
+
+        remaining = give_up_at - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(
+                f"Code executor not ready after {deadline} seconds: {last_output}"
+            )
+        await asyncio.sleep(min(backoff, remaining))
+        backoff = min(backoff * 2, max_backoff)
+
+
+def executor_startup_stats() -> dict:
+    times = sorted(startup_times)
+    if not times:
+        return {"count": 0}
+    return {
+        "count": len(times),
+        "last_seconds": round(startup_times[-1], 3),
+        "median_seconds": round(times[len(times) // 2], 3),
+        "max_seconds": round(times[-1], 3),
+    }
+
+
+async def reset_docker_executor(code_executor: CodeExecutor) -> bool:
+    """
+    Wipe the executor's workspace and return whether it is still healthy.
+    """
+    try:
+        result = await code_executor.execute_code_blocks(
+            [CodeBlock(code=DOCKER_RESET_SCRIPT, language="sh")],
+            CancellationToken(),
+        )
+    except Exception as e:
+        logger.warning(f"Code executor health check failed: {e}")
+        return False
+    return result.exit_code == 0 and "ready" in result.output
@@ -0,0 +1,310 @@
+"""
+Prompt compaction for long multi-agent runs.
+
+Every agent turn re-sends the agent's whole context, which in a team run
+fills up with multi-kilobyte search results, code listings and execution
+output. ``CompactingChatCompletionContext`` keeps every message but, once a
+prompt passes a token threshold, sends shortened copies of older long ones:
+code blocks are replaced by a one-line note, and prose is cut down to the
+sentences that carry figures and citations, plus headings and source
+links. The most recent messages are always sent in full.
+
+Compaction is extractive rather than a model summary, so it adds no model
+calls and no latency. Savings are counted per prompt, for each run and in
+total.
+"""
+
+import contextvars
+import logging
+import re
+from typing import List
+
+import tiktoken
+from autogen_core.model_context import ChatCompletionContext
+from autogen_core.models import (
+    AssistantMessage,
+    FunctionExecutionResultMessage,
+    LLMMessage,
+    SystemMessage,
+    UserMessage,
+)
+
+from financial_planner import (
+    CONTEXT_COMPACTED_MESSAGE_TOKENS,
+    CONTEXT_COMPACTION_KEEP_RECENT,
+    CONTEXT_COMPACTION_THRESHOLD_TOKENS,
+    CONTEXT_TOKENIZER_MODEL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Per-message overhead of the chat format, as counted by OpenAI.
+MESSAGE_OVERHEAD_TOKENS = 4
+CHARS_PER_TOKEN = 4
+
+CODE_BLOCK_PATTERN = re.compile(r"```([\w+-]*)[^\n]*\n(.*?)```", re.DOTALL)
+SOURCE_PATTERN = re.compile(r"https?://|^\W*sources?\W*$", re.IGNORECASE)
+NUMBER_PATTERN = re.compile(r"\d")
+SENTENCE_BREAK_PATTERN = re.compile(r"(?<=[.!?])\s+(?=[A-Z\[(*])")
+
+_encoding = None
+_encoding_loaded = False
+
+
+def get_encoding():
+    """
+    The tokenizer for ``CONTEXT_TOKENIZER_MODEL``, or None when it cannot be
+    loaded (tiktoken downloads encodings on first use). Token counts then
+    fall back to an estimate of four characters per token.
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        try:
+            _encoding = tiktoken.encoding_for_model(CONTEXT_TOKENIZER_MODEL)
+        except Exception as e:
+            logger.warning(f"Error loading tokenizer, estimating token counts: {e}")
+        _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def take_lines(lines: list[str], max_tokens: int) -> str:
+    """
+    As many whole lines as fit in ``max_tokens``, so no figure is cut in
+    half; a first line that does not fit on its own is truncated.
+    """
+    kept, used = [], 0
+    for line in lines:
+        tokens = count_tokens(line) + 1
+        if used + tokens > max_tokens:
+            break
+        kept.append(line)
+        used += tokens
+    if not kept and lines:
+        encoding = get_encoding()
+        if encoding is None:
+            return lines[0][: max_tokens * CHARS_PER_TOKEN]
+        return encoding.decode(
+            encoding.encode(lines[0], disallowed_special=())[:max_tokens]
+        )
+    return "\n".join(kept)
+
+
+def message_tokens(message: LLMMessage) -> int:
+    content = message.content
+    if isinstance(message, FunctionExecutionResultMessage):
+        text = "".join(result.content for result in content)
+    elif isinstance(content, str):
+        text = content
+    else:
+        # Function calls, or text with images.
+        text = "".join(
+            item if isinstance(item, str) else str(getattr(item, "arguments", ""))
+            for item in content
+        )
+    return count_tokens(text) + MESSAGE_OVERHEAD_TOKENS
+
+
+def compact_text(text: str, max_tokens: int = CONTEXT_COMPACTED_MESSAGE_TOKENS) -> str:
+    """
+    A shortened ``text`` of at most about ``max_tokens`` tokens: code blocks
+    become a note, and of the prose only the opening line, headings and
+    sentences with figures or citation markers are kept, followed by the
+    source links.
+    """
+    original_tokens = count_tokens(text)
+
+    def omit_code(match: re.Match) -> str:
+        language = match.group(1) or "code"
+        lines = match.group(2).count("\n")
+        return f"[{language} code block of {lines} lines omitted]"
+
+    text = CODE_BLOCK_PATTERN.sub(omit_code, text)
+    # Search results put whole paragraphs on one line; filter by sentence.
+    lines = [
+        sentence
+        for line in text.splitlines()
+        for sentence in SENTENCE_BREAK_PATTERN.split(line.rstrip())
+        if sentence.strip()
+    ]
+    sources = [line for line in lines if SOURCE_PATTERN.search(line)]
+    listed = set(sources)
+    body = [
+        line
+        for i, line in enumerate(lines)
+        if line not in listed
+        and (
+            i == 0
+            or line.lstrip().startswith(("#", "["))
+            or NUMBER_PATTERN.search(line)
+        )
+    ]
+
+    # Sources get up to half the budget, the figures the rest.
+    source_text = take_lines(sources, max_tokens // 2)
+    body_text = take_lines(body, max_tokens - count_tokens(source_text))
+    compacted = "\n".join(part for part in (body_text, source_text) if part)
+    return (
+        f"{compacted}\n[Earlier output compacted from {original_tokens} tokens; "
+        "figures and sources kept]"
+    )
+
+
+class CompactionStats:
+    def __init__(self):
+        self.runs = 0
+        self.prompts = 0
+        self.compacted_prompts = 0
+        self.messages_compacted = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+    def record(self, tokens_before: int, tokens_after: int, compacted: int) -> None:
+        self.prompts += 1
+        self.tokens_before += tokens_before
+        self.tokens_after += tokens_after
+        if compacted:
+            self.compacted_prompts += 1
+            self.messages_compacted += compacted
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "prompts": self.prompts,
+            "compacted_prompts": self.compacted_prompts,
+            "messages_compacted": self.messages_compacted,
+            "prompt_tokens_before": self.tokens_before,
+            "prompt_tokens_after": self.tokens_after,
+            "prompt_tokens_saved": self.tokens_saved,
+        }
+
+
+compaction_stats = CompactionStats()
+_run_stats: contextvars.ContextVar[CompactionStats | None] = contextvars.ContextVar(
+    "compaction_run_stats", default=None
+)
+
+
+def track_compaction_run() -> CompactionStats:
+    """
+    Start counting compaction for the run in the current task. Agents run in
+    tasks started from it, which inherit the counter.
+    """
+    stats = CompactionStats()
+    stats.runs = 1
+    compaction_stats.runs += 1
+    _run_stats.set(stats)
+    return stats
+
+
+class CompactingChatCompletionContext(ChatCompletionContext):
+    """
+    An unbounded chat completion context whose prompts are compacted above
+    ``threshold_tokens``. Older messages are compacted oldest first until the
+    prompt fits; the last ``keep_recent`` messages, system messages and
+    function calls are never changed, so tool calls still pair with their
+    results. Repeated identical system messages, such as memory added on
+    every turn, are sent once.
+    """
+
+    def __init__(
+        self,
+        threshold_tokens: int = CONTEXT_COMPACTION_THRESHOLD_TOKENS,
+        keep_recent: int = CONTEXT_COMPACTION_KEEP_RECENT,
+        compacted_message_tokens: int = CONTEXT_COMPACTED_MESSAGE_TOKENS,
+        initial_messages: List[LLMMessage] | None = None,
+    ):
+        super().__init__(initial_messages)
+        self.threshold_tokens = threshold_tokens
+        self.keep_recent = keep_recent
+        self.compacted_message_tokens = compacted_message_tokens
+        # Messages are only appended, so token counts and compacted copies
+        # are cached by position.
+        self._tokens: list[int] = []
+        self._compacted: dict[int, tuple[LLMMessage, int]] = {}
+
+    def _compact(self, index: int) -> tuple[LLMMessage, int] | None:
+        if index in self._compacted:
+            return self._compacted[index]
+        message = self._messages[index]
+        limit = self.compacted_message_tokens
+        if isinstance(message, FunctionExecutionResultMessage):
+            if self._tokens[index] <= limit:
+                return None
+            compacted = message.model_copy(
+                update={
+                    "content": [
+                        result.model_copy(
+                            update={"content": compact_text(result.content, limit)}
+                        )
+                        for result in message.content
+                    ]
+                }
+            )
+        elif isinstance(message, (UserMessage, AssistantMessage)) and isinstance(
+            message.content, str
+        ):
+            if self._tokens[index] <= limit:
+                return None
+            compacted = message.model_copy(
+                update={"content": compact_text(message.content, limit)}
+            )
+        else:
+            return None
+        tokens = message_tokens(compacted)
+        entry = (compacted, tokens) if tokens < self._tokens[index] else None
+        self._compacted[index] = entry
+        return entry
+
+    async def get_messages(self) -> List[LLMMessage]:
+        for message in self._messages[len(self._tokens) :]:
+            self._tokens.append(message_tokens(message))
+
+        messages = list(self._messages)
+        tokens = list(self._tokens)
+        seen_system = set()
+        for i in range(len(messages) - 1, -1, -1):
+            message = messages[i]
+            if isinstance(message, SystemMessage):
+                if message.content in seen_system:
+                    messages[i], tokens[i] = None, 0
+                seen_system.add(message.content)
+
+        total_before = sum(self._tokens)
+        total = sum(tokens)
+        compacted = 0
+        for i in range(max(len(messages) - self.keep_recent, 0)):
+            if total <= self.threshold_tokens:
+                break
+            if messages[i] is None:
+                continue
+            entry = self._compact(i)
+            if entry is not None:
+                messages[i] = entry[0]
+                total -= tokens[i] - entry[1]
+                compacted += 1
+
+        for stats in (compaction_stats, _run_stats.get()):
+            if stats is not None:
+                stats.record(total_before, total, compacted)
+        return [message for message in messages if message is not None]
+
+    async def clear(self) -> None:
+        await super().clear()
+        self._tokens = []
+        self._compacted = {}
+
+    async def load_state(self, state) -> None:
+        await super().load_state(state)
+        self._tokens = []
+        self._compacted = {}
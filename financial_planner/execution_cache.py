@@ -0,0 +1,236 @@
+import ast
+import hashlib
+import logging
+import sys
+
+from autogen_core import CancellationToken
+from autogen_core.code_executor import CodeBlock, CodeExecutor, CodeResult
+from autogen_ext.code_executors.docker import DockerCommandLineCodeExecutor
+
+from financial_planner import (
+    CODE_EXECUTOR_INIT_COMMAND,
+    EXECUTION_CACHE_MAX_BYTES,
+    EXECUTION_CACHE_MAX_ENTRIES,
+)
+from financial_planner.cache import LRUCache
+from financial_planner.sandbox_executor import SandboxCodeExecutor
+
+logger = logging.getLogger(__name__)
+
+# Code whose run depends on more than its own text (the clock, random state,
+# the environment, files left by earlier blocks, the network) or leaves files
+# behind that a cached result would not recreate. Detected from what the code
+# imports and calls, so ordinary variables such as ``time = 10`` do not count.
+NON_DETERMINISTIC_MODULES = (
+    "random",
+    "secrets",
+    "uuid",
+    "time",
+    "numpy.random",
+    "os",
+    "subprocess",
+    "shutil",
+    "tempfile",
+    "glob",
+    "pathlib",
+    "pickle",
+    "sqlite3",
+    "socket",
+    "urllib",
+    "http",
+    "requests",
+    "httpx",
+    "aiohttp",
+    "yfinance",
+    "pandas_datareader",
+)
+NON_DETERMINISTIC_ATTRIBUTES = frozenset(
+    {
+        # Clock, random state and environment.
+        "now",
+        "today",
+        "utcnow",
+        "random",
+        "default_rng",
+        "urandom",
+        "getenv",
+        "environ",
+        "system",
+        # File I/O.
+        "read_csv",
+        "read_excel",
+        "read_json",
+        "read_parquet",
+        "read_pickle",
+        "read_table",
+        "read_sql",
+        "read_hdf",
+        "read_html",
+        "read_text",
+        "read_bytes",
+        "loadtxt",
+        "genfromtxt",
+        "fromfile",
+        "load",
+        "memmap",
+        "savefig",
+        "save",
+        "savez",
+        "savetxt",
+        "tofile",
+        "to_csv",
+        "to_excel",
+        "to_json",
+        "to_parquet",
+        "to_pickle",
+        "to_sql",
+        "to_hdf",
+        "write_text",
+        "write_bytes",
+        "mkdir",
+    }
+)
+NON_DETERMINISTIC_BUILTINS = frozenset({"open", "input", "exec", "eval", "__import__"})
+# pd.Timestamp("now"), np.datetime64("today") and the like.
+CLOCK_STRINGS = frozenset({"now", "today"})
+
+PYTHON_LANGUAGES = ("python", "py", "python3")
+
+execution_cache = LRUCache(
+    max_entries=EXECUTION_CACHE_MAX_ENTRIES, max_bytes=EXECUTION_CACHE_MAX_BYTES
+)
+
+
+def normalize_code(code: str) -> str:
+    lines = (line.rstrip() for line in code.replace("\r\n", "\n").split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def is_non_deterministic_module(name: str) -> bool:
+    return any(
+        name == module or name.startswith(module + ".")
+        for module in NON_DETERMINISTIC_MODULES
+    )
+
+
+def is_deterministic(code: str) -> bool:
+    """
+    Whether running ``code`` depends on nothing but its text: it imports
+    none of ``NON_DETERMINISTIC_MODULES`` and uses none of the clock, random,
+    environment or file functions above. Code that does not parse is not.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return False
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            if any(is_non_deterministic_module(alias.name) for alias in node.names):
+                return False
+        elif isinstance(node, ast.ImportFrom):
+            module = node.module or ""
+            if any(
+                is_non_deterministic_module(f"{module}.{alias.name}")
+                for alias in node.names
+            ):
+                return False
+        elif isinstance(node, ast.Attribute):
+            if node.attr in NON_DETERMINISTIC_ATTRIBUTES:
+                return False
+        elif isinstance(node, ast.Call):
+            if (
+                isinstance(node.func, ast.Name)
+                and node.func.id in NON_DETERMINISTIC_BUILTINS
+            ):
+                return False
+        elif isinstance(node, ast.Constant):
+            if isinstance(node.value, str) and node.value.lower() in CLOCK_STRINGS:
+                return False
+    return True
+
+
+def docker_image_id(code_executor: DockerCommandLineCodeExecutor) -> str | None:
+    """
+    The ID of the image the executor's container runs, as ``docker image
+    inspect`` reports it, or None before the container is started. Unlike
+    the tag, it changes when a moving tag is pulled again.
+    """
+    container = getattr(code_executor, "_container", None)
+    if container is None:
+        return None
+    return container.attrs.get("Image")
+
+
+def executor_fingerprint(code_executor: CodeExecutor) -> str | None:
+    """
+    Identify the environment code runs in, or None when results also depend
+    on session state and cannot be cached.
+    """
+    if isinstance(code_executor, DockerCommandLineCodeExecutor):
+        image_id = docker_image_id(code_executor)
+        if image_id is None:
+            return None
+        # The init command installs packages on top of the image.
+        return f"docker:{image_id}:{CODE_EXECUTOR_INIT_COMMAND}"
+    if isinstance(code_executor, SandboxCodeExecutor):
+        return f"sandbox:{sys.version}"
+    return None
+
+
+def execution_cache_key(fingerprint: str, code_blocks: list[CodeBlock]) -> str | None:
+    """
+    Hash whitespace-normalized Python blocks with the executor fingerprint;
+    None when any block is a shell script or is not ``is_deterministic``.
+    """
+    digest = hashlib.sha256(fingerprint.encode())
+    for code_block in code_blocks:
+        language = code_block.language.lower()
+        code = normalize_code(code_block.code)
+        if language not in PYTHON_LANGUAGES or not is_deterministic(code):
+            return None
+        digest.update(b"\0" + language.encode() + b"\0")
+        digest.update(code.encode())
+    return digest.hexdigest()
+
+
+class CachingCodeExecutor(CodeExecutor):
+    """
+    Serves repeated executions of equivalent code from ``execution_cache``
+    and delegates everything else to the wrapped executor.
+    """
+
+    def __init__(self, code_executor: CodeExecutor, cache: LRUCache = execution_cache):
+        self.code_executor = code_executor
+        self.cache = cache
+        self.fingerprint = executor_fingerprint(code_executor)
+
+    async def execute_code_blocks(
+        self, code_blocks: list[CodeBlock], cancellation_token: CancellationToken
+    ) -> CodeResult:
+        key = (
+            execution_cache_key(self.fingerprint, code_blocks)
+            if self.fingerprint is not None
+            else None
+        )
+        if key is not None:
+            result = self.cache.get(key)
+            if result is not None:
+                logger.info("Serving code execution result from cache")
+                return result
+
+        result = await self.code_executor.execute_code_blocks(
+            code_blocks, cancellation_token
+        )
+        if key is not None and result.exit_code == 0:
+            self.cache.set(key, result, size=len(result.output.encode()))
+        return result
+
+    async def restart(self) -> None:
+        await self.code_executor.restart()
+
+    async def start(self) -> None:
+        await self.code_executor.start()
+        self.fingerprint = executor_fingerprint(self.code_executor)
+
+    async def stop(self) -> None:
+        await self.code_executor.stop()
@@ -0,0 +1,166 @@
+import asyncio
+import itertools
+import logging
+import os
+from collections import deque
+from typing import Awaitable, Callable
+
+from autogen_core.code_executor import CodeExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorPool:
+    """
+    Pool of started, initialized code executors checked out per request.
+
+    Each executor gets its own subdirectory of ``work_dir``. Executors are
+    reset (and health checked) by ``reset`` when returned and periodically
+    while idle; executors that fail are stopped and replaced.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], Awaitable[CodeExecutor]],
+        reset: Callable[[CodeExecutor], Awaitable[bool]],
+        work_dir: str = "coding",
+        min_size: int = 1,
+        max_size: int = 4,
+        acquire_timeout: float = 120,
+        health_check_interval: float = 60,
+    ):
+        self.factory = factory
+        self.reset = reset
+        self.work_dir = work_dir
+        self.min_size = min(min_size, max_size)
+        self.max_size = max(1, max_size)
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self._idle: deque[CodeExecutor] = deque()
+        self._size = 0
+        self._condition = asyncio.Condition()
+        self._slots = itertools.count(1)
+        self._health_task: asyncio.Task | None = None
+        self._closed = False
+        self.created = 0
+        self.checkouts = 0
+        self.evicted = 0
+        self.create_failures = 0
+
+    async def start(self) -> None:
+        """
+        Fill the pool to ``min_size`` and start background health checks.
+        """
+        self._closed = False
+        await self._replenish()
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def acquire(self) -> CodeExecutor:
+        async with self._condition:
+            await asyncio.wait_for(
+                self._condition.wait_for(
+                    lambda: self._idle or self._size < self.max_size
+                ),
+                timeout=self.acquire_timeout,
+            )
+            if self._idle:
+                self.checkouts += 1
+                return self._idle.popleft()
+            self._size += 1
+
+        try:
+            code_executor = await self._create()
+        except Exception:
+            await self._discard()
+            raise
+        self.checkouts += 1
+        return code_executor
+
+    async def release(self, code_executor: CodeExecutor) -> None:
+        if not self._closed and await self.reset(code_executor):
+            async with self._condition:
+                self._idle.append(code_executor)
+                self._condition.notify()
+            return
+        await self._evict(code_executor)
+        if not self._closed:
+            asyncio.create_task(self._replenish())
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        async with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+        for code_executor in idle:
+            await self._evict(code_executor)
+
+    async def _create(self) -> CodeExecutor:
+        work_dir = os.path.join(self.work_dir, f"pool-{next(self._slots)}")
+        try:
+            code_executor = await self.factory(work_dir)
+        except Exception as e:
+            self.create_failures += 1
+            logger.exception("Error starting pooled code executor: %s", e)
+            raise
+        self.created += 1
+        return code_executor
+
+    async def _evict(self, code_executor: CodeExecutor) -> None:
+        self.evicted += 1
+        try:
+            await code_executor.stop()
+        except Exception as e:
+            logger.warning(f"Error stopping code executor: {e}")
+        await self._discard()
+
+    async def _discard(self) -> None:
+        async with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    async def _replenish(self) -> None:
+        while not self._closed:
+            async with self._condition:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                code_executor = await self._create()
+            except Exception:
+                await self._discard()
+                return
+            async with self._condition:
+                self._idle.append(code_executor)
+                self._condition.notify()
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                # Check idle executors one at a time so the rest stay available.
+                for _ in range(len(self._idle)):
+                    async with self._condition:
+                        if not self._idle:
+                            break
+                        code_executor = self._idle.popleft()
+                    await self.release(code_executor)
+                await self._replenish()
+            except Exception as e:
+                logger.warning(f"Error during code executor health check: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "size": self._size,
+            "idle": len(self._idle),
+            "in_use": self._size - len(self._idle),
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "created": self.created,
+            "checkouts": self.checkouts,
+            "evicted": self.evicted,
+            "create_failures": self.create_failures,
+        }
@@ -0,0 +1,365 @@
+"""
+Parallel fan-out execution for the financial team.
+
+MagenticOne hands the conversation to one participant at a time, even when
+market research and a baseline calculation do not depend on each other.
+``FanOutTeam`` first asks the orchestrator model for a plan of subtasks and
+their dependencies. If some subtasks are independent, each runs on its own
+agent instance concurrently, a dependent subtask starts as soon as its inputs
+are ready, and the results are merged into the conversation the financial
+advisor synthesizes from. Plans with nothing to run in parallel, or that
+cannot be parsed, go to the MagenticOne team unchanged. Either way the run
+stops on the same termination condition, so a budget around the fan-out
+team applies to both paths.
+"""
+
+import asyncio
+import json
+import logging
+import re
+import time
+from typing import AsyncGenerator, Awaitable, Callable, NamedTuple, Sequence
+
+from autogen_agentchat.base import ChatAgent, TaskResult, Team, TerminationCondition
+from autogen_agentchat.messages import StopMessage, TextMessage
+from autogen_core import CancellationToken
+from autogen_core.models import (
+    ChatCompletionClient,
+    RequestUsage,
+    SystemMessage,
+    UserMessage,
+)
+
+from financial_planner import FANOUT_MAX_SUBTASKS
+
+logger = logging.getLogger(__name__)
+
+WEB_SEARCH = "web_search_agent"
+CODE_WRITER = "code_writer_agent"
+PLANNER_SOURCE = "MagenticOneOrchestrator"
+
+PLANNER_PROMPT = f"""You plan work for a financial planning team. Split the user's request into at most {{max_subtasks}} subtasks for these agents:
+- {WEB_SEARCH}: searches the web for current market data, rates, regulations and news, with citations.
+- {CODE_WRITER}: writes Python that is run immediately, for calculations and models on known or researched figures.
+A financial advisor synthesizes the final answer from the subtask results and has calculators for standard formulas, so do not plan a subtask for the final recommendation or for simple calculations.
+
+Make subtasks independent wherever possible so they can run at the same time. Only list a dependency when a subtask truly needs another's result, such as a calculation on researched figures. Each task must be self-contained: include the amounts, dates and profile details it needs.
+
+Reply with JSON only, in this form:
+{{{{"subtasks": [{{{{"id": "rates", "agent": "{WEB_SEARCH}", "task": "...", "depends_on": []}}}}]}}}}"""
+
+
+class Subtask(NamedTuple):
+    id: str
+    agent: str
+    task: str
+    depends_on: tuple[str, ...] = ()
+
+
+def parse_plan(text: str, max_subtasks: int = FANOUT_MAX_SUBTASKS) -> list[Subtask]:
+    """
+    Subtasks from the planner's JSON reply, in dependency order. Raises
+    ``ValueError`` for malformed plans, unknown agents or dependencies, and
+    cycles.
+    """
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if match is None:
+        raise ValueError("Plan contains no JSON object")
+    entries = json.loads(match.group(0)).get("subtasks")
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("Plan has no subtasks")
+    if len(entries) > max_subtasks:
+        raise ValueError(f"Plan has {len(entries)} subtasks (max {max_subtasks})")
+
+    subtasks = {}
+    for entry in entries:
+        subtask = Subtask(
+            id=str(entry["id"]),
+            agent=entry["agent"],
+            task=str(entry["task"]).strip(),
+            depends_on=tuple(str(dep) for dep in entry.get("depends_on") or ()),
+        )
+        if subtask.agent not in (WEB_SEARCH, CODE_WRITER):
+            raise ValueError(f"Unknown agent {subtask.agent!r} in plan")
+        if subtask.id in subtasks or not subtask.task:
+            raise ValueError(f"Duplicate or empty subtask {subtask.id!r}")
+        subtasks[subtask.id] = subtask
+    for subtask in subtasks.values():
+        unknown = set(subtask.depends_on) - subtasks.keys()
+        if unknown:
+            raise ValueError(f"Subtask {subtask.id!r} depends on unknown {unknown}")
+
+    return [subtask for wave in plan_waves(list(subtasks.values())) for subtask in wave]
+
+
+def plan_waves(subtasks: list[Subtask]) -> list[list[Subtask]]:
+    """
+    Group subtasks by dependency depth: each wave depends only on earlier
+    waves, so the subtasks within a wave can all run at once.
+    """
+    waves, done = [], set()
+    remaining = list(subtasks)
+    while remaining:
+        wave = [s for s in remaining if done.issuperset(s.depends_on)]
+        if not wave:
+            raise ValueError("Plan has a dependency cycle")
+        waves.append(wave)
+        done.update(s.id for s in wave)
+        remaining = [s for s in remaining if s.id not in done]
+    return waves
+
+
+class FanOutStats:
+    """
+    How often plans fan out, and the parallel speedup: the summed time of
+    every subtask against the wall-clock time of the fan-out phase.
+    """
+
+    def __init__(self):
+        self.runs = 0
+        self.fanned_out = 0
+        self.plan_errors = 0
+        self.subtasks = 0
+        self.subtask_seconds = 0.0
+        self.fanout_seconds = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "fanned_out": self.fanned_out,
+            "sequential_runs": self.runs - self.fanned_out,
+            "plan_errors": self.plan_errors,
+            "subtasks": self.subtasks,
+            "subtask_seconds": round(self.subtask_seconds, 3),
+            "fanout_seconds": round(self.fanout_seconds, 3),
+            "parallel_speedup": (
+                self.subtask_seconds / self.fanout_seconds
+                if self.fanout_seconds
+                else None
+            ),
+        }
+
+
+fanout_stats = FanOutStats()
+
+
+class FanOutTeam:
+    """
+    Runs a query as concurrent subtasks when its plan allows, otherwise on
+    ``team``. Exposes the same ``run_stream`` as a team, so callers need not
+    know which path ran.
+
+    ``agent_factories`` create a fresh agent per subtask, since an agent's
+    model context cannot be shared by concurrent runs. Code subtasks share
+    ``code_executor_agent`` one at a time. ``termination_condition`` should
+    be the one ``team`` was built with: a fanned-out run checks it on every
+    message and stops early, without a synthesis, when it fires.
+    """
+
+    def __init__(
+        self,
+        team: Team,
+        planner_client: ChatCompletionClient,
+        agent_factories: dict[str, Callable[[], Awaitable[ChatAgent]]],
+        code_executor_agent: ChatAgent,
+        advisor: ChatAgent,
+        max_subtasks: int = FANOUT_MAX_SUBTASKS,
+        termination_condition: TerminationCondition | None = None,
+    ):
+        self.team = team
+        self.planner_client = planner_client
+        self.agent_factories = agent_factories
+        self.code_executor_agent = code_executor_agent
+        self.advisor = advisor
+        self.max_subtasks = max_subtasks
+        self.termination_condition = termination_condition
+        self._executor_lock = asyncio.Lock()
+
+    async def check_termination(self, event) -> StopMessage | None:
+        if self.termination_condition is None:
+            return None
+        return await self.termination_condition([event])
+
+    async def plan(
+        self, task_text: str, cancellation_token: CancellationToken
+    ) -> tuple[list[Subtask] | None, RequestUsage | None]:
+        """
+        The planned subtasks, or None when the plan is unusable, with the
+        planning call's usage.
+        """
+        usage = None
+        try:
+            result = await self.planner_client.create(
+                [
+                    SystemMessage(
+                        content=PLANNER_PROMPT.format(max_subtasks=self.max_subtasks)
+                    ),
+                    UserMessage(content=task_text, source="user"),
+                ],
+                cancellation_token=cancellation_token,
+            )
+            usage = result.usage
+            return parse_plan(str(result.content), self.max_subtasks), usage
+        except Exception as e:
+            fanout_stats.plan_errors += 1
+            logger.warning(f"Unusable fan-out plan, running the team instead: {e}")
+            return None, usage
+
+    async def run_stream(
+        self,
+        *,
+        task: str | TextMessage | Sequence[TextMessage],
+        cancellation_token: CancellationToken | None = None,
+    ) -> AsyncGenerator:
+        if cancellation_token is None:
+            cancellation_token = CancellationToken()
+        if isinstance(task, str):
+            task = [TextMessage(content=task, source="user")]
+        elif isinstance(task, TextMessage):
+            task = [task]
+        task = list(task)
+        fanout_stats.runs += 1
+
+        subtasks, plan_usage = await self.plan(
+            "\n\n".join(message.content for message in task), cancellation_token
+        )
+        waves = plan_waves(subtasks) if subtasks else []
+        if not any(len(wave) > 1 for wave in waves):
+            async for event in self.team.run_stream(
+                task=task, cancellation_token=cancellation_token
+            ):
+                yield event
+            return
+
+        fanout_stats.fanned_out += 1
+        fanout_stats.subtasks += len(subtasks)
+        plan_message = TextMessage(
+            content="Running independent subtasks in parallel:\n"
+            + "\n".join(
+                f"- **{s.id}** ({s.agent}"
+                + (f", after {', '.join(s.depends_on)}" if s.depends_on else "")
+                + f"): {s.task}"
+                for s in subtasks
+            ),
+            source=PLANNER_SOURCE,
+            # Counts the planning call against token and cost budgets.
+            models_usage=plan_usage,
+        )
+        yield plan_message
+        messages = [plan_message]
+        stop = await self.check_termination(plan_message)
+
+        queue: asyncio.Queue = asyncio.Queue()
+        results: dict[str, asyncio.Task] = {}
+        for subtask in subtasks:
+            results[subtask.id] = asyncio.create_task(
+                self._run_subtask(subtask, results, queue, cancellation_token)
+            )
+
+        async def run_all() -> list[TextMessage]:
+            try:
+                return await asyncio.gather(*results.values())
+            finally:
+                await queue.put(None)
+
+        started = time.perf_counter()
+        gathered = asyncio.create_task(run_all())
+        try:
+            while stop is None and (event := await queue.get()) is not None:
+                messages.append(event)
+                yield event
+                stop = await self.check_termination(event)
+            if stop is None:
+                merged = await gathered
+        finally:
+            for pending in [*results.values(), gathered]:
+                pending.cancel()
+            fanout_stats.fanout_seconds += time.perf_counter() - started
+
+        if stop is None:
+            # The advisor sees the user's request followed by every result.
+            async for event in self._run_agent(
+                self.advisor, [*task, *merged], cancellation_token
+            ):
+                messages.append(event)
+                yield event
+                stop = await self.check_termination(event)
+                if stop is not None:
+                    break
+        if stop is not None:
+            logger.info(f"Fan-out run stopped early: {stop.content}")
+        yield TaskResult(
+            messages=messages,
+            stop_reason=(
+                stop.content
+                if stop is not None
+                else f"Ran {len(subtasks)} subtasks in {len(waves)} waves"
+            ),
+        )
+
+    async def _run_agent(
+        self,
+        agent: ChatAgent,
+        task: list[TextMessage],
+        cancellation_token: CancellationToken,
+    ) -> AsyncGenerator:
+        # run_stream echoes its input messages first; skip them.
+        async for event in agent.run_stream(
+            task=task, cancellation_token=cancellation_token
+        ):
+            if isinstance(event, TaskResult) or any(event is m for m in task):
+                continue
+            yield event
+
+    async def _run_to_queue(
+        self,
+        agent: ChatAgent,
+        task: list[TextMessage],
+        queue: asyncio.Queue,
+        cancellation_token: CancellationToken,
+    ):
+        final = None
+        async for event in self._run_agent(agent, task, cancellation_token):
+            await queue.put(event)
+            final = event
+        return final
+
+    async def _run_subtask(
+        self,
+        subtask: Subtask,
+        results: dict[str, asyncio.Task],
+        queue: asyncio.Queue,
+        cancellation_token: CancellationToken,
+    ) -> TextMessage:
+        inputs = [await results[dep] for dep in subtask.depends_on]
+        started = time.perf_counter()
+        content = subtask.task
+        if inputs:
+            content += "\n\nResults of earlier subtasks:\n\n" + "\n\n".join(
+                message.content for message in inputs
+            )
+        task = [TextMessage(content=content, source="user")]
+
+        try:
+            agent = await self.agent_factories[subtask.agent]()
+            final = await self._run_to_queue(agent, task, queue, cancellation_token)
+            output = getattr(final, "content", "")
+            if subtask.agent == CODE_WRITER and final is not None:
+                # One executor per session, so code runs one block at a time.
+                async with self._executor_lock:
+                    executed = await self._run_to_queue(
+                        self.code_executor_agent, [final], queue, cancellation_token
+                    )
+                output += f"\n\nExecution output:\n{getattr(executed, 'content', '')}"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Fan-out subtask {subtask.id} failed: {e}")
+            output = f"The subtask failed: {e}"
+        finally:
+            fanout_stats.subtask_seconds += time.perf_counter() - started
+
+        return TextMessage(
+            content=f"Result of subtask '{subtask.id}' ({subtask.task}):\n\n{output}",
+            source=subtask.agent,
+        )
@@ -0,0 +1,225 @@
+"""
+Vectorized time-value-of-money calculations.
+
+Every function accepts scalars or NumPy arrays and broadcasts them, so a
+whole grid of rates or horizons is computed in one call. Cash flows follow
+the usual spreadsheet sign convention: money paid out is negative, money
+received is positive, and ``when`` is 0 for payments at the end of each
+period or 1 for payments at the beginning.
+
+The module only depends on NumPy, so it can also be imported by generated
+code inside the executor image.
+"""
+
+import numpy as np
+
+
+def _growth(rate, nper):
+    return np.power(1 + np.asarray(rate, dtype=float), nper)
+
+
+def _annuity_factor(rate, nper, when):
+    """
+    Value at ``nper`` of a payment of 1 per period; ``nper`` when the rate is 0.
+    """
+    rate = np.asarray(rate, dtype=float)
+    growth = _growth(rate, nper)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factor = (1 + rate * when) * (growth - 1) / rate
+    return np.where(rate == 0, nper, factor)
+
+
+def _result(value):
+    return value.item() if np.ndim(value) == 0 else value
+
+
+def fv(rate, nper, pmt, pv=0.0, when=0):
+    """
+    Future value of a present value plus a series of equal payments.
+    """
+    value = -(
+        np.asarray(pv, dtype=float) * _growth(rate, nper)
+        + np.asarray(pmt, dtype=float) * _annuity_factor(rate, nper, when)
+    )
+    return _result(value)
+
+
+def pv(rate, nper, pmt, fv=0.0, when=0):
+    """
+    Present value of a future value plus a series of equal payments.
+    """
+    value = -(
+        np.asarray(fv, dtype=float)
+        + np.asarray(pmt, dtype=float) * _annuity_factor(rate, nper, when)
+    ) / _growth(rate, nper)
+    return _result(value)
+
+
+def pmt(rate, nper, pv, fv=0.0, when=0):
+    """
+    Equal payment per period that takes ``pv`` to ``fv`` in ``nper`` periods.
+    """
+    value = -(
+        np.asarray(fv, dtype=float) + np.asarray(pv, dtype=float) * _growth(rate, nper)
+    ) / _annuity_factor(rate, nper, when)
+    return _result(value)
+
+
+def npv(rate, cashflows):
+    """
+    Net present value of ``cashflows``, the first of which happens today.
+    ``rate`` may be an array to value the same cash flows at several rates.
+    """
+    cashflows = np.asarray(cashflows, dtype=float)
+    rate = np.asarray(rate, dtype=float)
+    periods = np.arange(cashflows.shape[-1])
+    discount = np.power(1 + rate[..., np.newaxis], -periods)
+    return _result(np.sum(cashflows * discount, axis=-1))
+
+
+def irr(cashflows) -> float:
+    """
+    Internal rate of return of ``cashflows``, the first of which happens
+    today. Returns NaN when no real rate above -100% sets the NPV to zero;
+    when several do, the one closest to zero is returned.
+    """
+    cashflows = np.trim_zeros(np.asarray(cashflows, dtype=float), "b")
+    if cashflows.size < 2:
+        return float("nan")
+    # NPV is a polynomial in x = 1 / (1 + rate); np.roots wants the highest
+    # power first.
+    roots = np.roots(cashflows[::-1])
+    roots = roots[np.isclose(roots.imag, 0)].real
+    roots = roots[roots > 0]
+    if roots.size == 0:
+        return float("nan")
+    rates = 1 / roots - 1
+    return float(rates[np.argmin(np.abs(rates))])
+
+
+def amortization_schedule(
+    principal: float,
+    annual_rate: float,
+    years: float,
+    periods_per_year: int = 12,
+    extra_payment: float = 0.0,
+) -> dict[str, np.ndarray]:
+    """
+    Period-by-period schedule of a fixed-rate loan, with an optional extra
+    principal payment each period that shortens the loan.
+
+    Returns arrays ``period``, ``payment``, ``interest``, ``principal`` and
+    ``balance`` (after the payment), one entry per period until payoff.
+    """
+    rate = annual_rate / periods_per_year
+    nper = int(round(years * periods_per_year))
+    payment = -pmt(rate, nper, principal)
+
+    if extra_payment == 0:
+        # Closed form: the balance after k payments is the future value of the
+        # loan less the payments made so far.
+        periods = np.arange(1, nper + 1)
+        balance = np.maximum(fv(rate, periods, payment, -principal), 0.0)
+        previous = np.concatenate(([principal], balance[:-1]))
+        interest = previous * rate
+        principal_paid = previous - balance
+        payments = interest + principal_paid
+    else:
+        # Extra payments change the payoff date, so step through the periods.
+        balances, interests, principals, payments_made = [], [], [], []
+        balance = float(principal)
+        while balance > 1e-9 and len(balances) < nper:
+            interest = balance * rate
+            paid = min(payment + extra_payment, balance + interest)
+            balance -= paid - interest
+            interests.append(interest)
+            principals.append(paid - interest)
+            payments_made.append(paid)
+            balances.append(max(balance, 0.0))
+        periods = np.arange(1, len(balances) + 1)
+        balance = np.array(balances)
+        interest = np.array(interests)
+        principal_paid = np.array(principals)
+        payments = np.array(payments_made)
+
+    return {
+        "period": periods,
+        "payment": payments,
+        "interest": interest,
+        "principal": principal_paid,
+        "balance": balance,
+    }
+
+
+def compound_interest(
+    principal,
+    annual_rate,
+    years,
+    compounds_per_year=12,
+    contribution=0.0,
+    when=0,
+):
+    """
+    Balance after ``years`` of compounding ``principal`` with a
+    ``contribution`` added every compounding period. Amounts are positive.
+    """
+    rate = np.asarray(annual_rate, dtype=float) / compounds_per_year
+    nper = np.asarray(years, dtype=float) * compounds_per_year
+    contribution = np.asarray(contribution, dtype=float)
+    principal = np.asarray(principal, dtype=float)
+    return fv(rate, nper, -contribution, -principal, when)
+
+
+def inflation_adjust(amount, inflation_rate, years, to_future=False):
+    """
+    Convert ``amount`` between today's money and money ``years`` from now.
+
+    By default a future nominal amount is deflated into today's purchasing
+    power; with ``to_future`` a present amount is inflated into the nominal
+    amount needed ``years`` from now.
+    """
+    growth = _growth(inflation_rate, years)
+    amount = np.asarray(amount, dtype=float)
+    return _result(amount * growth if to_future else amount / growth)
+
+
+def real_rate(nominal_rate, inflation_rate):
+    """
+    Inflation-adjusted rate of return (Fisher equation).
+    """
+    nominal_rate = np.asarray(nominal_rate, dtype=float)
+    inflation_rate = np.asarray(inflation_rate, dtype=float)
+    return _result((1 + nominal_rate) / (1 + inflation_rate) - 1)
+
+
+def savings_rate(income, savings):
+    """
+    Share of ``income`` that is saved; NaN where income is zero.
+    """
+    income = np.asarray(income, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.asarray(savings, dtype=float) / income
+    rate = np.where(income == 0, np.nan, rate)
+    return _result(rate)
+
+
+def years_to_goal(
+    goal, annual_rate, contribution, principal=0.0, compounds_per_year=12
+):
+    """
+    Years of compounding ``principal`` plus a ``contribution`` every period
+    needed to reach ``goal``; infinity where it is never reached.
+    """
+    rate = np.asarray(annual_rate, dtype=float) / compounds_per_year
+    goal = np.asarray(goal, dtype=float)
+    contribution = np.asarray(contribution, dtype=float)
+    principal = np.asarray(principal, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growing = np.log(
+            (goal * rate + contribution) / (principal * rate + contribution)
+        ) / np.log1p(rate)
+        flat = (goal - principal) / contribution
+    nper = np.where(rate == 0, flat, growing)
+    nper = np.where(goal <= principal, 0.0, nper)
+    nper = np.where(np.isfinite(nper) & (nper >= 0), nper, np.inf)
+    return _result(nper / compounds_per_year)
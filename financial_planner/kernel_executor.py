@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import shutil
+from pathlib import Path
+
+from autogen_core import CancellationToken
+from autogen_core.code_executor import CodeBlock, CodeExecutor, CodeResult
+
+logger = logging.getLogger(__name__)
+
+# Removed from the kernel's environment so generated code does not pick up
+# the server's credentials by accident. The kernel runs as the server user, so
+# this is not a sandbox; use the Docker backend for untrusted deployments.
+SECRET_ENV_VARS = ("PERPLEXITY_API_KEY", "OPENAI_API_KEY", "ANTHROPIC_API_KEY")
+
+KERNEL_SETUP_CODE = """\
+import os as _os
+_os.chdir({work_dir!r})
+for _name in {secret_env_vars!r}:
+    _os.environ.pop(_name, None)
+try:
+    import numpy, pandas, scipy
+    del numpy, pandas, scipy
+except ImportError:
+    pass
+del _os, _name
+"""
+
+SHELL_LANGUAGES = ("sh", "bash", "shell")
+
+
+class KernelCodeExecutor(CodeExecutor):
+    """
+    Stateful executor backed by a dedicated Jupyter kernel, so imports and
+    intermediate data survive across the code blocks of one session.
+
+    A block that times out restarts the kernel. ``reset()`` clears the kernel
+    namespace and workspace so a pooled kernel can serve the next session
+    with its imported modules still warm.
+    """
+
+    def __init__(self, work_dir: str = "coding", timeout: int = 30):
+        self.work_dir = Path(work_dir).resolve()
+        self.timeout = timeout
+        self._executor = None
+
+    async def start(self) -> None:
+        try:
+            from autogen_ext.code_executors.jupyter import JupyterCodeExecutor
+        except ImportError as e:
+            raise RuntimeError(
+                "Missing dependencies for the jupyter code executor backend. Please "
+                "ensure autogen-ext was installed with the 'jupyter-executor' extra."
+            ) from e
+
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self._executor = JupyterCodeExecutor(
+            timeout=self.timeout, output_dir=self.work_dir
+        )
+        await self._executor.start()
+        await self._setup_kernel()
+
+    async def stop(self) -> None:
+        if self._executor is not None:
+            await self._executor.stop()
+            self._executor = None
+
+    async def restart(self) -> None:
+        await self._executor.restart()
+        await self._setup_kernel()
+
+    async def execute_code_blocks(
+        self, code_blocks: list[CodeBlock], cancellation_token: CancellationToken
+    ) -> CodeResult:
+        if self._executor is None:
+            raise ValueError("Kernel is not running. Must first be started with start.")
+
+        code_blocks = [
+            (
+                CodeBlock(code="%%bash\n" + block.code, language="python")
+                if block.language.lower() in SHELL_LANGUAGES
+                else block
+            )
+            for block in code_blocks
+        ]
+        try:
+            return await self._executor.execute_code_blocks(
+                code_blocks, cancellation_token
+            )
+        except TimeoutError:
+            logger.warning("Kernel execution timed out. Restarting kernel...")
+            await self.restart()
+            return CodeResult(
+                exit_code=124,
+                output=(
+                    f"Timeout: execution exceeded {self.timeout} seconds. The kernel "
+                    "was restarted, so variables and imports from earlier code "
+                    "blocks are no longer available."
+                ),
+            )
+
+    async def reset(self) -> bool:
+        """
+        Clear the kernel namespace and workspace and return whether the kernel
+        is still healthy.
+        """
+        try:
+            for path in self.work_dir.iterdir():
+                if path.is_dir() and not path.is_symlink():
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    path.unlink(missing_ok=True)
+            await self._run("get_ipython().run_line_magic('reset', '-f')")
+            await self._setup_kernel()
+            result = await self._run("print('ready')")
+        except Exception as e:
+            logger.warning(f"Kernel health check failed: {e}")
+            return False
+        return result.exit_code == 0 and "ready" in result.output
+
+    async def _setup_kernel(self) -> None:
+        result = await self._run(
+            KERNEL_SETUP_CODE.format(
+                work_dir=str(self.work_dir), secret_env_vars=SECRET_ENV_VARS
+            )
+        )
+        if result.exit_code != 0:
+            raise RuntimeError(f"Kernel setup failed: {result.output}")
+
+    async def _run(self, code: str) -> CodeResult:
+        return await asyncio.wait_for(
+            self._executor.execute_code_blocks(
+                [CodeBlock(code=code, language="python")], CancellationToken()
+            ),
+            timeout=self.timeout,
+        )
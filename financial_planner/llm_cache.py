@@ -0,0 +1,254 @@
+"""
+Optional on-disk cache of model responses, for development, benchmarks and
+repeated demo queries.
+
+``LLM_CACHE_MODE`` selects the behaviour:
+
+- ``off`` (default): every request goes to the model.
+- ``read_write``: cached responses are served, and new ones are stored.
+- ``replay``: cached responses are served and nothing is written; a miss
+  raises ``LLMCacheMiss`` instead of calling the model, so a benchmark run
+  is deterministic and cannot silently spend tokens.
+
+Responses are keyed by a hash of the client's model and settings, the
+messages, the tool schemas and the request options. The time of day in the
+prompts' "Today is ..." lines is left out of the key, so a query repeated
+the same day is a hit; to replay on another day, pin the date the agents see
+with ``CURRENT_DATE_OVERRIDE``. Responses live in a SQLite file bounded by
+entry count and size, oldest entries evicted first.
+"""
+
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+import re
+import sqlite3
+from typing import Any, AsyncGenerator, Mapping, Sequence
+
+from autogen_core import CancellationToken
+from autogen_core.models import (
+    ChatCompletionClient,
+    CreateResult,
+    LLMMessage,
+    RequestUsage,
+)
+from autogen_core.tools import Tool, ToolSchema
+
+from financial_planner import (
+    LLM_CACHE_DB_PATH,
+    LLM_CACHE_MAX_BYTES,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_MODE,
+)
+from financial_planner.cache import SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_MODES = ("off", "read_write", "replay")
+
+# The time of day get_current_date() adds after the date, such as
+# " at 03:04:05 PM UTC (+0000)".
+TIME_OF_DAY_PATTERN = re.compile(r" at \d{2}:\d{2}:\d{2} [AP]M [^()\"\n]*\([+-]\d{4}\)")
+
+
+class LLMCacheMiss(LookupError):
+    """
+    A request had no cached response in replay mode.
+    """
+
+
+def response_cache_key(
+    fingerprint: dict,
+    messages: Sequence[LLMMessage],
+    tools: Sequence[Tool | ToolSchema],
+    json_output: bool | None,
+    extra_create_args: Mapping[str, Any],
+) -> str:
+    data = {
+        "client": fingerprint,
+        "messages": [message.model_dump(mode="json") for message in messages],
+        "tools": [tool.schema if isinstance(tool, Tool) else tool for tool in tools],
+        "json_output": json_output,
+        "extra_create_args": dict(extra_create_args),
+    }
+    serialized = json.dumps(data, sort_keys=True, default=str)
+    serialized = TIME_OF_DAY_PATTERN.sub("", serialized)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+class CachedChatCompletionClient(ChatCompletionClient):
+    """
+    Wraps a model client so responses are served from and stored in
+    ``store``. ``fingerprint`` describes the model and the settings fixed at
+    construction (temperature, token limit), which the request itself does
+    not carry. Cached responses report no usage, since they cost nothing.
+    Everything but ``create`` and ``create_stream`` is delegated.
+    """
+
+    def __init__(
+        self,
+        client: ChatCompletionClient,
+        fingerprint: dict,
+        store: SQLiteCache,
+        replay: bool = False,
+        max_entries: int | None = LLM_CACHE_MAX_ENTRIES,
+        max_bytes: int | None = LLM_CACHE_MAX_BYTES,
+    ):
+        self.client = client
+        self.fingerprint = fingerprint
+        self.store = store
+        self.replay = replay
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    async def _lookup(self, key: str) -> CreateResult | None:
+        try:
+            stored = await asyncio.to_thread(self.store.get, key)
+        except sqlite3.Error as e:
+            logger.warning(f"Error reading model response cache: {e}")
+            stored = None
+        if stored is None:
+            if self.replay:
+                raise LLMCacheMiss(
+                    f"No cached response for this {self.fingerprint.get('model')} "
+                    "request (LLM_CACHE_MODE=replay)"
+                )
+            return None
+        result = CreateResult.model_validate(stored[0])
+        result.cached = True
+        result.usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        return result
+
+    async def _store(self, key: str, result: CreateResult) -> None:
+        if self.replay:
+            return
+
+        def write() -> None:
+            self.store.set(key, result.model_dump(mode="json"))
+            self.store.evict_to(self.max_entries, self.max_bytes)
+
+        try:
+            await asyncio.to_thread(write)
+        except sqlite3.Error as e:
+            logger.warning(f"Error writing model response cache: {e}")
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: bool | None = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: CancellationToken | None = None,
+    ) -> CreateResult:
+        key = response_cache_key(
+            self.fingerprint, messages, tools, json_output, extra_create_args
+        )
+        cached = await self._lookup(key)
+        if cached is not None:
+            return cached
+        result = await self.client.create(
+            messages,
+            tools=tools,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            cancellation_token=cancellation_token,
+        )
+        await self._store(key, result)
+        return result
+
+    async def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: bool | None = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: CancellationToken | None = None,
+    ) -> AsyncGenerator[str | CreateResult, None]:
+        key = response_cache_key(
+            self.fingerprint, messages, tools, json_output, extra_create_args
+        )
+        cached = await self._lookup(key)
+        if cached is not None:
+            # A cached stream arrives as one chunk.
+            if isinstance(cached.content, str):
+                yield cached.content
+            yield cached
+            return
+        async for chunk in self.client.create_stream(
+            messages,
+            tools=tools,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            cancellation_token=cancellation_token,
+        ):
+            if isinstance(chunk, CreateResult):
+                await self._store(key, chunk)
+            yield chunk
+
+    async def close(self) -> None:
+        close = getattr(self.client, "close", None)
+        if close is not None:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+
+    def actual_usage(self) -> RequestUsage:
+        return self.client.actual_usage()
+
+    def total_usage(self) -> RequestUsage:
+        return self.client.total_usage()
+
+    def count_tokens(self, messages: Sequence[LLMMessage], **kwargs) -> int:
+        return self.client.count_tokens(messages, **kwargs)
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], **kwargs) -> int:
+        return self.client.remaining_tokens(messages, **kwargs)
+
+    @property
+    def capabilities(self):
+        return self.client.capabilities
+
+    @property
+    def model_info(self):
+        return self.client.model_info
+
+
+_response_store: SQLiteCache | None = None
+
+
+def get_response_store() -> SQLiteCache:
+    global _response_store
+    if _response_store is None:
+        _response_store = SQLiteCache(LLM_CACHE_DB_PATH, namespace="llm")
+    return _response_store
+
+
+def with_response_cache(
+    client: ChatCompletionClient, fingerprint: dict
+) -> ChatCompletionClient:
+    """
+    ``client`` behind the response cache, or unchanged when the cache is off.
+    """
+    if LLM_CACHE_MODE == "off":
+        return client
+    if LLM_CACHE_MODE not in LLM_CACHE_MODES:
+        raise ValueError(
+            f"Unknown LLM_CACHE_MODE {LLM_CACHE_MODE!r}; "
+            f"expected one of {', '.join(LLM_CACHE_MODES)}"
+        )
+    return CachedChatCompletionClient(
+        client,
+        fingerprint,
+        get_response_store(),
+        replay=LLM_CACHE_MODE == "replay",
+    )
+
+
+def response_cache_stats() -> dict | None:
+    if _response_store is None:
+        return None
+    return {"mode": LLM_CACHE_MODE, **_response_store.stats()}
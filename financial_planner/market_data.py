@@ -0,0 +1,360 @@
+"""
+Local store of historical market series (index levels, treasury yields, CPI).
+
+Each series is two ``.npy`` files, ``<name>.dates.npy`` (datetime64[D],
+sorted) and ``<name>.values.npy`` (float64), described by ``meta.json``.
+Reads memory-map the files, so date-range queries return views without
+copying, and the same directory can be mounted read-only into the code
+executor.
+
+Build or refresh the store from FRED, or ingest a CSV:
+
+    python -m financial_planner.market_data build
+    python -m financial_planner.market_data ingest-csv returns.csv --name us_stocks \\
+        --date-column date --value-column close --kind price
+"""
+
+import argparse
+import csv
+import datetime
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+from financial_planner import MARKET_DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+META_FILE = "meta.json"
+FRED_CSV_URL = "https://fred.stlouisfed.org/graph/fredgraph.csv"
+
+# Series kinds: "price" for index levels (returns are computed from changes),
+# "rate" for percentages such as yields, "index" for price indexes like CPI.
+SERIES_KINDS = ("price", "rate", "index")
+
+# name -> (FRED series id, kind, description)
+DEFAULT_FRED_SERIES = {
+    "cpi": ("CPIAUCSL", "index", "US CPI, all urban consumers (monthly, SA)"),
+    "treasury_3m": ("TB3MS", "rate", "3-month Treasury bill yield (monthly, %)"),
+    "treasury_2y": ("GS2", "rate", "2-year Treasury yield (monthly, %)"),
+    "treasury_10y": ("GS10", "rate", "10-year Treasury yield (monthly, %)"),
+    "sp500": ("SP500", "price", "S&P 500 index level (daily, price only)"),
+    "nasdaq": ("NASDAQCOM", "price", "NASDAQ Composite index level (daily)"),
+}
+
+
+def parse_series_csv(
+    text: str, date_column: str | None = None, value_column: str | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Parse a CSV of dates and values into sorted ``datetime64[D]`` and
+    ``float64`` arrays. Defaults to the first two columns; rows with missing
+    values (FRED writes ".") are skipped.
+    """
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or len(reader.fieldnames) < 2:
+        raise ValueError("CSV needs a header with a date and a value column")
+    date_column = date_column or reader.fieldnames[0]
+    value_column = value_column or reader.fieldnames[1]
+
+    dates, values = [], []
+    for row in reader:
+        raw = (row.get(value_column) or "").strip()
+        if raw in ("", ".", "NaN", "nan"):
+            continue
+        dates.append(np.datetime64(row[date_column].strip()[:10], "D"))
+        values.append(float(raw.replace(",", "")))
+    if not dates:
+        raise ValueError(f"No values found in column {value_column!r}")
+
+    dates = np.array(dates, dtype="datetime64[D]")
+    values = np.array(values, dtype=np.float64)
+    order = np.argsort(dates, kind="stable")
+    dates, values = dates[order], values[order]
+    # Keep the last value of any repeated date.
+    keep = np.append(dates[1:] != dates[:-1], True)
+    return dates[keep], values[keep]
+
+
+def fetch_fred_csv(series_id: str, timeout: float = 30.0) -> str:
+    response = httpx.get(
+        FRED_CSV_URL,
+        params={"id": series_id},
+        timeout=timeout,
+        follow_redirects=True,
+    )
+    response.raise_for_status()
+    return response.text
+
+
+def _save_array(path: Path, array: np.ndarray) -> None:
+    # Write next to the target and rename, so readers never see a partial file.
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".npy")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def write_series(
+    directory: str | Path,
+    name: str,
+    dates: np.ndarray,
+    values: np.ndarray,
+    kind: str,
+    description: str = "",
+    source: str = "",
+) -> dict:
+    """
+    Store one series and record it in ``meta.json``, replacing any existing
+    series of the same name.
+    """
+    if kind not in SERIES_KINDS:
+        raise ValueError(f"kind must be one of {', '.join(SERIES_KINDS)}")
+    if not name.replace("_", "").isalnum():
+        raise ValueError("Series names may only contain letters, digits and _")
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    values = np.asarray(values, dtype=np.float64)
+    _save_array(directory / f"{name}.dates.npy", dates)
+    _save_array(directory / f"{name}.values.npy", values)
+
+    meta_path = directory / META_FILE
+    meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+    meta.setdefault("series", {})[name] = {
+        "kind": kind,
+        "description": description,
+        "source": source,
+        "start": str(dates[0]),
+        "end": str(dates[-1]),
+        "count": int(dates.size),
+        "updated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(meta, f, indent=2, sort_keys=True)
+    os.replace(tmp, meta_path)
+    return meta["series"][name]
+
+
+def build_from_fred(
+    directory: str | Path, series: dict[str, tuple[str, str, str]] = None
+) -> list[str]:
+    """
+    Download each FRED series into the store and return the names written.
+    A failed download is logged and skipped.
+    """
+    written = []
+    for name, (series_id, kind, description) in (series or DEFAULT_FRED_SERIES).items():
+        try:
+            dates, values = parse_series_csv(fetch_fred_csv(series_id))
+        except Exception as e:
+            logger.warning(f"Error fetching FRED series {series_id}: {e}")
+            continue
+        write_series(
+            directory, name, dates, values, kind, description, f"FRED:{series_id}"
+        )
+        written.append(name)
+    return written
+
+
+class MarketDataStore:
+    """
+    Read-only, memory-mapped view of a market data directory. Arrays are
+    mapped on first use and remapped when ``meta.json`` changes.
+    """
+
+    def __init__(self, directory: str | Path = MARKET_DATA_DIR):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._meta: dict = {}
+        self._meta_mtime: float | None = None
+        self._arrays: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self.queries = 0
+
+    def _refresh(self) -> dict:
+        meta_path = self.directory / META_FILE
+        try:
+            mtime = meta_path.stat().st_mtime
+        except FileNotFoundError:
+            self._meta, self._meta_mtime, self._arrays = {}, None, {}
+            return self._meta
+        if mtime != self._meta_mtime:
+            self._meta = json.loads(meta_path.read_text()).get("series", {})
+            self._meta_mtime = mtime
+            self._arrays = {}
+        return self._meta
+
+    def available(self) -> bool:
+        with self._lock:
+            return bool(self._refresh())
+
+    def series(self) -> dict[str, dict]:
+        """
+        Metadata of every stored series, keyed by name.
+        """
+        with self._lock:
+            return dict(self._refresh())
+
+    def _arrays_for(self, name: str) -> tuple[np.ndarray, np.ndarray]:
+        with self._lock:
+            meta = self._refresh()
+            if name not in meta:
+                known = ", ".join(sorted(meta)) or "none"
+                raise KeyError(
+                    f"Unknown market data series {name!r} (available: {known})"
+                )
+            if name not in self._arrays:
+                self._arrays[name] = (
+                    np.load(self.directory / f"{name}.dates.npy", mmap_mode="r"),
+                    np.load(self.directory / f"{name}.values.npy", mmap_mode="r"),
+                )
+            return self._arrays[name]
+
+    def get(
+        self, name: str, start: str | None = None, end: str | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Dates and values of ``name`` between ``start`` and ``end`` inclusive
+        (ISO dates, either may be omitted). The arrays are read-only views of
+        the memory-mapped files.
+        """
+        dates, values = self._arrays_for(name)
+        self.queries += 1
+        lo = 0 if start is None else np.searchsorted(dates, np.datetime64(start, "D"))
+        hi = (
+            dates.size
+            if end is None
+            else np.searchsorted(dates, np.datetime64(end, "D"), side="right")
+        )
+        return dates[lo:hi], values[lo:hi]
+
+    def aligned(
+        self, names: list[str], start: str | None = None, end: str | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Values of several series on the dates they all share, as a
+        ``(dates, len(names))`` array.
+        """
+        columns = [self.get(name, start, end) for name in names]
+        common = columns[0][0]
+        for dates, _ in columns[1:]:
+            common = np.intersect1d(common, dates, assume_unique=True)
+        matrix = np.empty((common.size, len(names)))
+        for i, (dates, values) in enumerate(columns):
+            matrix[:, i] = values[np.searchsorted(dates, common)]
+        return common, matrix
+
+    def periodic_returns(
+        self, name: str, start: str | None = None, end: str | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Simple returns between consecutive observations of a price or index
+        series, dated at the end of each period.
+        """
+        dates, values = self.get(name, start, end)
+        return dates[1:], np.diff(values) / values[:-1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            meta = self._refresh()
+            return {
+                "directory": str(self.directory),
+                "series": len(meta),
+                "mapped": len(self._arrays),
+                "queries": self.queries,
+            }
+
+
+def periods_per_year(dates: np.ndarray) -> float:
+    """
+    Observations per year (252 trading days, 52, 12, 4 or 1) inferred from
+    the median spacing of ``dates``.
+    """
+    if dates.size < 2:
+        return 1.0
+    gap = np.median(np.diff(dates).astype(np.float64))
+    for max_gap, periods in ((4, 252.0), (10, 52.0), (45, 12.0), (120, 4.0)):
+        if gap <= max_gap:
+            return periods
+    return 1.0
+
+
+market_data = MarketDataStore(MARKET_DATA_DIR)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m financial_planner.market_data",
+        description="Build the local historical market data store.",
+    )
+    parser.add_argument("--dir", default=MARKET_DATA_DIR, help="store directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="download the default FRED series")
+    build.add_argument(
+        "--series",
+        nargs="*",
+        choices=sorted(DEFAULT_FRED_SERIES),
+        help="only these series",
+    )
+
+    ingest = commands.add_parser("ingest-csv", help="add a series from a CSV file")
+    ingest.add_argument("path")
+    ingest.add_argument("--name", required=True)
+    ingest.add_argument("--kind", choices=SERIES_KINDS, default="price")
+    ingest.add_argument("--date-column")
+    ingest.add_argument("--value-column")
+    ingest.add_argument("--description", default="")
+
+    commands.add_parser("list", help="show the stored series")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "build":
+        series = {
+            name: spec
+            for name, spec in DEFAULT_FRED_SERIES.items()
+            if not args.series or name in args.series
+        }
+        written = build_from_fred(args.dir, series)
+        print(f"Wrote {len(written)} series to {args.dir}: {', '.join(written)}")
+    elif args.command == "ingest-csv":
+        dates, values = parse_series_csv(
+            Path(args.path).read_text(), args.date_column, args.value_column
+        )
+        entry = write_series(
+            args.dir,
+            args.name,
+            dates,
+            values,
+            args.kind,
+            args.description,
+            f"csv:{Path(args.path).name}",
+        )
+        print(
+            f"Wrote {args.name}: {entry['count']} rows, {entry['start']} to {entry['end']}"
+        )
+    else:
+        for name, entry in MarketDataStore(args.dir).series().items():
+            print(
+                f"{name:16} {entry['kind']:6} {entry['start']} to {entry['end']}"
+                f"  {entry['description']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
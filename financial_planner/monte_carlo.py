@@ -0,0 +1,189 @@
+"""
+Vectorized Monte Carlo simulation of a portfolio with yearly contributions
+and withdrawals.
+
+Paths are simulated together as NumPy arrays with one row per year, so each
+year's update touches contiguous memory. When Numba
+is installed the yearly recursion is compiled; otherwise it runs as NumPy
+operations over all paths at once.
+"""
+
+import logging
+
+import numpy as np
+
+from financial_planner import MONTE_CARLO_MAX_PATHS, MONTE_CARLO_PATHS
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+RETURN_DISTRIBUTIONS = ("normal", "lognormal", "student_t")
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def sample_returns(
+    rng: np.random.Generator,
+    n_paths: int,
+    years: int,
+    mean_return: float,
+    volatility: float,
+    distribution: str = "normal",
+    degrees_of_freedom: float = 5.0,
+) -> np.ndarray:
+    """
+    Draw a ``(years, n_paths)`` array of annual returns with the given
+    arithmetic mean and standard deviation.
+    """
+    if distribution == "normal":
+        return rng.normal(mean_return, volatility, size=(years, n_paths))
+    if distribution == "lognormal":
+        # Match the first two moments of the gross return 1 + r.
+        log_variance = np.log1p(volatility**2 / (1 + mean_return) ** 2)
+        log_mean = np.log1p(mean_return) - log_variance / 2
+        return np.expm1(
+            rng.normal(log_mean, np.sqrt(log_variance), size=(years, n_paths))
+        )
+    if distribution == "student_t":
+        if degrees_of_freedom <= 2:
+            raise ValueError("degrees_of_freedom must be greater than 2")
+        # Fat tails, rescaled so the standard deviation is ``volatility``.
+        scale = volatility * np.sqrt((degrees_of_freedom - 2) / degrees_of_freedom)
+        draws = rng.standard_t(degrees_of_freedom, size=(years, n_paths))
+        return np.maximum(mean_return + scale * draws, -1.0)
+    raise ValueError(
+        f"Unknown return distribution {distribution!r}; "
+        f"expected one of {', '.join(RETURN_DISTRIBUTIONS)}"
+    )
+
+
+def _simulate_balances_numpy(
+    initial_balance: float, returns: np.ndarray, cashflows: np.ndarray
+) -> np.ndarray:
+    years, n_paths = returns.shape
+    balances = np.empty((years + 1, n_paths))
+    balances[0] = initial_balance
+    depleted = np.zeros(n_paths, dtype=bool)
+    for year in range(years):
+        balance = balances[year] * (1 + returns[year]) + cashflows[year]
+        # A portfolio a withdrawal has emptied stays depleted.
+        if cashflows[year] < 0:
+            depleted |= balance <= 0
+        np.maximum(balance, 0.0, out=balance)
+        balance[depleted] = 0.0
+        balances[year + 1] = balance
+    return balances
+
+
+if numba is not None:
+
+    @numba.njit(parallel=True, cache=True)
+    def _simulate_balances_numba(initial_balance, returns, cashflows):
+        years, n_paths = returns.shape
+        balances = np.empty((years + 1, n_paths))
+        for path in numba.prange(n_paths):
+            balance = initial_balance
+            depleted = False
+            balances[0, path] = balance
+            for year in range(years):
+                if not depleted:
+                    balance = balance * (1 + returns[year, path]) + cashflows[year]
+                    if balance <= 0:
+                        balance = 0.0
+                        depleted = cashflows[year] < 0
+                balances[year + 1, path] = balance
+        return balances
+
+
+def simulate_balances(
+    initial_balance: float, returns: np.ndarray, cashflows: np.ndarray
+) -> np.ndarray:
+    """
+    Portfolio balance of every path at the start of each year and after the
+    last, shape ``(years + 1, n_paths)``. Each year the balance earns that
+    year's return and then receives ``cashflows[year]`` (negative for
+    withdrawals). Balances never go below zero: a path a withdrawal empties
+    stays at zero, while an empty portfolio still grows from contributions.
+    """
+    returns = np.ascontiguousarray(returns, dtype=float)
+    cashflows = np.ascontiguousarray(cashflows, dtype=float)
+    if numba is not None:
+        return _simulate_balances_numba(float(initial_balance), returns, cashflows)
+    return _simulate_balances_numpy(float(initial_balance), returns, cashflows)
+
+
+def simulate_retirement(
+    initial_balance: float,
+    annual_contribution: float,
+    years_to_retirement: int,
+    annual_withdrawal: float,
+    years_in_retirement: int,
+    mean_return: float = 0.07,
+    volatility: float = 0.15,
+    inflation: float = 0.025,
+    distribution: str = "normal",
+    degrees_of_freedom: float = 5.0,
+    n_paths: int = MONTE_CARLO_PATHS,
+    percentiles: tuple[float, ...] = DEFAULT_PERCENTILES,
+    seed: int | None = None,
+) -> dict:
+    """
+    Simulate saving ``annual_contribution`` for ``years_to_retirement`` years,
+    then withdrawing ``annual_withdrawal`` for ``years_in_retirement`` years.
+    Contributions and withdrawals are in today's dollars and grow with
+    inflation; returns are nominal.
+
+    Returns a dict with ``years``, ``percentiles`` (percentile -> balance in
+    today's dollars for every year), ``success_rate`` (share of paths never
+    depleted), ``median_depletion_year`` of the failed paths and the
+    ``final_balance`` percentiles.
+    """
+    if not 1 <= n_paths <= MONTE_CARLO_MAX_PATHS:
+        raise ValueError(f"n_paths must be between 1 and {MONTE_CARLO_MAX_PATHS}")
+    years = int(years_to_retirement) + int(years_in_retirement)
+    if years <= 0:
+        raise ValueError("The simulation must cover at least one year")
+
+    price_level = np.power(1 + inflation, np.arange(years + 1))
+    cashflows = (
+        np.where(
+            np.arange(years) < years_to_retirement,
+            annual_contribution,
+            -annual_withdrawal,
+        )
+        * price_level[1:]
+    )
+
+    rng = np.random.default_rng(seed)
+    returns = sample_returns(
+        rng,
+        n_paths,
+        years,
+        mean_return,
+        volatility,
+        distribution,
+        degrees_of_freedom,
+    )
+    balances = simulate_balances(initial_balance, returns, cashflows)
+    real_balances = balances / price_level[:, np.newaxis]
+
+    # Only a withdrawal can deplete a path; a zero balance while saving
+    # is just a portfolio that has not been funded yet.
+    depleted = (real_balances[1:] <= 0) & (cashflows < 0)[:, np.newaxis]
+    failed = depleted.any(axis=0)
+    depletion_years = np.argmax(depleted[:, failed], axis=0) + 1
+    bands = np.percentile(real_balances, percentiles, axis=1)
+
+    return {
+        "years": np.arange(years + 1),
+        "percentiles": dict(zip(percentiles, bands)),
+        "success_rate": float(1 - failed.mean()),
+        "median_depletion_year": (
+            float(np.median(depletion_years)) if depletion_years.size else None
+        ),
+        "final_balance": dict(zip(percentiles, bands[:, -1])),
+        "n_paths": n_paths,
+    }
@@ -0,0 +1,225 @@
+"""
+Portfolio construction: shrunk covariance estimates, mean-variance and
+risk-parity weights, and efficient-frontier sweeps.
+
+Weights are long-only and fully invested, with an optional cap per asset.
+Inputs are annualized expected returns and covariances, either estimated
+from the market data store or supplied as capital market assumptions.
+"""
+
+import numpy as np
+from scipy.optimize import minimize
+
+from financial_planner.market_data import MarketDataStore, periods_per_year
+
+# Risk aversion (lambda in  mu'w - lambda/2 w'Sigma w) for the profile's risk
+# tolerance, scaled up for short horizons where drawdowns cannot be waited out.
+RISK_AVERSION = {"low": 8.0, "moderate": 4.0, "high": 2.0}
+HORIZON_RISK_MULTIPLIER = {"short-term": 2.0, "medium-term": 1.3, "long-term": 1.0}
+
+
+def risk_aversion_for(risk_tolerance: str | None, time_horizon: str | None) -> float:
+    aversion = RISK_AVERSION.get((risk_tolerance or "moderate").lower(), 4.0)
+    return aversion * HORIZON_RISK_MULTIPLIER.get((time_horizon or "").lower(), 1.0)
+
+
+def shrunk_covariance(returns: np.ndarray) -> tuple[np.ndarray, float]:
+    """
+    Ledoit-Wolf covariance of ``returns`` (periods x assets), shrunk toward a
+    scaled identity. Returns the covariance and the shrinkage intensity.
+    """
+    returns = np.asarray(returns, dtype=float)
+    n_periods, n_assets = returns.shape
+    centered = returns - returns.mean(axis=0)
+    sample = centered.T @ centered / n_periods
+    target_variance = np.trace(sample) / n_assets
+
+    # Ledoit and Wolf (2004): distance of the sample from the target and the
+    # estimation error of the sample, both in Frobenius norm.
+    distance = np.sum((sample - target_variance * np.eye(n_assets)) ** 2)
+    squared = centered**2
+    error = np.sum(squared.T @ squared / n_periods - sample**2) / n_periods
+    shrinkage = float(np.clip(error / distance, 0.0, 1.0)) if distance > 0 else 1.0
+    covariance = (
+        shrinkage * target_variance * np.eye(n_assets) + (1 - shrinkage) * sample
+    )
+    return covariance, shrinkage
+
+
+def estimate_moments(
+    returns: np.ndarray, periods: float
+) -> tuple[np.ndarray, np.ndarray, float]:
+    """
+    Annualized mean returns and shrunk covariance from periodic returns.
+    """
+    covariance, shrinkage = shrunk_covariance(returns)
+    return returns.mean(axis=0) * periods, covariance * periods, shrinkage
+
+
+def _bounds(n_assets: int, max_weight: float) -> list[tuple[float, float]]:
+    if max_weight * n_assets < 1 - 1e-9:
+        raise ValueError(
+            f"max_weight {max_weight} cannot fully invest {n_assets} assets"
+        )
+    return [(0.0, max_weight)] * n_assets
+
+
+def _solve(objective, n_assets, max_weight, constraints=(), start=None):
+    constraints = [
+        {"type": "eq", "fun": lambda w: w.sum() - 1, "jac": lambda w: np.ones_like(w)},
+        *constraints,
+    ]
+    start = np.full(n_assets, 1 / n_assets) if start is None else start
+    result = minimize(
+        objective,
+        start,
+        jac=True,
+        method="SLSQP",
+        bounds=_bounds(n_assets, max_weight),
+        constraints=constraints,
+        options={"ftol": 1e-12, "maxiter": 500},
+    )
+    if not result.success:
+        raise ValueError(f"Optimization failed: {result.message}")
+    weights = np.clip(result.x, 0.0, None)
+    return weights / weights.sum()
+
+
+def mean_variance_weights(
+    expected_returns: np.ndarray,
+    covariance: np.ndarray,
+    risk_aversion: float,
+    max_weight: float = 1.0,
+) -> np.ndarray:
+    """
+    Weights maximizing ``mu'w - risk_aversion / 2 * w'Sigma w``.
+    """
+
+    def objective(w):
+        sigma_w = covariance @ w
+        value = risk_aversion / 2 * w @ sigma_w - expected_returns @ w
+        return value, risk_aversion * sigma_w - expected_returns
+
+    return _solve(objective, len(expected_returns), max_weight)
+
+
+def min_variance_weights(
+    covariance: np.ndarray,
+    max_weight: float = 1.0,
+    target_return: float | None = None,
+    expected_returns: np.ndarray | None = None,
+    start: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Minimum-variance weights, optionally with an expected return of exactly
+    ``target_return``.
+    """
+
+    def objective(w):
+        sigma_w = covariance @ w
+        return w @ sigma_w, 2 * sigma_w
+
+    constraints = []
+    if target_return is not None:
+        constraints.append(
+            {
+                "type": "eq",
+                "fun": lambda w: expected_returns @ w - target_return,
+                "jac": lambda w: expected_returns,
+            }
+        )
+    return _solve(objective, len(covariance), max_weight, constraints, start)
+
+
+def risk_parity_weights(covariance: np.ndarray) -> np.ndarray:
+    """
+    Weights with equal risk contributions, from the convex formulation
+    ``min 1/2 y'Sigma y - sum(log y) / n`` (Spinu, 2013), normalized.
+    """
+    n_assets = len(covariance)
+    scale = np.sqrt(np.diag(covariance))
+
+    def objective(y):
+        sigma_y = covariance @ y
+        value = 0.5 * y @ sigma_y - np.log(y).sum() / n_assets
+        return value, sigma_y - 1 / (n_assets * y)
+
+    result = minimize(
+        objective,
+        1 / scale,
+        jac=True,
+        method="L-BFGS-B",
+        bounds=[(1e-12, None)] * n_assets,
+    )
+    return result.x / result.x.sum()
+
+
+def efficient_frontier(
+    expected_returns: np.ndarray,
+    covariance: np.ndarray,
+    n_points: int = 20,
+    max_weight: float = 1.0,
+) -> dict[str, np.ndarray]:
+    """
+    Minimum-variance portfolios for ``n_points`` target returns from the
+    global minimum-variance portfolio up to the highest attainable return.
+    Each solve starts from the previous solution.
+    """
+    weights = min_variance_weights(covariance, max_weight)
+    low = expected_returns @ weights
+    # The highest return under the cap fills the best assets first.
+    remaining, high = 1.0, 0.0
+    for i in np.argsort(expected_returns)[::-1]:
+        take = min(max_weight, remaining)
+        high += take * expected_returns[i]
+        remaining -= take
+        if remaining <= 0:
+            break
+
+    frontier = []
+    for target in np.linspace(low, high, n_points):
+        weights = min_variance_weights(
+            covariance, max_weight, target, expected_returns, start=weights
+        )
+        frontier.append(weights)
+    frontier = np.array(frontier)
+    return {
+        "weights": frontier,
+        "returns": frontier @ expected_returns,
+        "volatilities": np.sqrt(
+            np.einsum("ij,jk,ik->i", frontier, covariance, frontier)
+        ),
+    }
+
+
+def portfolio_statistics(
+    weights: np.ndarray,
+    expected_returns: np.ndarray,
+    covariance: np.ndarray,
+    risk_free_rate: float = 0.0,
+) -> dict[str, float | np.ndarray]:
+    volatility = float(np.sqrt(weights @ covariance @ weights))
+    expected = float(weights @ expected_returns)
+    return {
+        "expected_return": expected,
+        "volatility": volatility,
+        "sharpe": (expected - risk_free_rate) / volatility if volatility else 0.0,
+        "risk_contributions": weights * (covariance @ weights) / volatility**2,
+    }
+
+
+def historical_moments(
+    store: MarketDataStore,
+    assets: list[str],
+    start: str | None = None,
+    end: str | None = None,
+) -> tuple[np.ndarray, np.ndarray, float]:
+    """
+    Annualized mean returns and shrunk covariance of price series in
+    ``store`` over their common dates.
+    """
+    dates, levels = store.aligned(assets, start, end)
+    if dates.size < len(assets) + 2:
+        raise ValueError("Not enough overlapping history for these assets")
+    returns = np.diff(levels, axis=0) / levels[:-1]
+    return estimate_moments(returns, periods_per_year(dates))
@@ -0,0 +1,139 @@
+import asyncio
+import email.utils
+import logging
+import time
+
+from financial_planner import (
+    ANTHROPIC_RATE_LIMIT_BURST,
+    ANTHROPIC_RATE_LIMIT_RPM,
+    OPENAI_RATE_LIMIT_BURST,
+    OPENAI_RATE_LIMIT_RPM,
+    PERPLEXITY_RATE_LIMIT_BURST,
+    PERPLEXITY_RATE_LIMIT_RPM,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Async token bucket shared by every caller of one external API.
+
+    Callers wait on ``acquire()`` before sending a request and are released in
+    arrival order at the configured rate. A rate-limit response from the API
+    pauses the whole bucket via ``block_for()``, so waiting callers resume at
+    the bucket rate instead of all retrying at once. A rate of 0 disables the
+    limit, though rate-limit pauses still apply.
+    """
+
+    def __init__(self, name: str, rate_per_minute: float, burst: float):
+        if rate_per_minute < 0:
+            raise ValueError(
+                f"{name} rate limit must be 0 (unlimited) or positive, "
+                f"got {rate_per_minute}"
+            )
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1.0, float(burst))
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+        self.waiting = 0
+        self.acquired = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Wait until a request may be sent and return the time spent waiting.
+        """
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    delay = self._blocked_until - now
+                    if delay <= 0:
+                        if not self.rate:
+                            break
+                        if self._tokens >= tokens:
+                            self._tokens -= tokens
+                            break
+                        delay = (tokens - self._tokens) / self.rate
+                    await asyncio.sleep(delay)
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - started
+        self.acquired += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def block_for(self, seconds: float) -> None:
+        """
+        Pause the bucket after the API reported a rate limit.
+        """
+        self.throttled += 1
+        self._tokens = 0.0
+        self._updated_at = time.monotonic()
+        self._blocked_until = max(self._blocked_until, self._updated_at + seconds)
+        logger.warning(
+            f"{self.name} rate limited. Pausing for {seconds:.1f} seconds..."
+        )
+
+    def stats(self) -> dict:
+        return {
+            "rate_per_minute": self.rate * 60.0,
+            "burst": self.capacity,
+            "queue_depth": self.waiting,
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "total_wait_seconds": round(self.total_wait, 3),
+            "avg_wait_seconds": (
+                round(self.total_wait / self.acquired, 3) if self.acquired else 0.0
+            ),
+            "max_wait_seconds": round(self.max_wait, 3),
+        }
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parse a ``Retry-After`` header given either in seconds or as an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+rate_limiters = {
+    "perplexity": TokenBucket(
+        "perplexity", PERPLEXITY_RATE_LIMIT_RPM, PERPLEXITY_RATE_LIMIT_BURST
+    ),
+    "openai": TokenBucket("openai", OPENAI_RATE_LIMIT_RPM, OPENAI_RATE_LIMIT_BURST),
+    "anthropic": TokenBucket(
+        "anthropic", ANTHROPIC_RATE_LIMIT_RPM, ANTHROPIC_RATE_LIMIT_BURST
+    ),
+}
+
+
+def get_rate_limiter(name: str) -> TokenBucket:
+    return rate_limiters[name]
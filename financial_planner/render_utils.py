@@ -179,6 +179,25 @@ def get_base_css() -> str:
                 color: #64748b;
                 color: var(--text-secondary);
             }
+            .event-search-progress::before {
+                content: "";
+                position: absolute;
+                left: 0;
+                top: 0;
+                bottom: 0;
+                width: 5px;
+                border-radius: 12px 0 0 12px;
+                background-color: #0ea5e9;
+                background-color: var(--brand-info);
+            }
+            .search-progress-text {
+                white-space: pre-wrap;
+                max-height: 240px;
+                overflow-y: auto;
+                font-size: 13px;
+                color: #64748b;
+                color: var(--text-secondary);
+            }
             .no-answer {
                 color: #64748b;
                 color: var(--text-secondary);
@@ -253,6 +272,35 @@ def stringify_event(event: object) -> str:
     return "".join(html)
 
 
+def stringify_search_progress(
+    progress_id: str, query: str, text: str, first: bool
+) -> str:
+    """
+    Render streamed search text. The first chunk for a search opens a progress
+    block; later chunks are templates the page appends to that block.
+    """
+    global css_added
+    if not first:
+        return (
+            f"<template data-progress-target='{escape_html(progress_id)}'>"
+            f"{escape_html(text)}</template>"
+        )
+
+    html = []
+    if not css_added:
+        html.append(get_base_css())
+        css_added = True
+    html.append(
+        "<div class='event-block event-search-progress gradient-bg-blue' style='position: relative;'>"
+        "<div class='event-meta'><span class='event-icon'><i class='bi bi-search pulse-animation'></i></span>"
+        "<span class='event-type'>Searching</span></div>"
+        f"<div class='event-meta'><span>Query:</span>&nbsp;<em>{escape_html(query)}</em></div>"
+        f"<div class='event-content search-progress-text' id='{escape_html(progress_id)}'>{escape_html(text)}</div>"
+        "</div>"
+    )
+    return "".join(html)
+
+
 def render_tool_call_request_event(content: list) -> str:
     lines = []
     for call in content:
@@ -262,7 +310,9 @@ def render_tool_call_request_event(content: list) -> str:
 
         try:
             args_dict = json.loads(raw_args)
-            query_str = args_dict.get("query", "")
+            query_str = args_dict.get("query") or "; ".join(
+                args_dict.get("queries", [])
+            )
         except Exception:
             query_str = raw_args
 
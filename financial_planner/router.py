@@ -0,0 +1,381 @@
+import logging
+import re
+import time
+from typing import Callable, NamedTuple
+
+from financial_planner import FAST_PATH_ROUTING
+from financial_planner.tax_tables import STATE_TAXES
+from financial_planner.tools import (
+    compound_interest_calculator,
+    contribution_limits_lookup,
+    income_tax_calculator,
+    inflation_calculator,
+    loan_amortization_calculator,
+)
+
+logger = logging.getLogger(__name__)
+
+# Routes, cheapest first: a calculator answers directly with no model call,
+# the advisor answers alone with its tools, or the full team plans the work.
+ROUTE_TOOL = "tool"
+ROUTE_AGENT = "single_agent"
+ROUTE_TEAM = "team"
+
+AMOUNT = r"\$\s*([\d,]+(?:\.\d+)?)\s*(k|m|thousand|million)?\b"
+RATE = r"([\d.]+)\s*(?:%|percent)"
+YEARS = r"(\d+(?:\.\d+)?)\s*(years?|yrs?|months?)\b"
+
+# Needs fresh information from the web.
+NEEDS_SEARCH_PATTERN = re.compile(
+    r"\b(current|currently|today|now|latest|recent|live|this (week|month|year)|"
+    r"news|quote|trading at|stock price|forecast|outlook|predict)\b"
+)
+# Needs judgement, several steps or a comparison of options.
+NEEDS_PLANNING_PATTERN = re.compile(
+    r"\b(should|recommend|recommendation|best|plan|planning|strategy|strategies|"
+    r"compare|comparison|versus|vs|better|worse|pros|cons|advice|advise|"
+    r"help me decide|which)\b"
+)
+# Within reach of the advisor's calculator tools.
+CALCULATOR_DOMAIN_PATTERN = re.compile(
+    r"\b(compound|compounded|compounding|interest|loan|mortgage|payment|payments|"
+    r"amortization|amortize|npv|irr|present value|future value|annuity|"
+    r"inflation|purchasing power|savings rate|tax|taxes|bracket|deduction|"
+    r"401\(?k\)?|ira|hsa|contribution|retire|retirement|monte carlo|"
+    r"allocation|portfolio|grow|worth)\b"
+)
+AGENT_MAX_WORDS = 60
+
+# Details the calculator fast paths do not model. A query mentioning one
+# goes to the advisor, whose tools take them into account.
+COMPOUND_UNHANDLED_PATTERN = re.compile(
+    r"\b(contribut\w*|deposit\w*|extra|additional|withdraw\w*|inflation|fees?)\b"
+)
+LOAN_UNHANDLED_PATTERN = re.compile(
+    r"\b(extra|additional|prepay\w*|down ?payment|balloon|refinanc\w*|pmi|"
+    r"escrow|insurance|property tax(es)?)\b"
+)
+INFLATION_UNHANDLED_PATTERN = re.compile(
+    r"\b(return|returns|interest|invest\w*|grow\w*|earn\w*|yield\w*|contribut\w*)\b"
+)
+INCOME_TAX_UNHANDLED_PATTERN = re.compile(
+    r"\b(contribut\w*|401\(?k\)?|ira|hsa|deduct\w*|itemiz\w*|gains?|capital|"
+    r"dividends?|interest|bonus|rental|self[- ]employ\w*|business|credits?|"
+    r"withh\w*|after|minus|plus|"
+    # Joint income, and the tax on extra income rather than on a total.
+    r"wife|husband|spouse|partner|we|our|couple|"
+    r"raise|increase|additional|extra|side)\b"
+)
+
+# Every state and DC. Longer names are matched first, so "west virginia" is
+# not read as Virginia, nor "washington dc" as Washington state.
+STATE_NAMES = {
+    "alabama": "AL",
+    "alaska": "AK",
+    "arizona": "AZ",
+    "arkansas": "AR",
+    "california": "CA",
+    "colorado": "CO",
+    "connecticut": "CT",
+    "delaware": "DE",
+    "district of columbia": "DC",
+    "washington dc": "DC",
+    "washington d.c": "DC",
+    "florida": "FL",
+    "georgia": "GA",
+    "hawaii": "HI",
+    "idaho": "ID",
+    "illinois": "IL",
+    "indiana": "IN",
+    "iowa": "IA",
+    "kansas": "KS",
+    "kentucky": "KY",
+    "louisiana": "LA",
+    "maine": "ME",
+    "maryland": "MD",
+    "massachusetts": "MA",
+    "michigan": "MI",
+    "minnesota": "MN",
+    "mississippi": "MS",
+    "missouri": "MO",
+    "montana": "MT",
+    "nebraska": "NE",
+    "nevada": "NV",
+    "new hampshire": "NH",
+    "new jersey": "NJ",
+    "new mexico": "NM",
+    "new york": "NY",
+    "north carolina": "NC",
+    "north dakota": "ND",
+    "ohio": "OH",
+    "oklahoma": "OK",
+    "oregon": "OR",
+    "pennsylvania": "PA",
+    "rhode island": "RI",
+    "south carolina": "SC",
+    "south dakota": "SD",
+    "tennessee": "TN",
+    "texas": "TX",
+    "utah": "UT",
+    "vermont": "VT",
+    "virginia": "VA",
+    "washington": "WA",
+    "west virginia": "WV",
+    "wisconsin": "WI",
+    "wyoming": "WY",
+}
+STATE_NAME_PATTERN = re.compile(
+    r"\b("
+    + "|".join(re.escape(name) for name in sorted(STATE_NAMES, key=len, reverse=True))
+    + r")(?!\w)"
+)
+STATE_CODES = frozenset(STATE_NAMES.values())
+
+
+class RouteDecision(NamedTuple):
+    route: str
+    reason: str
+    answer: str | None = None
+
+
+def parse_amount(match: re.Match) -> float:
+    value = float(match.group(1).replace(",", ""))
+    suffix = (match.group(2) or "").lower()
+    if suffix in ("k", "thousand"):
+        value *= 1_000
+    elif suffix in ("m", "million"):
+        value *= 1_000_000
+    return value
+
+
+def parse_years(match: re.Match) -> float:
+    value = float(match.group(1))
+    return value / 12 if match.group(2).startswith("month") else value
+
+
+def _find(pattern: str, text: str) -> re.Match | None:
+    return re.search(pattern, text)
+
+
+def uses_every_figure(text: str, rates: int = 1) -> bool:
+    """
+    Whether the query's figures are exactly the ones a handler reads: one
+    amount, ``rates`` rates and at most one term. Any other amount or rate
+    would be silently ignored, so the query needs the advisor instead.
+    """
+    return (
+        len(re.findall(AMOUNT, text)) == 1
+        and len(re.findall(RATE, text)) == rates
+        and len(re.findall(YEARS, text)) <= 1
+    )
+
+
+def compounds_per_year(text: str) -> int | None:
+    for word, periods in (("daily", 365), ("monthly", 12), ("quarterly", 4)):
+        if word in text:
+            return periods
+    if re.search(r"\b(annually|yearly)\b", text):
+        return 1
+    return None
+
+
+def handle_compound_interest(text: str) -> str | None:
+    if not re.search(r"\b(compound|compounded|compounding|grow|grows|worth)\b", text):
+        return None
+    # Regular contributions or withdrawals need the advisor's tools.
+    if COMPOUND_UNHANDLED_PATTERN.search(text) or not uses_every_figure(text):
+        return None
+    amount, rate, years = _find(AMOUNT, text), _find(RATE, text), _find(YEARS, text)
+    if not (amount and rate and years):
+        return None
+    periods = compounds_per_year(text)
+    answer = compound_interest_calculator(
+        parse_amount(amount),
+        float(rate.group(1)) / 100,
+        parse_years(years),
+        periods or 1,
+    )
+    if periods is None:
+        answer += (
+            "\nAssumes annual compounding; ask again with monthly or daily "
+            "compounding if that applies."
+        )
+    return answer
+
+
+def handle_loan_payment(text: str) -> str | None:
+    if not re.search(r"\b(loan|mortgage)\b", text):
+        return None
+    if not re.search(r"\b(payment|payments|pay|amortization|amortize|cost)\b", text):
+        return None
+    if LOAN_UNHANDLED_PATTERN.search(text) or not uses_every_figure(text):
+        return None
+    amount, rate, years = _find(AMOUNT, text), _find(RATE, text), _find(YEARS, text)
+    if not (amount and rate and years):
+        return None
+    return loan_amortization_calculator(
+        parse_amount(amount), float(rate.group(1)) / 100, parse_years(years)
+    )
+
+
+def handle_inflation(text: str) -> str | None:
+    if "inflation" not in text:
+        return None
+    # An investment return alongside inflation needs both rates applied.
+    if INFLATION_UNHANDLED_PATTERN.search(text) or not uses_every_figure(text):
+        return None
+    amount, rate, years = _find(AMOUNT, text), _find(RATE, text), _find(YEARS, text)
+    if not (amount and rate and years):
+        return None
+    to_future = bool(re.search(r"\b(need|needed|equivalent|cost)\b", text))
+    return inflation_calculator(
+        parse_amount(amount), float(rate.group(1)) / 100, parse_years(years), to_future
+    )
+
+
+def handle_contribution_limits(text: str) -> str | None:
+    if not re.search(r"\b(401\(?k\)?|ira|hsa)\b", text):
+        return None
+    if not re.search(
+        r"\b(limit|limits|maximum|max|how much can i (contribute|put))\b", text
+    ):
+        return None
+    year = re.search(r"\b(20\d\d)\b", text)
+    age = re.search(r"\b(?:age|aged|i am|i'm)\s*(\d{2})\b", text)
+    answer = contribution_limits_lookup(
+        int(year.group(1)) if year else None, int(age.group(1)) if age else None
+    )
+    return None if answer.startswith("Error") else answer
+
+
+def handle_income_tax(text: str) -> str | None:
+    if not re.search(r"\b(tax|taxes)\b", text):
+        return None
+    if not re.search(r"\b(income|salary|earn|earning|make|making|wages)\b", text):
+        return None
+    # Other income, contributions and deductions change taxable income.
+    if INCOME_TAX_UNHANDLED_PATTERN.search(text):
+        return None
+    if not uses_every_figure(text, rates=0):
+        return None
+    amount = _find(AMOUNT, text)
+    if re.search(r"\b(married|joint|jointly)\b", text):
+        filing_status = "married_joint"
+        if "separate" in text:
+            filing_status = "married_separate"
+    elif "head of household" in text:
+        filing_status = "head_of_household"
+    else:
+        filing_status = "single"
+    name = STATE_NAME_PATTERN.search(text)
+    state = STATE_NAMES[name.group(1)] if name else None
+    if state is None:
+        code = re.search(r"\b(?:in|state of)\s+([a-z]{2})\b", text)
+        if code and code.group(1).upper() in STATE_CODES:
+            state = code.group(1).upper()
+    # Without a table for the state, a federal-only total would be wrong.
+    if state is not None and state not in STATE_TAXES:
+        return None
+    year = re.search(r"\b(20\d\d)\b", text)
+    answer = income_tax_calculator(
+        parse_amount(amount),
+        filing_status,
+        int(year.group(1)) if year else None,
+        state,
+    )
+    return None if answer.startswith("Error") else answer
+
+
+# Tried in order; the first handler that can parse the query answers it.
+DETERMINISTIC_HANDLERS: list[tuple[str, Callable[[str], str | None]]] = [
+    ("contribution_limits", handle_contribution_limits),
+    ("income_tax", handle_income_tax),
+    ("loan_payment", handle_loan_payment),
+    ("inflation", handle_inflation),
+    ("compound_interest", handle_compound_interest),
+]
+
+
+def route_query(query: str) -> RouteDecision:
+    """
+    Choose the cheapest path that can answer ``query``. Calculator answers
+    use only the figures in the query, never the client's profile; a query
+    that leaves a figure to the profile, such as "my income", has no amount
+    for a handler to read and goes to the advisor, which sees the profile.
+    """
+    text = " ".join(query.lower().split())
+    if not FAST_PATH_ROUTING:
+        return RouteDecision(ROUTE_TEAM, "fast path routing disabled")
+    if NEEDS_SEARCH_PATTERN.search(text):
+        return RouteDecision(ROUTE_TEAM, "needs current information")
+    if text.count("?") > 1 or len(text.split()) > AGENT_MAX_WORDS:
+        return RouteDecision(ROUTE_TEAM, "several questions or a long request")
+
+    if NEEDS_PLANNING_PATTERN.search(text):
+        return RouteDecision(ROUTE_TEAM, "needs planning or a recommendation")
+
+    for name, handler in DETERMINISTIC_HANDLERS:
+        try:
+            answer = handler(text)
+        except Exception as e:
+            logger.warning(f"Fast path handler {name} failed: {e}")
+            continue
+        if answer is not None:
+            return RouteDecision(ROUTE_TOOL, name, answer)
+
+    if CALCULATOR_DOMAIN_PATTERN.search(text):
+        return RouteDecision(ROUTE_AGENT, "within the advisor's calculator tools")
+    return RouteDecision(ROUTE_TEAM, "needs research or analysis")
+
+
+class RouterStats:
+    """
+    Counts and end-to-end latency per route, to measure what the fast paths
+    save against full team runs.
+    """
+
+    def __init__(self):
+        self.routes: dict[str, dict[str, float]] = {}
+        self.routing_seconds = 0.0
+
+    def record_routing(self, seconds: float) -> None:
+        self.routing_seconds += seconds
+
+    def record_run(self, route: str, seconds: float) -> None:
+        entry = self.routes.setdefault(
+            route, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+        )
+        entry["count"] += 1
+        entry["total_seconds"] += seconds
+        entry["max_seconds"] = max(entry["max_seconds"], seconds)
+
+    def stats(self) -> dict:
+        routed = sum(entry["count"] for entry in self.routes.values())
+        return {
+            "enabled": FAST_PATH_ROUTING,
+            "routing_seconds": round(self.routing_seconds, 6),
+            "routes": {
+                route: {
+                    "count": entry["count"],
+                    "share": entry["count"] / routed if routed else 0.0,
+                    "mean_seconds": entry["total_seconds"] / entry["count"],
+                    "max_seconds": entry["max_seconds"],
+                }
+                for route, entry in self.routes.items()
+            },
+        }
+
+
+router_stats = RouterStats()
+
+
+def route_and_log(query: str) -> RouteDecision:
+    start = time.perf_counter()
+    decision = route_query(query)
+    elapsed = time.perf_counter() - start
+    router_stats.record_routing(elapsed)
+    logger.info(
+        f"Routed query to {decision.route} ({decision.reason}) "
+        f"in {elapsed * 1000:.2f} ms"
+    )
+    return decision
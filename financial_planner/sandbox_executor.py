@@ -0,0 +1,307 @@
+import asyncio
+import json
+import logging
+import os
+import resource
+import shutil
+import signal
+import sys
+import tempfile
+from pathlib import Path
+
+from autogen_core import CancellationToken
+from autogen_core.code_executor import CodeBlock, CodeExecutor, CodeResult
+
+from financial_planner import (
+    SANDBOX_CPU_SECONDS,
+    SANDBOX_FILE_SIZE_MB,
+    SANDBOX_MEMORY_MB,
+    SANDBOX_PRELOAD_MODULES,
+    SANDBOX_WARM_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Runs in each worker interpreter: import the scientific stack up front, then
+# block until one JSON request arrives on stdin, apply the resource limits and
+# run the code. Workers are single-use, so no state leaks between blocks.
+WORKER_SOURCE = """\
+import importlib, json, os, resource, sys, traceback
+for _module in sys.argv[1:]:
+    try:
+        importlib.import_module(_module)
+    except Exception:
+        pass
+_request = json.loads(sys.stdin.read() or "{}")
+if not _request:
+    sys.exit(0)
+os.chdir(_request["cwd"])
+sys.path.insert(0, _request["cwd"])
+_usage = resource.getrusage(resource.RUSAGE_SELF)
+_cpu = int(_usage.ru_utime + _usage.ru_stime) + 1 + _request["cpu_seconds"]
+resource.setrlimit(resource.RLIMIT_CPU, (_cpu, _cpu + 1))
+resource.setrlimit(resource.RLIMIT_DATA, (_request["memory_bytes"],) * 2)
+resource.setrlimit(resource.RLIMIT_FSIZE, (_request["file_size_bytes"],) * 2)
+_globals = {"__name__": "__main__", "__builtins__": __builtins__}
+try:
+    exec(compile(_request["code"], "<sandbox>", "exec"), _globals)
+except SystemExit as _exit:
+    sys.exit(_exit.code)
+except BaseException:
+    traceback.print_exc()
+    sys.exit(1)
+"""
+
+SHELL_LANGUAGES = ("sh", "bash", "shell")
+PYTHON_LANGUAGES = ("python", "py", "python3")
+
+
+def sandbox_environment(workspace: str) -> dict:
+    """
+    Minimal environment for sandboxed processes: no API keys, single-threaded
+    numeric libraries and a non-interactive plotting backend.
+    """
+    return {
+        "PATH": os.environ.get("PATH", "/usr/bin:/bin"),
+        "HOME": workspace,
+        "TMPDIR": workspace,
+        "LANG": os.environ.get("LANG", "C.UTF-8"),
+        "MPLBACKEND": "Agg",
+        "MPLCONFIGDIR": tempfile.gettempdir(),
+        "OMP_NUM_THREADS": "1",
+        "OPENBLAS_NUM_THREADS": "1",
+        "MKL_NUM_THREADS": "1",
+        "PYTHONDONTWRITEBYTECODE": "1",
+    }
+
+
+def kill_process_group(process: asyncio.subprocess.Process) -> None:
+    """
+    Kill a sandboxed process and anything it started (each runs in its own
+    session, so its process group id is its pid).
+    """
+    if process.returncode is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+class WarmInterpreterPool:
+    """
+    Keeps ``size`` worker interpreters started with the scientific stack
+    already imported, so a code block only pays for its own work.
+    """
+
+    def __init__(self, size: int, preload_modules: list[str]):
+        self.size = size
+        self.preload_modules = preload_modules
+        self._ready: list[asyncio.subprocess.Process] = []
+        self._spawning = 0
+        self._closed = False
+        self.warm_hits = 0
+        self.cold_starts = 0
+
+    async def take(self) -> asyncio.subprocess.Process:
+        process = None
+        while self._ready:
+            candidate = self._ready.pop(0)
+            if candidate.returncode is None:
+                process = candidate
+                break
+        if process is not None:
+            self.warm_hits += 1
+        else:
+            self.cold_starts += 1
+            process = await self._spawn()
+        self.fill()
+        return process
+
+    def fill(self) -> None:
+        """
+        Start workers in the background until ``size`` are ready or starting.
+        """
+        while not self._closed and len(self._ready) + self._spawning < self.size:
+            self._spawning += 1
+            asyncio.create_task(self._spawn_ready())
+
+    async def _spawn_ready(self) -> None:
+        try:
+            process = await self._spawn()
+        except Exception as e:
+            logger.warning(f"Error starting sandbox worker: {e}")
+            return
+        finally:
+            self._spawning -= 1
+        if self._closed:
+            await self._kill(process)
+        else:
+            self._ready.append(process)
+
+    async def _spawn(self) -> asyncio.subprocess.Process:
+        scratch = tempfile.gettempdir()
+        return await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-I",
+            "-c",
+            WORKER_SOURCE,
+            *self.preload_modules,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            cwd=scratch,
+            env=sandbox_environment(scratch),
+            start_new_session=True,
+        )
+
+    async def _kill(self, process: asyncio.subprocess.Process) -> None:
+        kill_process_group(process)
+        await process.wait()
+
+    async def close(self) -> None:
+        self._closed = True
+        ready, self._ready = self._ready, []
+        for process in ready:
+            await self._kill(process)
+
+    def stats(self) -> dict:
+        return {
+            "ready": len(self._ready),
+            "target": self.size,
+            "warm_hits": self.warm_hits,
+            "cold_starts": self.cold_starts,
+        }
+
+
+warm_interpreters = WarmInterpreterPool(SANDBOX_WARM_WORKERS, SANDBOX_PRELOAD_MODULES)
+
+
+class SandboxCodeExecutor(CodeExecutor):
+    """
+    Runs code blocks in local subprocesses limited in CPU time, memory and
+    file size, inside a private temporary workspace. Python blocks run in a
+    warm interpreter from ``warm_interpreters``.
+
+    Generated code runs as the server user; the limits contain runaway
+    calculations but this is not as strong an isolation boundary as Docker.
+    """
+
+    def __init__(
+        self,
+        work_dir: str = "coding",
+        timeout: int = 30,
+        cpu_seconds: int = SANDBOX_CPU_SECONDS,
+        memory_mb: int = SANDBOX_MEMORY_MB,
+        file_size_mb: int = SANDBOX_FILE_SIZE_MB,
+    ):
+        self.work_dir = work_dir
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_mb * 1024 * 1024
+        self.file_size_bytes = file_size_mb * 1024 * 1024
+        self.workspace: Path | None = None
+
+    async def start(self) -> None:
+        Path(self.work_dir).mkdir(parents=True, exist_ok=True)
+        self.workspace = Path(
+            tempfile.mkdtemp(prefix="sandbox-", dir=self.work_dir)
+        ).resolve()
+        warm_interpreters.fill()
+
+    async def stop(self) -> None:
+        if self.workspace is not None:
+            shutil.rmtree(self.workspace, ignore_errors=True)
+            self.workspace = None
+
+    async def restart(self) -> None:
+        await self.reset()
+
+    async def reset(self) -> bool:
+        """
+        Empty the workspace; workers are single-use, so nothing else persists.
+        """
+        if self.workspace is None or not self.workspace.is_dir():
+            return False
+        for path in self.workspace.iterdir():
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+        return True
+
+    async def execute_code_blocks(
+        self, code_blocks: list[CodeBlock], cancellation_token: CancellationToken
+    ) -> CodeResult:
+        if self.workspace is None:
+            raise ValueError(
+                "Sandbox is not running. Must first be started with start."
+            )
+
+        outputs = []
+        exit_code = 0
+        for code_block in code_blocks:
+            language = code_block.language.lower()
+            if language in PYTHON_LANGUAGES:
+                exit_code, output = await self._run_python(code_block.code)
+            elif language in SHELL_LANGUAGES:
+                exit_code, output = await self._run_shell(code_block.code)
+            else:
+                exit_code, output = 1, f"Unsupported language: {language}"
+            outputs.append(output)
+            if exit_code != 0:
+                break
+
+        return CodeResult(exit_code=exit_code, output="".join(outputs))
+
+    async def _run_python(self, code: str) -> tuple[int, str]:
+        process = await warm_interpreters.take()
+        request = {
+            "code": code,
+            "cwd": str(self.workspace),
+            "cpu_seconds": self.cpu_seconds,
+            "memory_bytes": self.memory_bytes,
+            "file_size_bytes": self.file_size_bytes,
+        }
+        return await self._communicate(process, json.dumps(request).encode())
+
+    async def _run_shell(self, code: str) -> tuple[int, str]:
+        def apply_limits() -> None:
+            resource.setrlimit(
+                resource.RLIMIT_CPU, (self.cpu_seconds, self.cpu_seconds + 1)
+            )
+            resource.setrlimit(resource.RLIMIT_DATA, (self.memory_bytes,) * 2)
+            resource.setrlimit(resource.RLIMIT_FSIZE, (self.file_size_bytes,) * 2)
+
+        process = await asyncio.create_subprocess_exec(
+            "sh",
+            "-c",
+            code,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            cwd=self.workspace,
+            env=sandbox_environment(str(self.workspace)),
+            preexec_fn=apply_limits,
+            start_new_session=True,
+        )
+        return await self._communicate(process)
+
+    async def _communicate(
+        self, process: asyncio.subprocess.Process, stdin: bytes | None = None
+    ) -> tuple[int, str]:
+        try:
+            stdout, _ = await asyncio.wait_for(
+                process.communicate(stdin), timeout=self.timeout
+            )
+        except TimeoutError:
+            kill_process_group(process)
+            stdout, _ = await process.communicate()
+            return 124, stdout.decode("utf-8", errors="replace") + "\n Timeout"
+
+        output = stdout.decode("utf-8", errors="replace")
+        if process.returncode < 0:
+            output += f"\nProcess killed by signal {-process.returncode}"
+            if -process.returncode == signal.SIGXCPU:
+                output += " (CPU time limit exceeded)"
+        return process.returncode, output
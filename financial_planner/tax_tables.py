@@ -0,0 +1,279 @@
+"""
+Federal and state income tax parameters and retirement contribution limits,
+by tax year, with a vectorized tax calculator.
+
+Tables are plain dicts keyed by tax year so a new year is a data-only change.
+At import each bracket schedule is turned into NumPy arrays of thresholds,
+rates and the tax owed below each threshold, so computing a tax is one
+``searchsorted`` over any number of incomes.
+
+Sources: IRS Rev. Proc. 2023-34 (2024) and Rev. Proc. 2024-40 (2025), with the
+2025 standard deductions raised by the One Big Beautiful Bill Act; IRS
+Notices 2023-75 and 2024-80 for contribution limits; state revenue
+departments for state rates.
+"""
+
+import datetime
+
+import numpy as np
+
+FILING_STATUSES = ("single", "married_joint", "married_separate", "head_of_household")
+
+# Upper bound of every bracket but the last, per filing status; the rates are
+# shared by all statuses.
+FEDERAL_RATES = (0.10, 0.12, 0.22, 0.24, 0.32, 0.35, 0.37)
+CAPITAL_GAINS_RATES = (0.0, 0.15, 0.20)
+
+TAX_TABLES = {
+    2024: {
+        "federal_brackets": {
+            "single": (11_600, 47_150, 100_525, 191_950, 243_725, 609_350),
+            "married_joint": (23_200, 94_300, 201_050, 383_900, 487_450, 731_200),
+            "married_separate": (11_600, 47_150, 100_525, 191_950, 243_725, 365_600),
+            "head_of_household": (16_550, 63_100, 100_500, 191_950, 243_700, 609_350),
+        },
+        "standard_deduction": {
+            "single": 14_600,
+            "married_joint": 29_200,
+            "married_separate": 14_600,
+            "head_of_household": 21_900,
+        },
+        "capital_gains_brackets": {
+            "single": (47_025, 518_900),
+            "married_joint": (94_050, 583_750),
+            "married_separate": (47_025, 291_850),
+            "head_of_household": (63_000, 551_350),
+        },
+        "contribution_limits": {
+            "401k_elective": 23_000,
+            "401k_catch_up_50": 7_500,
+            "401k_total_additions": 69_000,
+            "ira": 7_000,
+            "ira_catch_up_50": 1_000,
+            "simple_ira": 16_000,
+            "simple_ira_catch_up_50": 3_500,
+            "hsa_self": 4_150,
+            "hsa_family": 8_300,
+            "hsa_catch_up_55": 1_000,
+        },
+        "source": "IRS Rev. Proc. 2023-34, Notice 2023-75",
+    },
+    2025: {
+        "federal_brackets": {
+            "single": (11_925, 48_475, 103_350, 197_300, 250_525, 626_350),
+            "married_joint": (23_850, 96_950, 206_700, 394_600, 501_050, 751_600),
+            "married_separate": (11_925, 48_475, 103_350, 197_300, 250_525, 375_800),
+            "head_of_household": (17_000, 64_850, 103_350, 197_300, 250_500, 626_350),
+        },
+        "standard_deduction": {
+            "single": 15_750,
+            "married_joint": 31_500,
+            "married_separate": 15_750,
+            "head_of_household": 23_625,
+        },
+        "capital_gains_brackets": {
+            "single": (48_350, 533_400),
+            "married_joint": (96_700, 600_050),
+            "married_separate": (48_350, 300_000),
+            "head_of_household": (64_750, 566_700),
+        },
+        "contribution_limits": {
+            "401k_elective": 23_500,
+            "401k_catch_up_50": 7_500,
+            "401k_catch_up_60_63": 11_250,
+            "401k_total_additions": 70_000,
+            "ira": 7_000,
+            "ira_catch_up_50": 1_000,
+            "simple_ira": 16_500,
+            "simple_ira_catch_up_50": 3_500,
+            "hsa_self": 4_300,
+            "hsa_family": 8_550,
+            "hsa_catch_up_55": 1_000,
+        },
+        "source": "IRS Rev. Proc. 2024-40, One Big Beautiful Bill Act, Notice 2024-80",
+    },
+}
+
+# Flat-rate and no-income-tax states. ``exemption`` is per person (two for
+# joint filers) and is subtracted from federal AGI before the rate applies.
+# States with ``taxes_deferrals`` tax 401(k)-style salary deferrals, so their
+# base is gross income.
+NO_INCOME_TAX = {"rate": 0.0, "exemption": {2024: 0, 2025: 0}}
+STATE_TAXES = {
+    "AK": NO_INCOME_TAX,
+    "FL": NO_INCOME_TAX,
+    "NV": NO_INCOME_TAX,
+    "NH": NO_INCOME_TAX,
+    "SD": NO_INCOME_TAX,
+    "TN": NO_INCOME_TAX,
+    "TX": NO_INCOME_TAX,
+    "WA": NO_INCOME_TAX,
+    "WY": NO_INCOME_TAX,
+    "IL": {"rate": 0.0495, "exemption": {2024: 2_775, 2025: 2_850}},
+    "PA": {"rate": 0.0307, "exemption": {2024: 0, 2025: 0}, "taxes_deferrals": True},
+}
+
+
+class BracketSchedule:
+    """
+    Progressive rate schedule precomputed for vectorized lookups.
+    """
+
+    def __init__(self, upper_bounds: tuple[float, ...], rates: tuple[float, ...]):
+        self.thresholds = np.concatenate(([0.0], np.asarray(upper_bounds, float)))
+        self.rates = np.asarray(rates, dtype=float)
+        # Tax owed on income up to each threshold.
+        self.base = np.concatenate(
+            ([0.0], np.cumsum(np.diff(self.thresholds) * self.rates[:-1]))
+        )
+
+    def bracket_index(self, income) -> np.ndarray:
+        income = np.maximum(np.asarray(income, dtype=float), 0.0)
+        return np.searchsorted(self.thresholds, income, side="right") - 1
+
+    def tax(self, income) -> np.ndarray:
+        income = np.maximum(np.asarray(income, dtype=float), 0.0)
+        index = self.bracket_index(income)
+        return self.base[index] + (income - self.thresholds[index]) * self.rates[index]
+
+    def marginal_rate(self, income) -> np.ndarray:
+        return self.rates[self.bracket_index(income)]
+
+    def tax_on_slice(self, bottom, top) -> np.ndarray:
+        """
+        Tax on the income between ``bottom`` and ``top``, e.g. capital gains
+        stacked on top of ordinary income.
+        """
+        return self.tax(top) - self.tax(bottom)
+
+
+FEDERAL_SCHEDULES = {
+    (year, status): BracketSchedule(bounds, FEDERAL_RATES)
+    for year, table in TAX_TABLES.items()
+    for status, bounds in table["federal_brackets"].items()
+}
+CAPITAL_GAINS_SCHEDULES = {
+    (year, status): BracketSchedule(bounds, CAPITAL_GAINS_RATES)
+    for year, table in TAX_TABLES.items()
+    for status, bounds in table["capital_gains_brackets"].items()
+}
+TAX_YEARS = tuple(sorted(TAX_TABLES))
+
+
+def resolve_tax_year(year: int | None = None) -> int:
+    """
+    ``year`` if tables exist for it; by default the current year, or the
+    latest year with tables.
+    """
+    if year is None:
+        current = datetime.date.today().year
+        return current if current in TAX_TABLES else TAX_YEARS[-1]
+    if year not in TAX_TABLES:
+        raise ValueError(
+            f"No tax tables for {year}; available years: "
+            f"{', '.join(map(str, TAX_YEARS))}"
+        )
+    return year
+
+
+def _check_status(filing_status: str) -> str:
+    if filing_status not in FILING_STATUSES:
+        raise ValueError(
+            f"Unknown filing status {filing_status!r}; "
+            f"expected one of {', '.join(FILING_STATUSES)}"
+        )
+    return filing_status
+
+
+def federal_schedule(year: int, filing_status: str) -> BracketSchedule:
+    return FEDERAL_SCHEDULES[(resolve_tax_year(year), _check_status(filing_status))]
+
+
+def standard_deduction(year: int, filing_status: str) -> float:
+    table = TAX_TABLES[resolve_tax_year(year)]
+    return table["standard_deduction"][_check_status(filing_status)]
+
+
+def contribution_limits(year: int | None = None) -> dict[str, int]:
+    return dict(TAX_TABLES[resolve_tax_year(year)]["contribution_limits"])
+
+
+def state_income_tax(agi, state: str, year: int, filing_status: str) -> np.ndarray:
+    state = state.upper()
+    if state not in STATE_TAXES:
+        raise ValueError(
+            f"No tax table for state {state!r}; available: "
+            f"{', '.join(sorted(STATE_TAXES))}"
+        )
+    parameters = STATE_TAXES[state]
+    people = 2 if filing_status == "married_joint" else 1
+    exemption = parameters["exemption"][resolve_tax_year(year)] * people
+    return (
+        np.maximum(np.asarray(agi, dtype=float) - exemption, 0.0) * parameters["rate"]
+    )
+
+
+def calculate_tax(
+    gross_income,
+    filing_status: str = "single",
+    year: int | None = None,
+    state: str | None = None,
+    pre_tax_contributions=0.0,
+    itemized_deductions=0.0,
+    long_term_capital_gains=0.0,
+) -> dict:
+    """
+    Federal (and optionally state) income tax on ordinary income plus
+    long-term capital gains. All amount arguments broadcast, so a range of
+    incomes is computed in one call.
+
+    Returns a dict of arrays (scalars for scalar input): ``taxable_income``,
+    ``federal_tax``, ``state_tax``, ``total_tax``, ``effective_rate`` (on gross
+    income plus gains), ``marginal_rate`` (federal, on ordinary income) and
+    the ``year`` and ``deduction`` used.
+    """
+    year = resolve_tax_year(year)
+    _check_status(filing_status)
+    gross_income = np.asarray(gross_income, dtype=float)
+    gains = np.asarray(long_term_capital_gains, dtype=float)
+
+    agi = np.maximum(gross_income - np.asarray(pre_tax_contributions, float), 0.0)
+    deduction = np.maximum(
+        standard_deduction(year, filing_status),
+        np.asarray(itemized_deductions, dtype=float),
+    )
+    taxable = np.maximum(agi + gains - deduction, 0.0)
+    ordinary = np.maximum(taxable - gains, 0.0)
+
+    schedule = FEDERAL_SCHEDULES[(year, filing_status)]
+    gains_schedule = CAPITAL_GAINS_SCHEDULES[(year, filing_status)]
+    federal = schedule.tax(ordinary) + gains_schedule.tax_on_slice(ordinary, taxable)
+    if state:
+        state_base = (
+            gross_income
+            if STATE_TAXES.get(state.upper(), {}).get("taxes_deferrals")
+            else agi
+        )
+        state_tax = state_income_tax(state_base + gains, state, year, filing_status)
+    else:
+        state_tax = np.zeros_like(federal)
+    total = federal + state_tax
+    income = gross_income + gains
+    with np.errstate(divide="ignore", invalid="ignore"):
+        effective = np.where(income > 0, total / income, 0.0)
+
+    result = {
+        "taxable_income": taxable,
+        "federal_tax": federal,
+        "state_tax": state_tax,
+        "total_tax": total,
+        "effective_rate": effective,
+        "marginal_rate": schedule.marginal_rate(ordinary),
+    }
+    result = {
+        key: value.item() if np.ndim(value) == 0 else value
+        for key, value in result.items()
+    }
+    result["deduction"] = deduction.item() if np.ndim(deduction) == 0 else deduction
+    result["year"] = year
+    return result
@@ -0,0 +1,507 @@
+import numpy as np
+from autogen_core import CancellationToken
+from autogen_core.tools import BaseTool
+from pydantic import BaseModel, Field
+
+from financial_planner import fincalc
+from financial_planner.market_data import market_data, periods_per_year
+from financial_planner.monte_carlo import simulate_retirement
+from financial_planner.portfolio import (
+    efficient_frontier,
+    historical_moments,
+    mean_variance_weights,
+    min_variance_weights,
+    portfolio_statistics,
+    risk_aversion_for,
+    risk_parity_weights,
+)
+from financial_planner.tax_tables import (
+    calculate_tax,
+    contribution_limits,
+    resolve_tax_year,
+)
+from financial_planner.web_search import (
+    SearchProgressCallback,
+    perplexity_batch_search,
+    perplexity_search,
+)
+
+
+def format_money(value: float) -> str:
+    if not np.isfinite(value):
+        return "n/a"
+    sign = "-" if value < 0 else ""
+    return f"{sign}${abs(value):,.2f}"
+
+
+def format_percent(value: float) -> str:
+    if not np.isfinite(value):
+        return "n/a"
+    return f"{value * 100:.2f}%"
+
+
+def compound_interest_calculator(
+    principal: float,
+    annual_rate: float,
+    years: float,
+    compounds_per_year: int = 12,
+    contribution_per_period: float = 0.0,
+) -> str:
+    """Balance of an investment compounded over time, with an optional contribution every compounding period. Rates are decimals (0.05 for 5%)."""
+    balance = fincalc.compound_interest(
+        principal, annual_rate, years, compounds_per_year, contribution_per_period
+    )
+    contributed = principal + contribution_per_period * compounds_per_year * years
+    return (
+        f"Final balance: {format_money(balance)}\n"
+        f"Total contributed: {format_money(contributed)}\n"
+        f"Growth: {format_money(balance - contributed)}"
+    )
+
+
+def loan_amortization_calculator(
+    principal: float,
+    annual_rate: float,
+    years: float,
+    payments_per_year: int = 12,
+    extra_payment: float = 0.0,
+) -> str:
+    """Payment, total interest, payoff time and yearly balances of a fixed-rate loan, with an optional extra principal payment every period. Rates are decimals (0.065 for 6.5%)."""
+    schedule = fincalc.amortization_schedule(
+        principal, annual_rate, years, payments_per_year, extra_payment
+    )
+    payments = len(schedule["period"])
+    lines = [
+        f"Scheduled payment: {format_money(schedule['payment'][0] - extra_payment)} per period",
+        f"Total interest: {format_money(schedule['interest'].sum())}",
+        f"Total paid: {format_money(schedule['payment'].sum())}",
+        f"Paid off after {payments} payments ({payments / payments_per_year:.1f} years)",
+        "",
+        "| Year | Interest paid | Principal paid | Ending balance |",
+        "| --- | --- | --- | --- |",
+    ]
+    year_starts = np.arange(0, payments, payments_per_year)
+    year_ends = np.minimum(year_starts + payments_per_year, payments)
+    interest = np.add.reduceat(schedule["interest"], year_starts)
+    principal_paid = np.add.reduceat(schedule["principal"], year_starts)
+    for year, (end, year_interest, year_principal) in enumerate(
+        zip(year_ends, interest, principal_paid), start=1
+    ):
+        lines.append(
+            f"| {year} | {format_money(year_interest)} | {format_money(year_principal)} "
+            f"| {format_money(schedule['balance'][end - 1])} |"
+        )
+    return "\n".join(lines)
+
+
+def future_value_calculator(
+    rate_per_period: float,
+    periods: float,
+    payment_per_period: float = 0.0,
+    present_value: float = 0.0,
+    payments_at_start: bool = False,
+) -> str:
+    """Future value of a lump sum and/or a series of equal deposits (an annuity). Amounts are positive; the rate is a decimal per period."""
+    value = fincalc.fv(
+        rate_per_period,
+        periods,
+        -payment_per_period,
+        -present_value,
+        int(payments_at_start),
+    )
+    return f"Future value: {format_money(value)}"
+
+
+def present_value_calculator(
+    rate_per_period: float,
+    periods: float,
+    payment_per_period: float = 0.0,
+    future_value: float = 0.0,
+    payments_at_start: bool = False,
+) -> str:
+    """Present value of a future lump sum and/or a series of equal payments (an annuity). Amounts are positive; the rate is a decimal per period."""
+    value = fincalc.pv(
+        rate_per_period,
+        periods,
+        payment_per_period,
+        future_value,
+        int(payments_at_start),
+    )
+    return f"Present value: {format_money(-value)}"
+
+
+def npv_irr_calculator(cashflows: list[float], discount_rate: float = None) -> str:
+    """Net present value (when discount_rate is given) and internal rate of return of periodic cash flows. The first cash flow happens today; outflows are negative."""
+    lines = [f"Internal rate of return: {format_percent(fincalc.irr(cashflows))}"]
+    if discount_rate is not None:
+        value = fincalc.npv(discount_rate, cashflows)
+        lines.insert(
+            0,
+            f"Net present value at {format_percent(discount_rate)}: {format_money(value)}",
+        )
+    return "\n".join(lines)
+
+
+def inflation_calculator(
+    amount: float,
+    inflation_rate: float,
+    years: float,
+    to_future: bool = False,
+    nominal_return: float = None,
+) -> str:
+    """Convert an amount between future dollars and today's dollars (to_future=True inflates today's amount), and optionally the real return of a nominal rate. Rates are decimals."""
+    value = fincalc.inflation_adjust(amount, inflation_rate, years, to_future)
+    if to_future:
+        lines = [
+            f"{format_money(amount)} today is {format_money(value)} in {years:g} years"
+        ]
+    else:
+        lines = [
+            f"{format_money(amount)} in {years:g} years is worth {format_money(value)} today"
+        ]
+    if nominal_return is not None:
+        real = fincalc.real_rate(nominal_return, inflation_rate)
+        lines.append(
+            f"Real return of {format_percent(nominal_return)}: {format_percent(real)}"
+        )
+    return "\n".join(lines)
+
+
+def savings_rate_calculator(
+    annual_income: float,
+    annual_savings: float,
+    savings_goal: float = None,
+    current_savings: float = 0.0,
+    annual_return: float = 0.05,
+) -> str:
+    """Savings rate as a share of income, and optionally the years to reach a savings goal saving monthly at the given annual return (a decimal)."""
+    lines = [
+        f"Savings rate: {format_percent(fincalc.savings_rate(annual_income, annual_savings))}"
+    ]
+    if savings_goal is not None:
+        years = fincalc.years_to_goal(
+            savings_goal, annual_return, annual_savings / 12, current_savings
+        )
+        reached = f"{years:.1f} years" if np.isfinite(years) else "never reached"
+        lines.append(f"Time to reach {format_money(savings_goal)}: {reached}")
+    return "\n".join(lines)
+
+
+def retirement_monte_carlo(
+    current_savings: float,
+    annual_contribution: float,
+    years_to_retirement: int,
+    annual_spending: float,
+    years_in_retirement: int,
+    expected_return: float = 0.07,
+    volatility: float = 0.15,
+    inflation: float = 0.025,
+    distribution: str = "normal",
+) -> str:
+    """Monte Carlo simulation of saving until retirement and then spending from the portfolio: probability the money lasts and percentile bands of the balance in today's dollars. Contributions and spending are in today's dollars; rates are decimals; distribution is normal, lognormal or student_t (fat tails)."""
+    result = simulate_retirement(
+        current_savings,
+        annual_contribution,
+        years_to_retirement,
+        annual_spending,
+        years_in_retirement,
+        mean_return=expected_return,
+        volatility=volatility,
+        inflation=inflation,
+        distribution=distribution,
+    )
+    lines = [
+        f"Simulated paths: {result['n_paths']:,}",
+        f"Probability the money lasts: {format_percent(result['success_rate'])}",
+    ]
+    if result["median_depletion_year"] is not None:
+        lines.append(
+            f"Median year of depletion when it runs out: {result['median_depletion_year']:.0f}"
+        )
+    bands = result["percentiles"]
+    lines += [
+        "",
+        "| Year | " + " | ".join(f"P{p:g}" for p in bands) + " |",
+        "| --- |" + " --- |" * len(bands),
+    ]
+    years = result["years"]
+    shown = sorted({*range(0, len(years), 5), years_to_retirement, len(years) - 1})
+    for year in shown:
+        lines.append(
+            f"| {year} | "
+            + " | ".join(format_money(band[year]) for band in bands.values())
+            + " |"
+        )
+    return "\n".join(lines)
+
+
+def income_tax_calculator(
+    gross_income: float,
+    filing_status: str = "single",
+    tax_year: int = None,
+    state: str = None,
+    pre_tax_contributions: float = 0.0,
+    itemized_deductions: float = 0.0,
+    long_term_capital_gains: float = 0.0,
+) -> str:
+    """Federal income tax (plus state tax for supported states) from precomputed IRS tables: taxable income, tax owed, marginal and effective rates. filing_status is single, married_joint, married_separate or head_of_household; tax_year defaults to the latest available; state is a two-letter code."""
+    try:
+        result = calculate_tax(
+            gross_income,
+            filing_status,
+            tax_year,
+            state,
+            pre_tax_contributions,
+            itemized_deductions,
+            long_term_capital_gains,
+        )
+    except ValueError as e:
+        return f"Error: {e}"
+    lines = [
+        f"Tax year {result['year']}, filing status {filing_status}",
+        f"Deduction: {format_money(result['deduction'])}",
+        f"Taxable income: {format_money(result['taxable_income'])}",
+        f"Federal income tax: {format_money(result['federal_tax'])}",
+    ]
+    if state:
+        lines.append(
+            f"{state.upper()} state income tax: {format_money(result['state_tax'])}"
+        )
+    lines += [
+        f"Total income tax: {format_money(result['total_tax'])}",
+        f"Federal marginal rate: {format_percent(result['marginal_rate'])}",
+        f"Effective rate: {format_percent(result['effective_rate'])}",
+        "Excludes payroll (FICA) taxes and credits.",
+    ]
+    return "\n".join(lines)
+
+
+def contribution_limits_lookup(tax_year: int = None, age: int = None) -> str:
+    """Annual contribution limits for 401(k), IRA, SIMPLE IRA and HSA accounts, including the catch-up amounts that apply at the given age. tax_year defaults to the latest available."""
+    try:
+        year = resolve_tax_year(tax_year)
+    except ValueError as e:
+        return f"Error: {e}"
+    limits = contribution_limits(year)
+    lines = [f"Contribution limits for {year}:"]
+    for account, limit in limits.items():
+        lines.append(f"- {account}: {format_money(limit)}")
+    if age is not None:
+        catch_up = limits["401k_catch_up_50"] if age >= 50 else 0
+        if 60 <= age <= 63 and "401k_catch_up_60_63" in limits:
+            catch_up = limits["401k_catch_up_60_63"]
+        ira_catch_up = limits["ira_catch_up_50"] if age >= 50 else 0
+        lines += [
+            f"At age {age}:",
+            f"- 401(k) employee maximum: {format_money(limits['401k_elective'] + catch_up)}",
+            f"- IRA maximum: {format_money(limits['ira'] + ira_catch_up)}",
+        ]
+    return "\n".join(lines)
+
+
+def list_market_data() -> str:
+    """List the historical series (index levels, treasury yields, CPI) available in the local market data store, with their date ranges."""
+    series = market_data.series()
+    if not series:
+        return "The local market data store is empty."
+    return "\n".join(
+        f"- {name} ({entry['kind']}): {entry['description'] or entry['source']}, {entry['start']} to {entry['end']}"
+        for name, entry in sorted(series.items())
+    )
+
+
+def market_data_summary(
+    series: str, start_date: str = None, end_date: str = None
+) -> str:
+    """Summary statistics of a local historical series between two ISO dates (both optional): growth, annualized return and volatility and max drawdown for index levels and CPI; average, range and latest value for yields and rates."""
+    try:
+        kind = market_data.series()[series]["kind"]
+    except KeyError:
+        return f"Unknown series {series!r}.\n{list_market_data()}"
+    dates, values = market_data.get(series, start_date, end_date)
+    if values.size < 2:
+        return f"Not enough {series} data between {start_date} and {end_date}."
+
+    lines = [f"{series}: {dates[0]} to {dates[-1]} ({values.size} observations)"]
+    if kind == "rate":
+        lines += [
+            f"Latest: {values[-1]:.2f}",
+            f"Average: {values.mean():.2f}",
+            f"Low: {values.min():.2f} on {dates[values.argmin()]}",
+            f"High: {values.max():.2f} on {dates[values.argmax()]}",
+        ]
+        return "\n".join(lines)
+
+    years = (dates[-1] - dates[0]).astype(np.float64) / 365.25
+    returns = np.diff(values) / values[:-1]
+    drawdown = values / np.maximum.accumulate(values) - 1
+    lines += [
+        f"Start: {values[0]:,.2f}, end: {values[-1]:,.2f}",
+        f"Total change: {format_percent(values[-1] / values[0] - 1)}",
+        f"Annualized: {format_percent((values[-1] / values[0]) ** (1 / years) - 1)}",
+        f"Annualized volatility: {format_percent(returns.std(ddof=1) * np.sqrt(periods_per_year(dates)))}",
+        f"Max drawdown: {format_percent(drawdown.min())} (trough {dates[drawdown.argmin()]})",
+    ]
+    return "\n".join(lines)
+
+
+def portfolio_optimizer(
+    assets: list[str] = None,
+    method: str = "mean_variance",
+    risk_tolerance: str = None,
+    time_horizon: str = None,
+    max_weight: float = 1.0,
+    start_date: str = None,
+    end_date: str = None,
+    expected_returns: list[float] = None,
+    volatilities: list[float] = None,
+    correlations: list[list[float]] = None,
+) -> str:
+    """Long-only asset allocation: method is mean_variance (uses risk_tolerance low/moderate/high and time_horizon short-term/medium-term/long-term), min_variance or risk_parity. Estimates returns and a shrunk covariance from local market data series (assets defaults to all price series), or uses the given annual expected_returns, volatilities and correlation matrix (decimals) as assumptions for the named assets. Also returns points on the efficient frontier."""
+    try:
+        if expected_returns is not None:
+            if not assets or volatilities is None:
+                return (
+                    "Error: assumptions need assets, expected_returns and volatilities."
+                )
+            mu = np.asarray(expected_returns, dtype=float)
+            vol = np.asarray(volatilities, dtype=float)
+            corr = (
+                np.eye(len(vol))
+                if correlations is None
+                else np.asarray(correlations, dtype=float)
+            )
+            if not mu.shape == vol.shape == corr.shape[:1] == (len(assets),):
+                return (
+                    "Error: one expected return and volatility per asset is required."
+                )
+            cov = corr * np.outer(vol, vol)
+            source = "given assumptions"
+        else:
+            if not assets:
+                assets = [
+                    name
+                    for name, entry in sorted(market_data.series().items())
+                    if entry["kind"] == "price"
+                ]
+            if len(assets) < 2:
+                return "Error: at least two assets are needed.\n" + list_market_data()
+            mu, cov, shrinkage = historical_moments(
+                market_data, assets, start_date, end_date
+            )
+            source = f"local market data (covariance shrinkage {shrinkage:.2f})"
+
+        if method == "risk_parity":
+            weights = risk_parity_weights(cov)
+        elif method == "min_variance":
+            weights = min_variance_weights(cov, max_weight)
+        elif method == "mean_variance":
+            aversion = risk_aversion_for(risk_tolerance, time_horizon)
+            weights = mean_variance_weights(mu, cov, aversion, max_weight)
+        else:
+            return f"Error: unknown method {method!r}."
+        frontier = efficient_frontier(mu, cov, n_points=5, max_weight=max_weight)
+    except (KeyError, ValueError) as e:
+        return f"Error: {e}"
+
+    stats = portfolio_statistics(weights, mu, cov)
+    lines = [
+        f"Method: {method}, inputs from {source}",
+        f"Expected return: {format_percent(stats['expected_return'])}, "
+        f"volatility: {format_percent(stats['volatility'])}, "
+        f"return/volatility: {stats['sharpe']:.2f}",
+        "",
+        "| Asset | Weight | Expected return | Volatility | Risk contribution |",
+        "| --- | --- | --- | --- | --- |",
+    ]
+    for asset, weight, asset_mu, variance, contribution in zip(
+        assets, weights, mu, np.diag(cov), stats["risk_contributions"]
+    ):
+        lines.append(
+            f"| {asset} | {format_percent(weight)} | {format_percent(asset_mu)} "
+            f"| {format_percent(np.sqrt(variance))} | {format_percent(contribution)} |"
+        )
+    lines += ["", "Efficient frontier (return, volatility, weights):"]
+    for point_return, point_vol, point_weights in zip(
+        frontier["returns"], frontier["volatilities"], frontier["weights"]
+    ):
+        allocation = ", ".join(
+            f"{asset} {format_percent(weight)}"
+            for asset, weight in zip(assets, point_weights)
+            if weight >= 0.005
+        )
+        lines.append(
+            f"- {format_percent(point_return)}, {format_percent(point_vol)}: {allocation}"
+        )
+    lines.append("Based on historical or assumed inputs; not a forecast.")
+    return "\n".join(lines)
+
+
+class SearchArgs(BaseModel):
+    query: str = Field(description="The search query.")
+
+
+class BatchSearchArgs(BaseModel):
+    queries: list[str] = Field(description="Independent search queries.")
+
+
+class WebSearchTool(BaseTool[SearchArgs, str]):
+    """
+    Per-session web search tool. The argument schema is a class, so creating
+    one per session costs no schema generation.
+    """
+
+    def __init__(self, api_key: str, on_progress: SearchProgressCallback | None = None):
+        super().__init__(
+            SearchArgs,
+            str,
+            "search_tool",
+            "Search the web for current financial information on one query.",
+        )
+        self.api_key = api_key
+        self.on_progress = on_progress
+
+    async def run(self, args: SearchArgs, cancellation_token: CancellationToken) -> str:
+        result = await perplexity_search(
+            args.query, self.api_key, on_progress=self.on_progress
+        )
+        if result is None:
+            return "Error: Unable to perform the search."
+        return result
+
+
+class BatchSearchTool(BaseTool[BatchSearchArgs, str]):
+    def __init__(self, api_key: str, on_progress: SearchProgressCallback | None = None):
+        super().__init__(
+            BatchSearchArgs,
+            str,
+            "batch_search_tool",
+            "Search the web for several independent queries at once and return one merged, cited result.",
+        )
+        self.api_key = api_key
+        self.on_progress = on_progress
+
+    async def run(
+        self, args: BatchSearchArgs, cancellation_token: CancellationToken
+    ) -> str:
+        return await perplexity_batch_search(
+            args.queries, self.api_key, on_progress=self.on_progress
+        )
+
+
+MARKET_DATA_TOOLS = [list_market_data, market_data_summary]
+
+
+CALCULATOR_TOOLS = [
+    compound_interest_calculator,
+    loan_amortization_calculator,
+    future_value_calculator,
+    present_value_calculator,
+    npv_irr_calculator,
+    inflation_calculator,
+    savings_rate_calculator,
+    retirement_monte_carlo,
+    income_tax_calculator,
+    contribution_limits_lookup,
+    portfolio_optimizer,
+]
@@ -0,0 +1,415 @@
+import asyncio
+import datetime
+import json
+import logging
+import re
+import sqlite3
+import time
+from typing import Awaitable, Callable
+
+import httpx
+
+from financial_planner import (
+    PERPLEXITY_PROGRESS_INTERVAL,
+    PERPLEXITY_STREAMING,
+    SEARCH_BATCH_CONCURRENCY,
+    SEARCH_BATCH_MAX_QUERIES,
+    SEARCH_CACHE_DB_PATH,
+    SEARCH_CACHE_MAX_BYTES,
+    SEARCH_CACHE_MAX_ENTRIES,
+    SEARCH_CACHE_TTL_DEFAULT,
+    SEARCH_CACHE_TTL_LONG,
+    SEARCH_CACHE_TTL_SHORT,
+)
+from financial_planner.cache import LRUCache, SQLiteCache
+from financial_planner.clients import get_perplexity_http_client
+from financial_planner.rate_limiter import get_rate_limiter, parse_retry_after
+from financial_planner.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+PERPLEXITY_URL = "https://api.perplexity.ai/chat/completions"
+
+SYSTEM_INSTRUCTIONS = """You are a factual financial search assistant. Answer queries precisely using *only* the provided search context. Assume reasonable details if information is missing. Provide direct, thorough answers formatted for clarity. Do not ask follow-up questions. Today is {current_date}."""
+
+# Receives (query, newly streamed text) while a search is in progress.
+SearchProgressCallback = Callable[[str, str], Awaitable[None]]
+
+CITATION_MARKER_PATTERN = re.compile(r"\[(\d+)\]")
+
+# Market data moves during the day; regulatory and reference figures change
+# at most yearly. Time-sensitive terms win when a query mentions both.
+TIME_SENSITIVE_PATTERN = re.compile(
+    r"\b(current|currently|today|now|latest|recent|live|this (week|month)|"
+    r"price|prices|quote|yield|yields|rate|rates|market|stock|stocks|index|"
+    r"inflation|news)\b"
+)
+REFERENCE_PATTERN = re.compile(
+    r"\b(limit|limits|bracket|brackets|deduction|deductions|irs|rule|rules|"
+    r"law|laws|regulation|regulations|contribution|contributions|rmd|"
+    r"definition|define|eligibility|penalty|threshold|thresholds)\b"
+)
+
+search_cache = LRUCache(
+    max_entries=SEARCH_CACHE_MAX_ENTRIES, max_bytes=SEARCH_CACHE_MAX_BYTES
+)
+search_store = (
+    SQLiteCache(SEARCH_CACHE_DB_PATH, namespace="search")
+    if SEARCH_CACHE_DB_PATH
+    else None
+)
+search_flights = SingleFlight()
+
+
+def normalize_query(query: str) -> str:
+    normalized = re.sub(r"\s+", " ", query.strip().lower())
+    return normalized.rstrip(" ?.!")
+
+
+def search_cache_ttl(normalized_query: str) -> float:
+    if TIME_SENSITIVE_PATTERN.search(normalized_query):
+        return SEARCH_CACHE_TTL_SHORT
+    if REFERENCE_PATTERN.search(normalized_query):
+        return SEARCH_CACHE_TTL_LONG
+    return SEARCH_CACHE_TTL_DEFAULT
+
+
+class ProgressForwarder:
+    """
+    Forwards streamed search text to ``on_progress`` across retries. A stream
+    retried after a dropped connection starts over, so its text is only
+    forwarded once it goes past what earlier attempts already sent.
+    """
+
+    def __init__(self, on_progress: SearchProgressCallback):
+        self.on_progress = on_progress
+        self.forwarded = 0
+        self.position = 0
+
+    def restart(self) -> None:
+        self.position = 0
+
+    async def __call__(self, query: str, text: str) -> None:
+        start = self.position
+        self.position += len(text)
+        text = text[max(self.forwarded - start, 0) :]
+        if text:
+            self.forwarded = self.position
+            await self.on_progress(query, text)
+
+
+async def fetch_perplexity_response(
+    query: str,
+    api_key: str,
+    max_retries: int = 3,
+    on_progress: SearchProgressCallback | None = None,
+) -> dict | None:
+    payload = {
+        "model": "sonar-reasoning-pro",
+        "messages": [
+            {"role": "system", "content": SYSTEM_INSTRUCTIONS},
+            {"role": "user", "content": query},
+        ],
+        "temperature": 0.1,
+        "top_p": 0.9,
+        "max_tokens": 8000,
+    }
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    client = get_perplexity_http_client()
+    rate_limiter = get_rate_limiter("perplexity")
+    progress = ProgressForwarder(on_progress) if on_progress is not None else None
+
+    for attempt in range(max_retries):
+        try:
+            await rate_limiter.acquire()
+            if PERPLEXITY_STREAMING:
+                if progress is not None:
+                    progress.restart()
+                return await stream_perplexity_response(
+                    client, payload, headers, query, progress
+                )
+            response = await client.post(PERPLEXITY_URL, json=payload, headers=headers)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 429:
+                # Pause every Perplexity caller, not just this one; the next
+                # attempt waits on the shared limiter.
+                retry_after = parse_retry_after(e.response.headers.get("retry-after"))
+                rate_limiter.block_for(
+                    retry_after if retry_after is not None else 2**attempt
+                )
+                if attempt < max_retries - 1:
+                    continue
+            logger.error(f"Attempt {attempt + 1}/{max_retries}: HTTP Error: {e}")
+            return None
+        except httpx.RequestError as e:
+            logger.error(f"Attempt {attempt + 1}/{max_retries}: Request Error: {e}")
+            if attempt < max_retries - 1:
+                await asyncio.sleep(1)
+            else:
+                return None
+        except ValueError as e:
+            logger.error(f"Attempt {attempt + 1}/{max_retries}: JSON Decode Error: {e}")
+            return None
+
+    return None
+
+
+async def stream_perplexity_response(
+    client: httpx.AsyncClient,
+    payload: dict,
+    headers: dict,
+    query: str,
+    on_progress: SearchProgressCallback | None = None,
+) -> dict:
+    """
+    Consume a streamed completion, forwarding new text to ``on_progress`` at
+    most every PERPLEXITY_PROGRESS_INTERVAL seconds, and return it assembled in
+    the same shape as a non-streamed response.
+    """
+    content_parts = []
+    pending = ""
+    last_chunk = {}
+    citations = []
+    last_progress = time.monotonic()
+
+    async def report_progress(text: str) -> None:
+        try:
+            await on_progress(query, text)
+        except Exception as e:
+            logger.warning(f"Error reporting search progress: {e}")
+
+    async with client.stream(
+        "POST", PERPLEXITY_URL, json={**payload, "stream": True}, headers=headers
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            chunk_data = line[len("data:") :].strip()
+            if chunk_data == "[DONE]":
+                break
+            chunk = json.loads(chunk_data)
+            last_chunk = chunk
+            citations = chunk.get("citations") or citations
+            for choice in chunk.get("choices", []):
+                delta = (choice.get("delta") or {}).get("content") or ""
+                content_parts.append(delta)
+                pending += delta
+
+            now = time.monotonic()
+            if (
+                on_progress is not None
+                and pending
+                and now - last_progress >= PERPLEXITY_PROGRESS_INTERVAL
+            ):
+                await report_progress(pending)
+                pending = ""
+                last_progress = now
+
+    if on_progress is not None and pending:
+        await report_progress(pending)
+
+    data = {key: value for key, value in last_chunk.items() if key != "choices"}
+    content = "".join(content_parts)
+    data["choices"] = (
+        [{"index": 0, "message": {"role": "assistant", "content": content}}]
+        if content
+        else []
+    )
+    data["citations"] = citations
+    return data
+
+
+def format_perplexity_response(data: dict, query: str) -> str:
+    md_output = f"*Search performed at: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n\n"
+
+    choices = data.get("choices", [])
+    if not choices:
+        logger.warning(
+            "No results found in Perplexity API response for query: '%s'. "
+            "Consider refining the search terms.",
+            query,
+        )
+        return "No specific information found. Please try refining your query."
+
+    for choice in choices:
+        content = choice.get("message", {}).get("content", "")
+        md_output += content + "\n\n---\n\n"
+
+    citations = data.get("citations", [])
+    if citations:
+        md_output += "### Citations / References\n"
+        for idx, citation in enumerate(citations, start=1):
+            md_output += f"{idx}. {format_citation(citation)}\n"
+
+    return md_output
+
+
+def format_citation(citation) -> str:
+    if isinstance(citation, dict):
+        url = citation.get("url", "")
+        title = citation.get("title", "")
+        if url and title:
+            return f"[{title}]({url})"
+        elif url:
+            return url
+        return str(citation)
+    if not isinstance(citation, str):
+        logger.warning(f"Unexpected citation type: {type(citation)}")
+    return str(citation)
+
+
+async def get_search_result(
+    query: str,
+    api_key: str,
+    max_retries: int = 3,
+    on_progress: SearchProgressCallback | None = None,
+) -> dict | None:
+    """
+    Return ``{"data": <raw response>, "markdown": <formatted result>}`` for the
+    query, serving repeated queries from the in-process cache and, when
+    configured, the persistent store shared with other workers.
+    """
+    key = normalize_query(query)
+    result = search_cache.get(key)
+    if result is not None:
+        return result
+
+    # Identical queries that miss the cache at the same time share one lookup.
+    return await search_flights.do(
+        key, lambda: load_search_result(key, query, api_key, max_retries, on_progress)
+    )
+
+
+async def load_search_result(
+    key: str,
+    query: str,
+    api_key: str,
+    max_retries: int,
+    on_progress: SearchProgressCallback | None = None,
+) -> dict | None:
+    if search_store is not None:
+        try:
+            stored = await asyncio.to_thread(search_store.get, key)
+        except sqlite3.Error as e:
+            logger.warning(f"Error reading persistent search cache: {e}")
+            stored = None
+        if stored is not None:
+            result, expires_at = stored
+            ttl = expires_at - time.time() if expires_at is not None else None
+            search_cache.set(key, result, size=result_size(result), ttl=ttl)
+            return result
+
+    data = await fetch_perplexity_response(
+        query, api_key, max_retries=max_retries, on_progress=on_progress
+    )
+    if data is None:
+        return None
+
+    result = {"data": data, "markdown": format_perplexity_response(data, query)}
+    if data.get("choices"):
+        ttl = search_cache_ttl(key)
+        search_cache.set(key, result, size=result_size(result), ttl=ttl)
+        if search_store is not None:
+            try:
+                await asyncio.to_thread(search_store.set, key, result, ttl)
+            except sqlite3.Error as e:
+                logger.warning(f"Error writing persistent search cache: {e}")
+    return result
+
+
+def result_size(result: dict) -> int:
+    return len(result["markdown"].encode()) + len(json.dumps(result["data"]).encode())
+
+
+async def perplexity_search(
+    query: str,
+    api_key: str,
+    max_retries: int = 3,
+    on_progress: SearchProgressCallback | None = None,
+) -> str:
+    result = await get_search_result(
+        query, api_key, max_retries=max_retries, on_progress=on_progress
+    )
+    if result is None:
+        return None
+    return result["markdown"]
+
+
+async def perplexity_batch_search(
+    queries: list[str],
+    api_key: str,
+    concurrency: int = SEARCH_BATCH_CONCURRENCY,
+    max_retries: int = 3,
+    on_progress: SearchProgressCallback | None = None,
+) -> str:
+    """
+    Run several searches concurrently and merge them into one markdown
+    document with a single, de-duplicated citation list.
+    """
+    unique_queries = {}
+    for query in queries[:SEARCH_BATCH_MAX_QUERIES]:
+        if query and query.strip():
+            unique_queries.setdefault(normalize_query(query), query.strip())
+    if len(queries) > SEARCH_BATCH_MAX_QUERIES:
+        logger.warning(
+            f"Batch search truncated from {len(queries)} to "
+            f"{SEARCH_BATCH_MAX_QUERIES} queries"
+        )
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(query: str) -> dict | None:
+        async with semaphore:
+            return await get_search_result(
+                query, api_key, max_retries=max_retries, on_progress=on_progress
+            )
+
+    results = await asyncio.gather(
+        *(run(query) for query in unique_queries.values()), return_exceptions=True
+    )
+
+    md_output = f"*Search performed at: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n\n"
+    citation_numbers: dict[str, int] = {}
+    citations: list = []
+
+    for idx, (query, result) in enumerate(zip(unique_queries.values(), results), 1):
+        md_output += f"## {idx}. {query}\n\n"
+        if isinstance(result, BaseException):
+            logger.error(f"Batch search failed for query '{query}': {result}")
+            result = None
+        if result is None or not result["data"].get("choices"):
+            md_output += "Error: Unable to perform the search.\n\n---\n\n"
+            continue
+
+        # Renumber this result's inline [n] markers to the merged citation list.
+        local_to_global = {}
+        for local_idx, citation in enumerate(result["data"].get("citations", []), 1):
+            if isinstance(citation, dict):
+                citation_key = citation.get("url") or json.dumps(
+                    citation, sort_keys=True
+                )
+            else:
+                citation_key = str(citation)
+            if citation_key not in citation_numbers:
+                citations.append(citation)
+                citation_numbers[citation_key] = len(citations)
+            local_to_global[local_idx] = citation_numbers[citation_key]
+
+        def renumber(match: re.Match) -> str:
+            number = local_to_global.get(int(match.group(1)))
+            return f"[{number}]" if number is not None else match.group(0)
+
+        for choice in result["data"]["choices"]:
+            content = choice.get("message", {}).get("content", "")
+            md_output += CITATION_MARKER_PATTERN.sub(renumber, content) + "\n\n"
+        md_output += "---\n\n"
+
+    if citations:
+        md_output += "### Citations / References\n"
+        for idx, citation in enumerate(citations, start=1):
+            md_output += f"{idx}. {format_citation(citation)}\n"
+
+    return md_output
@@ -0,0 +1,92 @@
+import pytest
+
+from financial_planner import router
+from financial_planner.router import ROUTE_AGENT, ROUTE_TEAM, ROUTE_TOOL, route_query
+
+
+@pytest.fixture(autouse=True)
+def fast_path_routing(monkeypatch):
+    monkeypatch.setattr(router, "FAST_PATH_ROUTING", True)
+
+
+@pytest.mark.parametrize(
+    "query, route, reason",
+    [
+        # Calculator answers.
+        (
+            "What is the monthly payment on a $300,000 mortgage at 6% for 30 years?",
+            ROUTE_TOOL,
+            "loan_payment",
+        ),
+        ("How much will $5,000 grow to in 10 years at 6%?", ROUTE_TOOL, None),
+        ("How much is $50,000 in 20 years with 3% inflation?", ROUTE_TOOL, None),
+        ("What is the income tax on a $90k salary?", ROUTE_TOOL, "income_tax"),
+        ("What is the income tax on a $100k salary in Texas?", ROUTE_TOOL, None),
+        ("What is the income tax on a $100k salary in washington.", ROUTE_TOOL, None),
+        ("What is the 401k contribution limit for 2025?", ROUTE_TOOL, None),
+        # Figures or details a calculator would ignore.
+        (
+            "What will $10,000 be worth in 10 years at 7% return with 3% inflation?",
+            ROUTE_AGENT,
+            None,
+        ),
+        (
+            "What is the monthly payment on a $300,000 mortgage at 6% for 30 years "
+            "with an extra $200/month payment?",
+            ROUTE_AGENT,
+            None,
+        ),
+        (
+            "What's the payment on a $25,000 car loan at 7% over 5 years if I also "
+            "have a 22% credit card?",
+            ROUTE_AGENT,
+            None,
+        ),
+        (
+            "What is the tax on $120,000 salary after $20,000 401k contributions?",
+            ROUTE_AGENT,
+            None,
+        ),
+        (
+            "What is the income tax on $90k income with $30k capital gains?",
+            ROUTE_AGENT,
+            None,
+        ),
+        # States without a tax table.
+        ("What is the income tax on a $100k salary in California?", ROUTE_AGENT, None),
+        ("What is the income tax on a $100k salary in New York?", ROUTE_AGENT, None),
+        ("What is the income tax on a $100k salary in oregon", ROUTE_AGENT, None),
+        (
+            "What is the income tax on a $100k salary in Washington DC?",
+            ROUTE_AGENT,
+            None,
+        ),
+        (
+            "What is the income tax on a $100k salary in west virginia?",
+            ROUTE_AGENT,
+            None,
+        ),
+        # Joint and incremental income.
+        ("My wife and I make $200k, what is our tax?", ROUTE_AGENT, None),
+        ("How much tax do I pay on a $20k salary increase?", ROUTE_AGENT, None),
+        # Research and planning.
+        ("What is the current 10-year Treasury yield?", ROUTE_TEAM, None),
+        ("Should I pay off my mortgage or invest in index funds?", ROUTE_TEAM, None),
+    ],
+)
+def test_route_query(query, route, reason):
+    decision = route_query(query)
+    assert decision.route == route, decision.reason
+    if reason is not None:
+        assert decision.reason == reason
+    assert (decision.answer is not None) == (route == ROUTE_TOOL)
+
+
+def test_state_tax_is_reported():
+    answer = route_query("What is the income tax on a $100k salary in Illinois?").answer
+    assert "IL state income tax" in answer
+
+
+def test_unspecified_compounding_is_stated():
+    answer = route_query("How much will $5,000 grow to in 10 years at 6%?").answer
+    assert "annual compounding" in answer